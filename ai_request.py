@@ -2,12 +2,16 @@
 Interface to Google Gemini AI for movie recommendations and quiz questions.
 """
 import os
-import json
 import requests
-from typing import Optional, Dict, List
+from threading import Lock
+from typing import Optional, Dict, List, Sequence, Tuple
 from dotenv import load_dotenv
 import google.generativeai as genai
 from google.generativeai.types import GenerationConfig
+from services.cache_service import cached
+from services.llm_cache import LLMResponseCache
+from services.model_client import AI_TIMEOUT, ModelClient
+from utils.json_extraction import JSONExtractionError, conform, contains_json, extract_json
 
 # Load environment variables
 load_dotenv()
@@ -15,6 +19,7 @@ load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY")
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 OMDB_API_KEY = os.getenv("OMDB_API_KEY")
+MODEL_NAME = "models/gemini-2.0-flash"
 
 # TMDB API base URL
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
@@ -27,15 +32,70 @@ generation_config = GenerationConfig(
     max_output_tokens=2048,
 )
 
-genai.configure(api_key=API_KEY)
 
-# List available models and select the correct one
-available_models = [m.name for m in genai.list_models()]
-print("Available models:", available_models)
 
+def _json_config(max_output_tokens: int) -> GenerationConfig:
+    """generation_config with the model's JSON response mode, where the library supports it."""
+    options = dict(temperature=generation_config.temperature, top_p=1, top_k=1, max_output_tokens=max_output_tokens)
+    try:
+        return GenerationConfig(response_mime_type='application/json', **options)
+    except TypeError:
+        return GenerationConfig(**options)
+
+
+# All prompts ask for JSON; batched quiz prompts answer several movies at once and need a larger output budget
+json_generation_config = _json_config(2048)
+batch_generation_config = _json_config(8192)
+
+# Expected structure of the answers (see utils.json_extraction)
+QUIZ_QUESTION_SCHEMA = {'question': str, 'correct_answer': str, 'wrong_answers': [str]}
+MOVIE_TITLE_SCHEMA = {'title': str}
+
+# Deadline, in-flight limit and circuit breaker shared by all model calls of this process
+model_client = ModelClient()
+
+# Batched quiz prompts produce far more output than single prompts
+AI_BATCH_TIMEOUT = float(os.getenv('AI_BATCH_TIMEOUT', '120'))
+
+# Persistent cache of model responses, shared by all workers through the database
+response_cache = LLMResponseCache(
+    os.getenv('LLM_CACHE_URL', os.getenv('DATABASE_URL', 'postgresql://localhost/movie_app_postgres'))
+)
+
+# Model handle shared by all AIRequest instances, created on first use
+_model = None
+_model_lock = Lock()
+
+
+def get_model():
+    """
+    The process-wide Gemini model, configured on first use.
+
+    Creating the model does not contact the API, so importing this module
+    and starting a worker work offline; the first generate call does.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                genai.configure(api_key=API_KEY)
+                _model = genai.GenerativeModel(MODEL_NAME, generation_config=generation_config)
+                print("AI model successfully initialized")
+    return _model
+
+
+def list_available_models() -> List[str]:
+    """Names of the models the API key can use (network call, for diagnostics only)."""
+    genai.configure(api_key=API_KEY)
+    return [m.name for m in genai.list_models()]
+
+
+@cached(timeout=86400, key_prefix='omdb', negative_timeout=300,
+        negative_when=lambda details: 'error' in details)
 def get_movie_details(title: str, year: str = None) -> Optional[Dict]:
     """
     Get detailed movie information from OMDB API.
+    Not found and error responses are cached for a short time only.
     """
     omdb_url = "http://www.omdbapi.com/"
 
@@ -68,25 +128,132 @@ def get_movie_details(title: str, year: str = None) -> Optional[Dict]:
         print(f"Error fetching movie data: {str(e)}")
         return {"error": f"API error: {str(e)}"}
 
+
+def _cache_settings(config: Optional[GenerationConfig]) -> Dict:
+    """The generation settings that shape an answer, part of its response cache key."""
+    config = config or generation_config
+    return {name: getattr(config, name, None)
+            for name in ('temperature', 'top_p', 'top_k', 'max_output_tokens', 'response_mime_type')}
+
+
+def _known_questions(questions: Sequence[str], indent: str = '        ') -> str:
+    """Prompt lines listing a pool's questions, so a top-up asks for new ones."""
+    if not questions:
+        return ''
+    listed = "\n".join(f"{indent}- {question}" for question in questions)
+    return f"\n{indent}Already asked (do NOT repeat these questions or ask for the same facts):\n{listed}\n"
+
+
+QUIZ_DIFFICULTY_GUIDELINES = {
+    'leicht': """
+        - Focus on obvious facts like main actors, genre, year
+        - Easy to answer questions for casual viewers
+        - No details from the plot that could be easily forgotten
+        - Wrong answers should be clearly distinguishable
+    """,
+    'mittel': """
+        - Important plot points and central characters
+        - Relationships between the characters
+        - Significant scenes and turning points
+        - Production details like director, script, music
+        - Wrong answers should be plausible but distinguishable
+    """,
+    'schwer': """
+        - Complex plot details and subtexts
+        - Hidden clues and Easter eggs
+        - Technical aspects of film production
+        - Background information and trivia
+        - Details about supporting characters and their development
+        - Wrong answers must be very plausible
+    """
+}
+
+
+# The same requirements are appended to single and batched quiz prompts
+QUIZ_REQUIREMENTS = """
+        IMPORTANT REQUIREMENTS:
+        1. No repetitions of topics or similar questions
+        2. All answers must be factually correct/plausible
+        3. Questions must be unambiguously answerable
+        4. Answers should be of approximately equal length
+        5. No obviously wrong answers
+        """
+
+
 class AIRequest:
     """
     Interface to Google Gemini AI for movie recommendations and quiz generation.
     """
-    def __init__(self):
-        try:
-            # Use the available model "models/gemini-2.0-flash"
-            self.model = genai.GenerativeModel(
-                "models/gemini-2.0-flash",
-                generation_config=generation_config
-            )
-            print("AI model successfully initialized")
-        except Exception as e:
-            print(f"Error initializing model: {str(e)}")
-            raise
+    def __init__(self, model=None):
+        # Without a model the shared one is used, it is created on the first call
+        self._model = model
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_model()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def _generate_text(self, prompt: str, config: Optional[GenerationConfig] = None,
+                       timeout: float = AI_TIMEOUT, refresh: bool = False) -> str:
+        """
+        Generate the model's text for a prompt.
+
+        Identical prompts with identical generation settings are answered
+        from the persistent response cache. refresh skips the cached answer
+        and replaces it with a new one, for callers that want a different
+        answer than last time. Only responses containing parsable JSON are
+        cached, so a garbled answer is not repeated until the entry expires.
+
+        The model call runs through the process-wide model_client: it is
+        abandoned after timeout seconds and fails fast while the provider
+        is degraded (ModelUnavailableError).
+        """
+        settings = _cache_settings(config)
+        if not refresh:
+            cached_text = response_cache.get(MODEL_NAME, prompt, settings)
+            if cached_text is not None:
+                return cached_text
+
+        def generate():
+            # The HTTP request gets the same deadline, so abandoned calls end as well
+            options = {'timeout': timeout}
+            if config:
+                return self.model.generate_content(prompt, generation_config=config, request_options=options).text
+            return self.model.generate_content(prompt, request_options=options).text
+
+        text = model_client.call(generate, timeout=timeout)
+        if contains_json(text):
+            response_cache.set(MODEL_NAME, prompt, settings, text)
+        return text
+
+    def _generate_json(self, prompt: str, schema=None, config: Optional[GenerationConfig] = None,
+                       timeout: float = AI_TIMEOUT, refresh: bool = False):
+        """
+        Generate and parse a JSON answer in JSON response mode.
 
-    def ai_request(self, data_string: str) -> Dict:
+        The answer is repaired or rejected in one pass by extract_json, a
+        malformed answer raises JSONExtractionError instead of being retried.
+        """
+        return extract_json(self._generate_text(prompt, config or json_generation_config, timeout, refresh), schema)
+
+    def cache_stats(self) -> Dict:
+        """Hit/miss statistics of the response cache."""
+        return response_cache.stats()
+
+    def client_stats(self) -> Dict:
+        """Latency, timeout and circuit breaker statistics of the model calls."""
+        return model_client.stats()
+
+    def ai_request(self, data_string: str, refresh: bool = False) -> Dict:
         """
         Request a movie recommendation from the AI (without exclusion).
+
+        refresh bypasses the response cache, e.g. to replace an expired recommendation.
         """
         try:
             # Extract the current movie title and other information from the context
@@ -117,52 +284,26 @@ RESPOND ONLY WITH A JSON OBJECT IN THIS EXACT FORMAT:
 
 NO additional text, ONLY the JSON object."""
 
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
-
-            # Remove possible Markdown code block formatting
-            response_text = response_text.replace('```json', '').replace('```', '').strip()
-
-            print(f"Received AI response: {response_text}")  # Debug output
-
             try:
-                # Validate and process the response
-                result = json.loads(response_text)
-
-                if not isinstance(result, dict):
-                    raise ValueError("Response is not a JSON object")
-                if not all(key in result for key in ['title', 'year', 'explanation']):
-                    raise ValueError("Missing required fields in JSON")
+                result = self._generate_json(prompt, {'title': str, 'year': (str, int), 'explanation': str},
+                                             refresh=refresh)
+            except JSONExtractionError as e:
+                raise ValueError(f"Invalid AI response: {str(e)}")
 
-                # Ensure that the same movie is not recommended
-                if result["title"].lower() == current_movie.get('title', '').lower():
-                    raise ValueError("AI recommended the same movie")
+            # Ensure that the same movie is not recommended
+            if result["title"].lower() == current_movie.get('title', '').lower():
+                raise ValueError("AI recommended the same movie")
 
-                # Get detailed information from OMDB
-                movie_details = get_movie_details(result["title"], result.get("year"))
+            # Get detailed information from OMDB
+            movie_details = get_movie_details(result["title"], str(result["year"]))
 
-                if movie_details:
-                    return {
-                        "movie": movie_details,
-                        "reasoning": result["explanation"]
-                    }
-                else:
-                    raise ValueError("No movie information found")
-
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing error: {e}")
-                print(f"Received response: {response_text}")
-                # Try alternative parsing method
-                try:
-                    # Remove possible escape characters and double quotes
-                    cleaned_text = response_text.encode().decode('unicode_escape').strip('"')
-                    result = json.loads(cleaned_text)
-                    return {
-                        "movie": get_movie_details(result["title"], result.get("year")),
-                        "reasoning": result["explanation"]
-                    }
-                except:
-                    raise ValueError(f"Invalid AI response: {str(e)}")
+            if movie_details:
+                return {
+                    "movie": movie_details,
+                    "reasoning": result["explanation"]
+                }
+            else:
+                raise ValueError("No movie information found")
 
         except Exception as e:
             print(f"Error in ai_request: {str(e)}")
@@ -179,11 +320,8 @@ NO additional text, ONLY the JSON object."""
             Please answer with only the movie title and year in this format:
             {{"title": "Movie Title", "year": "YYYY"}}"""
 
-            response = self.model.generate_content(prompt)
-            json_string = response.text.replace("```", "").strip()
-
             try:
-                result = json.loads(json_string)
+                result = self._generate_json(prompt, MOVIE_TITLE_SCHEMA)
                 # Get detailed information from OMDB
                 movie_details = get_movie_details(result["title"], result.get("year"))
 
@@ -205,7 +343,7 @@ NO additional text, ONLY the JSON object."""
                 else:
                     raise ValueError("No movie information found")
 
-            except json.JSONDecodeError:
+            except JSONExtractionError:
                 raise ValueError("Invalid AI response")
 
         except Exception as e:
@@ -232,9 +370,7 @@ NO additional text, ONLY the JSON object."""
         }}"""
 
         try:
-            response = self.model.generate_content(prompt)
-            result = json.loads(response.text)
-            return result
+            return self._generate_json(prompt, {'is_valid': bool, 'feedback': str})
         except Exception as e:
             print(f"Error validating question: {str(e)}")
             return {
@@ -270,16 +406,9 @@ NO additional text, ONLY the JSON object."""
         """
 
         try:
-            response = self.model.generate_content(prompt)
-            # Extract JSON from the response
-            response_text = response.text
-            # Find the JSON part in the response
-            start = response_text.find('{')
-            end = response_text.rfind('}') + 1
-            if start >= 0 and end > start:
-                json_str = response_text[start:end]
-                return json.loads(json_str)
-            else:
+            try:
+                return self._generate_json(prompt, QUIZ_QUESTION_SCHEMA)
+            except JSONExtractionError:
                 # Fallback in case no valid JSON was found
                 return {
                     "question": "In which year was the movie released?",
@@ -334,8 +463,7 @@ NO additional text, ONLY the JSON object."""
         """
 
         try:
-            response = self.model.generate_content(prompt)
-            result = json.loads(response.text)
+            result = self._generate_json(prompt)
             if not isinstance(result, dict) or "recommendation" not in result:
                 return {
                     "error": "Invalid response format",
@@ -398,8 +526,7 @@ NO additional text, ONLY the JSON object."""
         """
 
         try:
-            response = self.model.generate_content(prompt)
-            result = json.loads(response.text)
+            result = self._generate_json(prompt)
             if not isinstance(result, dict) or "recommendation" not in result:
                 return {
                     "error": "Invalid response format",
@@ -456,22 +583,8 @@ Recommend a similar movie. Respond ONLY with a JSON object in exactly this forma
 }}"""
 
             # Generate the recommendation
-            response = self.model.generate_content(prompt)
-
-            if not response or not response.text:
-                print("No response received from the AI")
-                return None
-
-            # Try to parse the JSON
             try:
-                # Clean the response
-                json_str = response.text.strip()
-                if '```json' in json_str:
-                    json_str = json_str.split('```json')[1].split('```')[0].strip()
-                elif '```' in json_str:
-                    json_str = json_str.split('```')[1].strip()
-
-                result = json.loads(json_str)
+                result = self._generate_json(prompt, dict)
 
                 # Return a standardized format
                 return {
@@ -480,41 +593,22 @@ Recommend a similar movie. Respond ONLY with a JSON object in exactly this forma
                     'year': result.get('year', 'Year not available'),
                     'explanation': result.get('explanation', 'No explanation available')
                 }
-            except json.JSONDecodeError as e:
+            except JSONExtractionError as e:
                 print(f"JSON parsing error: {e}")
-                print(f"Received response: {response.text}")
                 return None
         except Exception as e:
             print(f"Error in AI request: {str(e)}")
             return None
 
-    def generate_quiz_questions(self, movie_context: dict, difficulty: str) -> List[Dict]:
+    def generate_quiz_questions(self, movie_context: dict, difficulty: str,
+                                exclude: Sequence[str] = ()) -> List[Dict]:
         """
         Generates quiz questions based on the movie context and desired difficulty level.
+
+        exclude lists the questions already in the pool; the prompt asks for
+        different ones and the response cache is bypassed, so a top-up does
+        not get the pool's first batch again.
         """
-        difficulty_guidelines = {
-            'leicht': """
-                - Focus on obvious facts like main actors, genre, year
-                - Easy to answer questions for casual viewers
-                - No details from the plot that could be easily forgotten
-                - Wrong answers should be clearly distinguishable
-            """,
-            'mittel': """
-                - Important plot points and central characters
-                - Relationships between the characters
-                - Significant scenes and turning points
-                - Production details like director, script, music
-                - Wrong answers should be plausible but distinguishable
-            """,
-            'schwer': """
-                - Complex plot details and subtexts
-                - Hidden clues and Easter eggs
-                - Technical aspects of film production
-                - Background information and trivia
-                - Details about supporting characters and their development
-                - Wrong answers must be very plausible
-            """
-        }
 
         prompt = f"""
         Generate 10 film quiz questions for "{movie_context['title']}" ({movie_context['year']}).
@@ -522,42 +616,23 @@ Recommend a similar movie. Respond ONLY with a JSON object in exactly this forma
         Difficulty level: {difficulty}
         
         Follow these guidelines for {difficulty} questions:
-        {difficulty_guidelines[difficulty]}
+        {QUIZ_DIFFICULTY_GUIDELINES[difficulty]}
         
         Movie context:
         - Plot: {movie_context['plot']}
         - Genre: {movie_context['genre']}
         - Director: {movie_context['director']}
-        
+        {_known_questions(exclude)}
         Format the response as a JSON array with objects:
         [{{
             "question": "The question here",
             "correct_answer": "The correct answer",
             "wrong_answers": ["Wrong answer 1", "Wrong answer 2", "Wrong answer 3"]
         }}]
-        
-        IMPORTANT REQUIREMENTS:
-        1. No repetitions of topics or similar questions
-        2. All answers must be factually correct/plausible
-        3. Questions must be unambiguously answerable
-        4. Answers should be of approximately equal length
-        5. No obviously wrong answers
-        """
+        {QUIZ_REQUIREMENTS}"""
 
         try:
-            response = self.model.generate_content(prompt)
-
-            if not response.text:
-                raise ValueError("No response received from the AI")
-
-            # Clean the JSON response
-            response_text = response.text.strip()
-            if '```json' in response_text:
-                response_text = response_text.split('```json')[1].split('```')[0].strip()
-            elif '```' in response_text:
-                response_text = response_text.split('```')[1].strip()
-
-            questions = json.loads(response_text)
+            questions = self._generate_json(prompt, [QUIZ_QUESTION_SCHEMA], refresh=bool(exclude))
 
             # Validate each question
             validated_questions = []
@@ -571,6 +646,63 @@ Recommend a similar movie. Respond ONLY with a JSON object in exactly this forma
             print(f"Error generating questions: {str(e)}")
             return []
 
+    def generate_quiz_questions_batch(self, jobs: List[Tuple[dict, str]],
+                                      exclude: Optional[List[Sequence[str]]] = None) -> List[List[Dict]]:
+        """
+        Generates quiz questions for several (movie context, difficulty) jobs with one model call.
+
+        The movies are numbered in the prompt and the model answers with one
+        JSON object mapping each number to its questions. Returns the
+        validated questions per job in the order of jobs, an empty list for
+        jobs the answer does not cover. Raises if the answer cannot be used
+        at all, so callers can count the batch as failed.
+
+        exclude holds the questions already in each job's pool (in the order
+        of jobs), like for generate_quiz_questions.
+        """
+        exclude = exclude or [()] * len(jobs)
+        difficulties = sorted({difficulty for _, difficulty in jobs})
+        guidelines = "\n".join(f"{difficulty}:{QUIZ_DIFFICULTY_GUIDELINES[difficulty]}" for difficulty in difficulties)
+        movies = "\n".join(
+            f"""        {number}. "{context['title']}" ({context['year']}), difficulty: {difficulty}
+           - Plot: {context['plot']}
+           - Genre: {context['genre']}
+           - Director: {context['director']}{_known_questions(known, '           ').rstrip()}"""
+            for number, ((context, difficulty), known) in enumerate(zip(jobs, exclude), 1)
+        )
+
+        prompt = f"""
+        Generate 10 film quiz questions for each of the following {len(jobs)} movies,
+        at the difficulty level given for each movie.
+        
+        Follow these guidelines per difficulty level:
+        {guidelines}
+        
+        Movies:
+{movies}
+        
+        Format the response as one JSON object that maps each movie number to its questions:
+        {{
+            "1": [{{
+                "question": "The question here",
+                "correct_answer": "The correct answer",
+                "wrong_answers": ["Wrong answer 1", "Wrong answer 2", "Wrong answer 3"]
+            }}]
+        }}
+        {QUIZ_REQUIREMENTS}"""
+
+        answer = self._generate_json(prompt, dict, batch_generation_config, timeout=AI_BATCH_TIMEOUT,
+                                     refresh=any(exclude))
+
+        results = []
+        for number in range(1, len(jobs) + 1):
+            try:
+                questions = conform(answer.get(str(number), []), [QUIZ_QUESTION_SCHEMA])
+            except JSONExtractionError:
+                questions = []
+            results.append([q for q in questions if self._validate_question(q)][:10])
+        return results
+
     def _validate_question(self, question: Dict) -> bool:
         """
         Validates a single question against various quality criteria.
@@ -601,3 +733,14 @@ Recommend a similar movie. Respond ONLY with a JSON object in exactly this forma
 
         except Exception:
             return False
+
+
+_shared_client = None
+
+
+def get_ai_client() -> AIRequest:
+    """The AIRequest instance shared by app and services."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = AIRequest()
+    return _shared_client
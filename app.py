@@ -17,7 +17,7 @@ load_dotenv()
 
 from utils.logging_config import setup_logging
 
-from ai_request import AIRequest
+from ai_request import get_ai_client
 from datamanager.sqlite_data_manager import SQliteDataManager
 from data_models import User, Movie, UserMovie, SuggestedQuestion, Review, QuizAttempt, UserAchievement, Achievement
 from services.quiz_service import QuizService
@@ -25,6 +25,18 @@ from services.auth_service import AuthService, init_login_manager
 from services.watchlist_service import WatchlistService
 from services.achievement_service import AchievementService
 from services.movie_update_service import MovieUpdateService
+from services.cache_service import cached
+from services.cache_invalidation import register_cache_invalidation
+from services.search_service import SearchService, search_terms
+from services.title_index import TitleIndex, register_title_index
+from services.genre_service import genre_counts, genre_preference_filter, movies_with_genres
+from services.similarity_service import SimilarityService
+from services.vector_engine import MovieVectorEngine, register_vector_engine, user_profile
+from services.recommendation_service import RecommendationService
+from services.movie_sampler import MovieSampler
+from services.ai_recommendation_service import AIRecommendation, AIRecommendationService
+from services.quiz_generation_service import FakeQuizModel, QuizGenerationService
+from utils.pagination import keyset_paginate
 
 app = Flask(__name__)
 app.config.update(
@@ -67,9 +79,23 @@ def jinja2_shuffle(seq):
 app.jinja_env.filters['shuffle'] = jinja2_shuffle
 
 data_manager = SQliteDataManager("postgresql://localhost/movie_app_postgres")
-ai_client = AIRequest()
-login_manager = init_login_manager(app)
-movie_update_service = MovieUpdateService(data_manager)
+data_manager.init_app(app)
+register_cache_invalidation()
+search_service = SearchService(data_manager)
+similarity_service = SimilarityService(data_manager)
+title_index = TitleIndex(max_age=int(os.getenv('TITLE_INDEX_MAX_AGE', '300')))
+register_title_index(title_index)
+vector_engine = MovieVectorEngine(data_manager, max_age=int(os.getenv('VECTOR_ENGINE_MAX_AGE', '3600')))
+register_vector_engine(vector_engine)
+movie_sampler = MovieSampler(data_manager, max_age=int(os.getenv('MOVIE_SAMPLER_MAX_AGE', '600')))
+ai_client = get_ai_client()
+ai_recommendation_service = AIRecommendationService(data_manager, ai_client)
+# QUIZ_AI_BACKEND=fake erzeugt Quizfragen ohne KI (lokale Entwicklung ohne API-Key)
+quiz_generation_service = QuizGenerationService(
+    data_manager, FakeQuizModel() if os.getenv('QUIZ_AI_BACKEND') == 'fake' else ai_client
+)
+login_manager = init_login_manager(app, data_manager)
+movie_update_service = MovieUpdateService(data_manager, title_index)
 
 auth_service = AuthService(data_manager)
 watchlist_service = WatchlistService(data_manager)
@@ -80,6 +106,74 @@ def update_movies():
     return movie_update_service.update_movie_database()
 
 
+def load_movie_titles():
+    """Alle Titel für den Trigramm-Index laden (nur id, title, release_year)."""
+    with data_manager.SessionFactory() as session:
+        return session.query(Movie.id, Movie.title, Movie.release_year).all()
+
+
+# Trigramm-Index beim Start aufbauen; schlägt das fehl, wird er bei der ersten Anfrage gebaut
+try:
+    title_index.ensure_fresh(load_movie_titles)
+except Exception as e:
+    app.logger.error(f"Titel-Index konnte nicht aufgebaut werden: {e}")
+
+
+@cached(timeout=600, key_prefix='movies', stale_ttl=300, early_refresh=1.0, tags=['movies'])
+def get_top_rated_movies(limit: int = 10):
+    """Get the best rated movies as plain dicts for the start page."""
+    with data_manager.session_scope() as session:
+        movies = session.query(Movie).order_by(Movie.rating.desc()).limit(limit).all()
+        return [{
+            'id': movie.id,
+            'title': movie.title,
+            'rating': movie.rating,
+            'poster_url': movie.poster_url,
+            'release_year': movie.release_year,
+            'genre': movie.genre,
+            'director': movie.director
+        } for movie in movies]
+
+
+@cached(timeout=1800, key_prefix='similar', negative_timeout=300, tags=['movies', 'similar'])
+def get_similar_movie_ids(movie_id: int, limit: int = 4):
+    """
+    Get the IDs of similar movies from the precomputed movie_similarity table.
+
+    Movies without precomputed matches are queued for scoring and fall back
+    to the cosine similarity of the vector engine until then; the finished
+    scoring invalidates the 'similar' tag. Empty results are cached briefly.
+    """
+    movie_ids = similarity_service.similar_ids(movie_id, limit)
+    if not movie_ids:
+        movie_ids = [similar_id for similar_id, _ in vector_engine.similar(movie_id, limit)]
+    return movie_ids
+
+
+def load_movies_by_ids(session, movie_ids):
+    """Load movies for a list of IDs, keeping the order of the list."""
+    if not movie_ids:
+        return []
+    movies = {m.id: m for m in session.query(Movie).filter(Movie.id.in_(movie_ids)).all()}
+    return [movies[movie_id] for movie_id in movie_ids if movie_id in movies]
+
+
+@cached(timeout=900, key_prefix='recommendations', negative_timeout=300,
+        tags=['recommendations', 'recommendations:{user_id}'])
+def get_recommended_movie_ids(user_id: int, genre_preference: str = '', limit: int = 5):
+    """Get the precomputed collaborative-filtering recommendations of a user, optionally by genre preference."""
+    with data_manager.session_scope() as session:
+        clause = genre_preference_filter(genre_preference) if genre_preference else None
+        return RecommendationService.recommended_ids(session, user_id, clause, limit)
+
+
+@cached(timeout=3600, key_prefix='genres', stale_ttl=600, early_refresh=1.0, tags=['genres'])
+def get_genre_list():
+    """Get all single genres with their number of movies, most common first."""
+    with data_manager.session_scope() as session:
+        return genre_counts(session)
+
+
 with app.app_context():
     pass
 
@@ -103,9 +197,9 @@ def home():
         Rendered home template
     """
     # update_movies()  # Deaktiviert nach Database Reset
-    with data_manager.SessionFactory() as session:
-        # Hole alle Filme und sortiere sie nach Rating (absteigend)
-        movies = session.query(Movie).order_by(Movie.rating.desc()).limit(10).all()
+    with data_manager.session_scope() as session:
+        # Top-Filme nach Rating (gecacht, nur ein Worker berechnet neu)
+        movies = get_top_rated_movies(10)
         users = session.query(User).all()
 
         # Wenn ein Benutzer eingeloggt ist, lade seine Daten
@@ -130,7 +224,7 @@ def home():
 
 @app.route('/users')
 def list_users():
-    with data_manager.SessionFactory() as session:
+    with data_manager.session_scope() as session:
         users = session.query(User).all()
         # Hole für jeden User die Anzahl der Filme (ohne Lazy Loading)
         user_data = []
@@ -146,7 +240,7 @@ def list_users():
 
 @app.route('/users/<user_id>', methods=["GET", "POST"])
 def user_movies(user_id):
-    with data_manager.SessionFactory() as session:
+    with data_manager.session_scope() as session:
         if request.method == "GET":
             chosen_user = session.get(User, user_id)
             if not chosen_user:
@@ -267,7 +361,7 @@ def new_user():
     elif request.method == "POST":
         name = request.form.get("name")
         user = User(name=name, username=name)
-        with data_manager.SessionFactory() as session:
+        with data_manager.session_scope() as session:
             try:
                 session.add(user)
                 session.commit()
@@ -305,16 +399,65 @@ def new_movie():
     return render_template('new_movie.html')
 
 
+# Sortierungen der Filmlisten: Spalte und Richtung (Tiebreaker ist immer die ID).
+# Zusätzlich gibt es bei einer Suche 'relevance' (Rang der Volltextsuche).
+MOVIE_SORTS = {
+    'rating': (Movie.rating, True),
+    'year_desc': (Movie.release_year, True),
+    'year_asc': (Movie.release_year, False),
+    'title': (Movie.title, False),
+}
+
+
+def resolve_sort(sort_by, search_query=''):
+    """Prüft die Sortierung; bei einer Suche ist Relevanz der Standard."""
+    if not sort_by or sort_by == 'relevance':
+        return 'relevance' if search_terms(search_query) else 'rating'
+    return sort_by if sort_by in MOVIE_SORTS else 'rating'
+
+
+def filter_movies(query, search_query='', genre_filter='', with_rank=False):
+    """
+    Wendet Volltextsuche und Genre-Filter (auch für kombinierte Genres) auf eine Film-Query an.
+
+    Gibt die Query und die Relevanz-Spalte der Suche zurück (None ohne Suche).
+    """
+    query, rank = search_service.apply(query, search_query, with_rank)
+    if genre_filter:
+        query = query.filter(movies_with_genres([genre_filter]))
+    return query, rank
+
+
+@cached(timeout=300, key_prefix='movie_count', tags=['movies'])
+def count_movies(search_query='', genre_filter=''):
+    """Anzahl der Filme für Suche und Filter (gecacht, da COUNT die gefilterte Tabelle scannt)."""
+    with data_manager.session_scope() as session:
+        query, _ = filter_movies(session.query(func.count(Movie.id)), search_query, genre_filter)
+        return query.scalar()
+
+
+def paginate_movies(query, sort_by, cursor, per_page, rank=None):
+    """Keyset-Pagination nach der gewählten Sortierung; ungültige Cursor starten von vorne."""
+    if sort_by == 'relevance':
+        sort_column, descending = rank, True
+    else:
+        sort_column, descending = MOVIE_SORTS[sort_by]
+    try:
+        return keyset_paginate(query, sort_by, sort_column, Movie.id, descending, cursor, per_page)
+    except ValueError:
+        return keyset_paginate(query, sort_by, sort_column, Movie.id, descending, None, per_page)
+
+
 @app.route('/movies', methods=["GET", "POST"])
 def list_movies():
     if request.method == "GET":
         search_query = request.args.get('search', '')
-        sort_by = request.args.get('sort', 'rating')
+        sort_by = resolve_sort(request.args.get('sort'), search_query)
         genre_filter = request.args.get('genre', '')
-        page = int(request.args.get('page', 1))
+        cursor = request.args.get('cursor') or None
         per_page = 20  # Pagination: Nur 20 Filme pro Seite laden
 
-        with data_manager.SessionFactory() as session:
+        with data_manager.session_scope() as session:
             # Optimierte Query mit SELECT nur benötigter Felder
             query = session.query(
                 Movie.id,
@@ -325,58 +468,27 @@ def list_movies():
                 Movie.poster_url,
                 Movie.director
             )
+            query, rank = filter_movies(query, search_query, genre_filter, with_rank=True)
 
-            # Suche anwenden (optimiert)
-            if search_query:
-                search_terms = f"%{search_query}%"
-                query = query.filter(
-                    Movie.title.ilike(search_terms) |
-                    Movie.genre.ilike(search_terms) |
-                    Movie.director.ilike(search_terms)
-                )
-
-            # Genre-Filter anwenden (optimiert für kombinierte Genres)
-            if genre_filter:
-                query = query.filter(Movie.genre.ilike(f"%{genre_filter}%"))
-
-            # Sortierung anwenden (mit Indizes optimiert)
-            if sort_by == 'title':
-                query = query.order_by(Movie.title)
-            elif sort_by == 'year_desc':
-                query = query.order_by(Movie.release_year.desc().nulls_last())
-            elif sort_by == 'year_asc':
-                query = query.order_by(Movie.release_year.asc().nulls_last())
-            else:  # default: rating
-                query = query.order_by(Movie.rating.desc().nulls_last())
-
-            # Pagination anwenden
-            total_movies = query.count()
-            movies = query.offset((page - 1) * per_page).limit(per_page).all()
-
-            # Pagination Info
-            total_pages = (total_movies + per_page - 1) // per_page
-            has_prev = page > 1
-            has_next = page < total_pages
+            # Keyset-Pagination: Kosten unabhängig davon, wie weit geblättert wurde
+            result = paginate_movies(query, sort_by, cursor, per_page, rank)
 
             return render_template("movies.html",
-                                movies=movies,
+                                movies=result.items,
                                 sort_by=sort_by,
                                 search_query=search_query,
                                 selected_genre=genre_filter,
                                 pagination={
-                                    'page': page,
                                     'per_page': per_page,
-                                    'total': total_movies,
-                                    'total_pages': total_pages,
-                                    'has_prev': has_prev,
-                                    'has_next': has_next,
-                                    'prev_num': page - 1 if has_prev else None,
-                                    'next_num': page + 1 if has_next else None
+                                    'total': count_movies(search_query, genre_filter),
+                                    'cursor': cursor,
+                                    'has_next': result.has_next,
+                                    'next_cursor': result.next_cursor
                                 })
 
     elif request.method == "POST":
         movie_id = request.form["movie_id"]
-        with data_manager.SessionFactory() as session:
+        with data_manager.session_scope() as session:
             deleted = data_manager.delete_movie(int(movie_id))
             movies = session.query(Movie).order_by(Movie.rating.desc()).all()
             return render_template("movies.html",
@@ -387,7 +499,7 @@ def list_movies():
 @app.route('/movies/<movie_id>', methods=["GET", "POST"])
 @login_required
 def movie_details(movie_id):
-    with data_manager.SessionFactory() as session:
+    with data_manager.session_scope() as session:
         movie = session.get(Movie, movie_id, options=[
             joinedload(Movie.actors),
             joinedload(Movie.reviews).joinedload(Review.user)
@@ -505,82 +617,17 @@ def movie_details(movie_id):
         # Hole die Reviews
         reviews = session.query(Review).filter_by(movie_id=movie_id).order_by(Review.created_at.desc()).all()
 
-        # Hole ähnliche Filme basierend auf Genre und Jahr
-        similar_movies = session.query(Movie).filter(
-            Movie.id != movie_id,
-            Movie.genre.like(f'%{movie.genre}%'),
-            Movie.release_year.between(movie.release_year - 5, movie.release_year + 5)
-        ).order_by(Movie.rating.desc()).limit(4).all()
+        # Hole ähnliche Filme aus der vorberechneten Ähnlichkeitstabelle
+        similar_movies = load_movies_by_ids(session, get_similar_movie_ids(int(movie_id)))
 
-        # Hole KI-Empfehlungen basierend auf dem aktuellen Film
+        # KI-Empfehlung aus der Datenbank lesen; fehlt sie, wird sie im Hintergrund erzeugt
         try:
-            # Erstelle einen String mit den Filminformationen
-            movie_info = f"Title: {movie.title}, Genre: {movie.genre}, Year: {movie.release_year}, Rating: {movie.rating}"
-            # Hole Empfehlungen von der KI
-            ai_recommendation = ai_client.ai_request(movie_info)
-            if ai_recommendation:
-                # Prüfe ob die KI-Antwort das erwartete Format hat
-                if 'movie' in ai_recommendation:
-                    # Altes Format mit 'movie' Schlüssel
-                    movie_data = ai_recommendation['movie']
-                    reason = ai_recommendation.get('reason', 'KI-Empfehlung')
-                elif 'title' in ai_recommendation:
-                    # Neues Format ohne 'movie' Schlüssel
-                    movie_data = {
-                        'title': ai_recommendation.get('title'),
-                        'year': ai_recommendation.get('year'),
-                        'director': ai_recommendation.get('director'),
-                        'genre': ai_recommendation.get('genre'),
-                        'plot': ai_recommendation.get('plot') or ai_recommendation.get('description'),
-                        'poster': ai_recommendation.get('poster'),
-                        'imdb': ai_recommendation.get('imdb') or ai_recommendation.get('rating', 0)
-                    }
-                    reason = ai_recommendation.get('explanation', 'KI-Empfehlung')
-                else:
-                    ai_recommendations = []
-                    movie_data = None
-
-                if movie_data and movie_data.get('title'):
-                    # Prüfe ob der empfohlene Film bereits in der Datenbank ist
-                    ai_movie = session.query(Movie).filter(Movie.title.ilike(movie_data['title'])).first()
-                    if not ai_movie:
-                        # Korrigiere das Rating bevor der Film hinzugefügt wird
-                        raw_rating = float(movie_data.get('imdb', 0)) if movie_data.get('imdb') else 0
-
-                        # Rating-Korrektur-Logik
-                        if raw_rating > 1000000:  # Extrem hohe Werte wie 94897
-                            corrected_rating = 7.5  # Setze auf vernünftigen Wert
-                        elif raw_rating > 100:
-                            corrected_rating = min(raw_rating / 10, 10.0)  # Teile durch 10
-                        elif raw_rating > 10:
-                            corrected_rating = min(raw_rating / 10, 10.0)  # Teile durch 10
-                        elif raw_rating < 1:
-                            corrected_rating = 6.5  # Standard-Rating für unbekannte Filme
-                        else:
-                            corrected_rating = min(raw_rating, 10.0)  # Maximal 10.0
-
-                        # Füge den Film zur Datenbank hinzu
-                        ai_movie = Movie(
-                            title=movie_data['title'],
-                            release_year=int(movie_data['year']) if movie_data.get('year') else None,
-                            director=movie_data.get('director', 'Unknown'),
-                            genre=movie_data.get('genre', 'Drama'),
-                            plot=movie_data.get('plot', f"Ein Film aus dem Jahr {movie_data.get('year', 'unbekannt')}."),
-                            poster_url=movie_data.get('poster'),
-                            rating=corrected_rating,  # Verwende das korrigierte Rating
-                            country=movie_data.get('country')
-                        )
-                        session.add(ai_movie)
-                        session.commit()
-
-                        app.logger.info(f"KI-Film hinzugefügt: {movie_data['title']} mit korrigiertem Rating {corrected_rating} (original: {raw_rating})")
-
-                    ai_recommendations = [{'movie': ai_movie, 'reason': reason}]
-                else:
-                    ai_recommendations = []
+            ai_recommendation = ai_recommendation_service.get(session, int(movie_id))
         except Exception as e:
             app.logger.error(f"Fehler bei KI-Empfehlung: {str(e)}")
-            ai_recommendations = []
+            ai_recommendation = AIRecommendation('failed', None, None)
+        ai_recommendations = [{'movie': ai_recommendation.movie, 'reason': ai_recommendation.reason}] \
+            if ai_recommendation.status == 'ready' else []
 
         # Füge Quiz-Historie für den aktuellen Film hinzu (korrigiert)
         quiz_history = None
@@ -603,7 +650,8 @@ def movie_details(movie_id):
                             stats=stats,
                             quiz_history=quiz_history,
                             similar_movies=similar_movies,
-                            ai_recommendations=ai_recommendations)
+                            ai_recommendations=ai_recommendations,
+                            ai_recommendation_status=ai_recommendation.status)
 
 
 @app.route('/users/<user_id>/delete/<movie_id>', methods=["GET", "POST"])
@@ -625,7 +673,7 @@ def delete_user_movie(user_id, movie_id):
 
 @app.route('/users/<user_id>/recommend_movie', methods=['GET', 'POST'])
 def recommendation(user_id):
-    with data_manager.SessionFactory() as session:
+    with data_manager.session_scope() as session:
         user = session.get(User, user_id)
         if not user:
             flash('Benutzer nicht gefunden', 'error')
@@ -637,35 +685,13 @@ def recommendation(user_id):
                 return render_template('recommend.html', user=user)
 
             genre_preference = request.form.get('genre_preference')
-            query = session.query(Movie)
 
-            if 'Action & Spannung' in genre_preference:
-                query = query.filter(
-                    Movie.genre.ilike('%action%') |
-                    Movie.genre.ilike('%thriller%') |
-                    Movie.genre.ilike('%adventure%') |
-                    Movie.genre.ilike('%sci-fi%')
-                ).order_by(func.random())
-            elif 'Drama & Gefühl' in genre_preference:
-                query = query.filter(
-                    Movie.genre.ilike('%drama%') |
-                    Movie.genre.ilike('%romance%')
-                ).order_by(func.random())
-            elif 'Comedy & Humor' in genre_preference:
-                query = query.filter(
-                    Movie.genre.ilike('%comedy%')
-                ).order_by(func.random())
-            elif 'Horror & Mystery' in genre_preference:
-                query = query.filter(
-                    Movie.genre.ilike('%horror%') |
-                    Movie.genre.ilike('%mystery%') |
-                    (Movie.genre.ilike('%thriller%') &
-                     ~Movie.genre.ilike('%action%') &
-                     ~Movie.genre.ilike('%comedy%')) |
-                    Movie.genre.ilike('%suspense%')
-                ).order_by(func.random())
-
-            movies = query.limit(5).all()
+            # Zuerst die vorberechneten Empfehlungen des Benutzers (Collaborative Filtering)
+            movies = load_movies_by_ids(session, get_recommended_movie_ids(user.id, genre_preference))
+
+            if not movies:
+                # Zufällige Filme der Genre-Vorliebe aus den ID-Buckets ziehen statt ORDER BY random()
+                movies = movie_sampler.sample(session, genre_preference, k=5)
 
             if not movies:
                 flash('Leider wurden keine passenden Filme gefunden.', 'warning')
@@ -675,8 +701,9 @@ def recommendation(user_id):
                                 user=user,
                                 recommended_movies=movies)
 
-        # GET request
-        return render_template('recommend.html', user=user)
+        # GET request: vorhandene Empfehlungen direkt anzeigen
+        return render_template('recommend.html', user=user,
+                               recommended_movies=load_movies_by_ids(session, get_recommended_movie_ids(user.id)))
 
 
 @app.route('/quiz')
@@ -684,7 +711,7 @@ def recommendation(user_id):
 def quiz_home():
     """Zeigt die Quiz-Startseite mit verfügbaren und gespielten Quizzen."""
     try:
-        with data_manager.SessionFactory() as session:
+        with data_manager.session_scope() as session:
             # Lade alle Filme
             all_movies = session.query(Movie).all()
 
@@ -729,7 +756,7 @@ def quiz_home():
 def movie_quiz(movie_id):
     """Startet ein Quiz für einen bestimmten Film."""
     try:
-        with data_manager.SessionFactory() as session:
+        with data_manager.session_scope() as session:
             movie = session.get(Movie, movie_id)
             if not movie:
                 flash('Film nicht gefunden.', 'error')
@@ -744,8 +771,18 @@ def movie_quiz(movie_id):
                                    questions=None,
                                    show_difficulty_selection=True)
 
-            quiz_service = QuizService(data_manager)
-            questions = quiz_service.get_questions_for_movie(movie_id, difficulty=difficulty)
+            quiz_service = QuizService(data_manager, generator=quiz_generation_service)
+            questions = quiz_service.get_questions_for_movie(movie_id, difficulty=difficulty,
+                                                          user_id=current_user.id)
+
+            # Die Fragen werden im Hintergrund erstellt, die Seite lädt sich neu bis sie bereit sind
+            if not questions and quiz_generation_service.is_pending(movie.id, difficulty):
+                return render_template('quiz.html',
+                                   movie=movie,
+                                   questions=None,
+                                   questions_pending=True,
+                                   show_difficulty_selection=False,
+                                   difficulty=difficulty)
 
             if not questions:
                 flash('Keine Fragen für diesen Film verfügbar.', 'warning')
@@ -779,7 +816,7 @@ def submit_quiz(movie_id):
         if 'answers' not in data or 'difficulty' not in data:
             return jsonify({'success': False, 'error': 'Antworten oder Schwierigkeitsgrad fehlen'}), 400
 
-        with data_manager.SessionFactory() as session:
+        with data_manager.session_scope() as session:
             # Berechne die Punktzahl und hole die detaillierten Ergebnisse
             quiz_service = QuizService(data_manager)
             result = quiz_service.calculate_score(
@@ -798,6 +835,10 @@ def submit_quiz(movie_id):
                 completed_at=datetime.now(UTC)
             )
             session.add(quiz_attempt)
+            session.flush()
+
+            # Beantwortete Fragen merken und Nutzungs-/Trefferquote im Fragenpool aktualisieren
+            quiz_service.record_answers(session, quiz_attempt.id, result['question_results'])
             session.commit()
 
             # Achievement Service initialisieren und Achievements prüfen
@@ -843,7 +884,7 @@ def suggest_question():
             flash('Bitte fülle alle Felder aus.', 'error')
             return redirect(url_for('suggest_question'))
 
-        with data_manager.SessionFactory() as session:
+        with data_manager.session_scope() as session:
             suggestion = SuggestedQuestion(
                 user_id=current_user.id,
                 movie_id=movie_id,
@@ -860,7 +901,7 @@ def suggest_question():
             flash('Vielen Dank für deinen Vorschlag! Er wird ��berprüft.', 'success')
             return redirect(url_for('quiz_home'))
 
-    with data_manager.SessionFactory() as session:
+    with data_manager.session_scope() as session:
         movies = session.query(Movie).order_by(Movie.title).all()
         return render_template('suggest_question.html', movies=movies)
 
@@ -936,7 +977,7 @@ def logout():
 @app.route('/profile')
 @login_required
 def profile():
-    with data_manager.SessionFactory() as session:
+    with data_manager.session_scope() as session:
         user = session.get(User, current_user.id, options=[
             joinedload(User.reviews),
             joinedload(User.watchlist_items),
@@ -963,7 +1004,7 @@ def profile():
             user.achievements = []
 
         # Berechne die Statistiken
-        with data_manager.SessionFactory() as session:
+        with data_manager.session_scope() as session:
             user.reviews_count = len(user.reviews)
             user.watchlist_count = len(user.watchlist_items)
             user.quiz_attempts_count = len(user.quiz_attempts)
@@ -987,7 +1028,7 @@ def update_settings():
     theme = request.form.get('theme', 'system')
     notifications = request.form.get('notifications') == 'on'
 
-    with data_manager.SessionFactory() as session:
+    with data_manager.session_scope() as session:
         user = session.get(User, current_user.id)
         if user:
             user.theme = theme
@@ -1061,7 +1102,7 @@ def remove_from_watchlist(movie_id):
 @login_required
 def achievements():
     """Zeigt die Achievements des eingeloggten Benutzers."""
-    with data_manager.SessionFactory() as session:
+    with data_manager.session_scope() as session:
         user = session.get(User, current_user.id, options=[
             joinedload(User.achievements)
         ])
@@ -1078,64 +1119,26 @@ def achievements():
 
 @app.route('/movies/<int:movie_id>/recommendation/generate', methods=['POST'])
 def generate_ai_recommendation(movie_id):
-    """Generiert eine KI-Empfehlung für einen bestimmten Film"""
-    try:
-        with data_manager.SessionFactory() as session:
-            movie = session.get(Movie, movie_id)
-            if not movie:
-                return jsonify({'error': 'Film nicht gefunden'}), 404
-
-            # Erstelle einen detaillierten Kontext für die KI
-            context = f"{movie.title}"
-
-            # Hole die Filminformationen und Bewertungen zur Verbesserung der Empfehlung
-            movie_details = {
-                'title': movie.title,
-                'director': movie.director,
-                'genre': movie.genre,
-                'year': movie.release_year,
-                'plot': movie.description
-            }
+    """Stößt eine neue KI-Empfehlung für einen Film im Hintergrund an"""
+    with data_manager.session_scope() as session:
+        if not session.get(Movie, movie_id):
+            return jsonify({'error': 'Film nicht gefunden'}), 404
 
-            # Hole Empfehlung von der KI mit verbessertem Kontext
-            ai_response = ai_client.ai_request(context)
-
-            if ai_response and 'movie' in ai_response:
-                return jsonify({
-                    'recommendation': {
-                        'movie': {
-                            'title': ai_response['movie']['title'],
-                            'director': ai_response['movie']['director'],
-                            'year': ai_response['movie']['year'],
-                            'poster': ai_response['movie']['poster'],
-                            'genre': ai_response['movie']['genre'],
-                            'plot': ai_response['movie']['plot']
-                        },
-                        'reasoning': ai_response['reasoning']
-                    }
-                })
-            else:
-                return jsonify({'error': 'Keine Empfehlung verfügbar'}), 404
-
-    except Exception as e:
-        print(f"Fehler bei der KI-Empfehlung: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    # Die Antwort wartet nicht auf die KI, der Client fragt den Status ab
+    ai_recommendation_service.request(movie_id, force=True)
+    return jsonify({'status': 'pending'}), 202
 
 
 @app.route('/movies/<int:movie_id>/similar', methods=['GET'])
 def get_similar_movies(movie_id):
     """Gibt ähnliche Filme zurück"""
-    with data_manager.SessionFactory() as session:
+    with data_manager.session_scope() as session:
         movie = session.get(Movie, movie_id)
         if not movie:
             return jsonify({'error': 'Film nicht gefunden'}), 404
 
-        # Hole ähnliche Filme basierend auf Genre und Jahr
-        similar_movies = session.query(Movie).filter(
-            Movie.id != movie_id,
-            Movie.genre.like(f'%{movie.genre}%'),
-            Movie.release_year.between(movie.release_year - 5, movie.release_year + 5)
-        ).order_by(Movie.rating.desc()).limit(4).all()
+        # Hole ähnliche Filme aus der vorberechneten Ähnlichkeitstabelle
+        similar_movies = load_movies_by_ids(session, get_similar_movie_ids(movie_id))
 
         # Konvertiere die Filme in ein JSON-Format
         similar_movies_data = [{
@@ -1152,15 +1155,32 @@ def get_similar_movies(movie_id):
 
 @app.route('/movies/<int:movie_id>/recommendation', methods=['GET'])
 def get_movie_recommendation(movie_id):
-    """Gibt eine vorhandene KI-Empfehlung zurück"""
-    with data_manager.SessionFactory() as session:
+    """Gibt die gespeicherte KI-Empfehlung und ihren Status (ready, pending, failed) zurück"""
+    with data_manager.session_scope() as session:
         movie = session.get(Movie, movie_id)
         if not movie:
             return jsonify({'error': 'Film nicht gefunden'}), 404
 
-        # Hier könnte man gespeicherte KI-Empfehlungen abrufen
-        # Für jetzt geben wir einfach einen leeren Response zurück
-        return jsonify({'recommendation': None})
+        ai_recommendation = ai_recommendation_service.get(session, movie_id)
+        if ai_recommendation.status != 'ready':
+            return jsonify({'status': ai_recommendation.status, 'recommendation': None})
+
+        recommended = ai_recommendation.movie
+        return jsonify({
+            'status': 'ready',
+            'recommendation': {
+                'movie': {
+                    'id': recommended.id,
+                    'title': recommended.title,
+                    'director': recommended.director,
+                    'year': recommended.release_year,
+                    'poster': recommended.poster_url,
+                    'genre': recommended.genre,
+                    'plot': recommended.plot
+                },
+                'reasoning': ai_recommendation.reason
+            }
+        })
 
 
 @app.route('/static/<path:filename>')
@@ -1183,33 +1203,43 @@ def recommend_movies():
     if request.method == 'POST' and form.validate():
         genre_preference = request.form.get('genre_preference', '')
 
-        with data_manager.SessionFactory() as session:
+        with data_manager.session_scope() as session:
             query = session.query(Movie)
 
-            if 'Action & Spannung' in genre_preference:
-                query = query.filter(
-                    Movie.genre.ilike('%action%') |
-                    Movie.genre.ilike('%thriller%') |
-                    Movie.genre.ilike('%adventure%') |
-                    Movie.genre.ilike('%sci-fi%')
-                )
-            elif 'Drama & Gefühl' in genre_preference:
-                query = query.filter(
-                    Movie.genre.ilike('%drama%') |
-                    Movie.genre.ilike('%romance%')
-                )
-            elif 'Comedy & Humor' in genre_preference:
-                query = query.filter(
-                    Movie.genre.ilike('%comedy%') |
-                    Movie.genre.ilike('%romance comedy%')
-                )
-            elif 'Horror & Mystery' in genre_preference:
-                query = query.filter(
-                    Movie.genre.ilike('%horror%') |
-                    Movie.genre.ilike('%mystery%') |
-                    (Movie.genre.ilike('%thriller%') & ~Movie.genre.ilike('%action%')) |
-                    Movie.genre.ilike('%suspense%')
-                )
+            # Genre-Vorliebe über die indizierte movie_genres-Tabelle filtern
+            genre_clause = genre_preference_filter(genre_preference)
+            if genre_clause is not None:
+                query = query.filter(genre_clause)
+
+            # Angemeldete Benutzer: zuerst die vorberechneten Empfehlungen (Collaborative Filtering)
+            if current_user.is_authenticated:
+                recommended_ids = get_recommended_movie_ids(current_user.id, genre_preference)
+                if recommended_ids:
+                    return render_template('movie_recommend.html',
+                                         recommended_movies=load_movies_by_ids(session, recommended_ids),
+                                         reason=f"Diese Filme mochten Nutzer mit ähnlichem Geschmack "
+                                                f"und sie passen zu Ihrer Vorliebe für {genre_preference}.",
+                                         genre_preference=genre_preference,
+                                         form=form)
+
+            # Sonst nach Ähnlichkeit zu den bewerteten und gemerkten Filmen sortieren
+            if current_user.is_authenticated:
+                try:
+                    profile = user_profile(session, current_user.id)
+                    ranked = vector_engine.recommend(
+                        profile, k=5, candidates=[row[0] for row in query.with_entities(Movie.id)]
+                    ) if profile else []
+                except Exception as e:
+                    app.logger.error(f"Vektor-Empfehlung fehlgeschlagen: {e}")
+                    ranked = []
+
+                if ranked:
+                    return render_template('movie_recommend.html',
+                                         recommended_movies=load_movies_by_ids(session, [movie_id for movie_id, _ in ranked]),
+                                         reason=f"Diese Filme passen zu Ihrer Vorliebe für {genre_preference} "
+                                                f"und zu den Filmen, die Sie bewertet haben.",
+                                         genre_preference=genre_preference,
+                                         form=form)
 
             # Hole mehr Filme und mische sie für Vielfalt
             movies = query.order_by(
@@ -1244,9 +1274,10 @@ def api_movies():
     try:
         search_query = request.args.get('search', '').strip()
         genre_filter = request.args.get('genre', '').strip()
-        sort_by = request.args.get('sort', 'rating')
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 50))  # React kann mehr laden
+        sort_by = resolve_sort(request.args.get('sort'), search_query)
+        cursor = request.args.get('cursor') or None
+        per_page = min(int(request.args.get('per_page', 50)), 100)  # React kann mehr laden
+        include_total = request.args.get('include_total', '').lower() in ('1', 'true')
 
         # Optimierte Query mit SELECT nur benötigter Felder
         query = data_manager.session.query(
@@ -1257,37 +1288,24 @@ def api_movies():
             Movie.release_year,
             Movie.poster_url,
             Movie.director,
-            Movie.summary
+            Movie.plot
         )
-
-        # Search filter (optimiert)
-        if search_query:
-            query = query.filter(
-                func.lower(Movie.title).contains(search_query.lower()) |
-                func.lower(Movie.genre).contains(search_query.lower())
-            )
-
-        # Genre filter (optimiert)
-        if genre_filter:
-            query = query.filter(Movie.genre == genre_filter)
-
-        # Sorting (mit Indizes optimiert)
-        if sort_by == 'title':
-            query = query.order_by(Movie.title)
-        elif sort_by == 'year_desc':
-            query = query.order_by(Movie.release_year.desc().nulls_last())
-        elif sort_by == 'year_asc':
-            query = query.order_by(Movie.release_year.asc().nulls_last())
-        else:  # rating (default)
-            query = query.order_by(Movie.rating.desc().nulls_last())
-
-        # Pagination
-        total_movies = query.count()
-        movies = query.offset((page - 1) * per_page).limit(per_page).all()
+        query, rank = filter_movies(query, search_query, genre_filter, with_rank=True)
+
+        # Keyset-Pagination statt OFFSET, Gesamtzahl nur auf Wunsch (gecacht)
+        result = paginate_movies(query, sort_by, cursor, per_page, rank)
+        pagination = {
+            'per_page': per_page,
+            'cursor': cursor,
+            'next_cursor': result.next_cursor,
+            'has_next': result.has_next
+        }
+        if include_total:
+            pagination['total'] = count_movies(search_query, genre_filter)
 
         # Convert to JSON-serializable format
         movies_data = []
-        for movie in movies:
+        for movie in result.items:
             movies_data.append({
                 'id': movie.id,
                 'title': movie.title,
@@ -1296,18 +1314,13 @@ def api_movies():
                 'rating': float(movie.rating) if movie.rating else None,
                 'poster_url': movie.poster_url or '/static/default_poster.jpg',
                 'director': movie.director,
-                'summary': movie.summary
+                'summary': movie.plot
             })
 
         return jsonify({
             'success': True,
             'movies': movies_data,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total_movies,
-                'total_pages': (total_movies + per_page - 1) // per_page
-            },
+            'pagination': pagination,
             'filters': {
                 'search': search_query,
                 'genre': genre_filter,
@@ -1330,12 +1343,9 @@ def api_genres():
     API Endpoint für verfügbare Genres
     """
     try:
-        genres = data_manager.session.query(Movie.genre).distinct().filter(Movie.genre.isnot(None)).all()
-        genre_list = [genre[0] for genre in genres if genre[0]]
-
         return jsonify({
             'success': True,
-            'genres': sorted(genre_list)
+            'genres': get_genre_list()
         })
 
     except Exception as e:
@@ -1347,6 +1357,57 @@ def api_genres():
         }), 500
 
 
+@app.route('/api/ai/cache-stats', methods=['GET'])
+@login_required
+def api_ai_cache_stats():
+    """
+    API Endpoint für Treffer-/Fehlquoten des KI-Antwort-Caches
+    """
+    return jsonify({
+        'success': True,
+        'stats': ai_client.cache_stats()
+    })
+
+
+@app.route('/api/ai/client-stats', methods=['GET'])
+@login_required
+def api_ai_client_stats():
+    """
+    API Endpoint für Latenzen, Timeouts und Circuit-Breaker-Status der KI-Aufrufe
+    """
+    return jsonify({
+        'success': True,
+        'stats': ai_client.client_stats()
+    })
+
+
+@app.route('/api/movies/suggest', methods=['GET'])
+def api_movie_suggest():
+    """
+    API Endpoint für Autovervollständigung (tippfehlertolerant über den Trigramm-Index)
+    """
+    query = request.args.get('q', '').strip()
+    # Ungültige Werte ergeben den Standard, das Ergebnis bleibt zwischen 1 und 25 Vorschlägen
+    limit = max(1, min(request.args.get('limit', 10, type=int), 25))
+    if len(query) < 2:
+        return jsonify({'success': True, 'suggestions': []})
+
+    try:
+        title_index.ensure_fresh(load_movie_titles)
+        return jsonify({
+            'success': True,
+            'suggestions': [match._asdict() for match in title_index.suggest(query, limit)]
+        })
+
+    except Exception as e:
+        app.logger.error(f"API Suggest Error: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Fehler bei den Vorschlägen',
+            'suggestions': []
+        }), 500
+
+
 @app.route('/api/movie/<int:movie_id>', methods=['GET'])
 def api_movie_detail(movie_id):
     """
@@ -1,6 +1,6 @@
 """SQLAlchemy data models for MovieProjekt."""
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime, Text, Boolean, Index
 from sqlalchemy.orm import relationship, sessionmaker, declarative_base
 from flask_login import UserMixin
 
@@ -30,6 +30,8 @@ class Movie(Base):
     actors = relationship('Actor', secondary='movie_actors', back_populates='movies', overlaps="movie_actors")
     reviews = relationship('Review', back_populates='movie')
     quiz_questions = relationship('QuizQuestion', back_populates='movie')
+    # Normalisierte Genres, werden beim Flush aus dem genre-String synchronisiert
+    genres = relationship('Genre', secondary='movie_genres', back_populates='movies')
 
     def __repr__(self) -> str:
         return f"<Movie(title={self.title}, id={self.id if self.id else 'None'})>"
@@ -105,6 +107,37 @@ class MovieActor(Base):
     actor = relationship('Actor', back_populates='movie_actors', overlaps="actors,movies")
 
 
+class Genre(Base):
+    """Genre model representing a single normalized genre."""
+    __tablename__ = 'genres'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), unique=True, nullable=False)
+
+    movies = relationship('Movie', secondary='movie_genres', back_populates='genres')
+
+
+class MovieGenre(Base):
+    """Association table for Movie-Genre many-to-many relationship."""
+    __tablename__ = 'movie_genres'
+    movie_id = Column(Integer, ForeignKey('movies.id', ondelete='CASCADE'), primary_key=True)
+    genre_id = Column(Integer, ForeignKey('genres.id', ondelete='CASCADE'), primary_key=True)
+
+    # Genre-Filter suchen über genre_id und lesen movie_id direkt aus dem Index
+    __table_args__ = (Index('idx_movie_genres_genre_movie', 'genre_id', 'movie_id'),)
+
+
+class MovieSimilarity(Base):
+    """Precomputed similarity of two movies, the top N per movie are stored."""
+    __tablename__ = 'movie_similarity'
+    movie_id = Column(Integer, ForeignKey('movies.id', ondelete='CASCADE'), primary_key=True)
+    similar_movie_id = Column(Integer, ForeignKey('movies.id', ondelete='CASCADE'), primary_key=True)
+    score = Column(Float, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+    # Detailseiten lesen die ähnlichsten Filme direkt sortiert aus dem Index
+    __table_args__ = (Index('idx_movie_similarity_movie_score', 'movie_id', 'score'),)
+
+
 class Review(Base):
     """Review model representing a user's review of a movie."""
     __tablename__ = 'reviews'
@@ -132,7 +165,12 @@ class WatchlistItem(Base):
 
 
 class MovieRecommendation(Base):
-    """MovieRecommendation model representing a movie recommended to a user."""
+    """
+    MovieRecommendation model representing a recommended movie.
+
+    Collaborative-filtering rows belong to a user, AI rows belong to the movie
+    they were generated for (source_movie_id) and expire after a TTL.
+    """
     __tablename__ = 'movie_recommendations'
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -140,9 +178,21 @@ class MovieRecommendation(Base):
     reason = Column(Text)
     score = Column(Float)
     recommended_at = Column(DateTime, default=datetime.utcnow)
+    source = Column(String(20), nullable=False, default='collaborative', server_default='collaborative')
+    source_movie_id = Column(Integer, ForeignKey('movies.id', ondelete='CASCADE'))
+    status = Column(String(20), nullable=False, default='ready', server_default='ready')
+    expires_at = Column(DateTime)
 
     user = relationship("User")
-    movie = relationship("Movie")
+    movie = relationship("Movie", foreign_keys=[movie_id])
+    source_movie = relationship("Movie", foreign_keys=[source_movie_id])
+
+    # Empfehlungsseiten lesen die besten Einträge eines Benutzers direkt aus dem Index,
+    # Detailseiten die KI-Empfehlungen ihres Films
+    __table_args__ = (
+        Index('idx_movie_recommendations_user_score', 'user_id', 'score'),
+        Index('idx_movie_recommendations_source_movie', 'source_movie_id'),
+    )
 
 
 class QuizQuestion(Base):
@@ -164,6 +214,9 @@ class QuizQuestion(Base):
     ai_metadata = relationship("AIQuestionMetadata", back_populates="question", uselist=False)
     attempt_questions = relationship("QuizAttemptQuestion", back_populates="question")
 
+    # Fragenpool eines Films pro Schwierigkeitsgrad
+    __table_args__ = (Index('idx_quiz_questions_movie_difficulty', 'movie_id', 'difficulty'),)
+
 
 class AIQuestionMetadata(Base):
     """AIQuestionMetadata model representing metadata for AI-generated quiz questions."""
@@ -207,6 +260,9 @@ class QuizAttemptQuestion(Base):
     attempt = relationship("QuizAttempt", back_populates="attempt_questions")
     question = relationship("QuizQuestion", back_populates="attempt_questions")
 
+    # Zuletzt gesehene Fragen eines Benutzers werden über die Versuche gesucht
+    __table_args__ = (Index('idx_quiz_attempt_questions_attempt', 'attempt_id'),)
+
 
 class Highscore(Base):
     """Highscore model representing a user's high score for a movie."""
@@ -289,6 +345,32 @@ class UserMovie(Base):
     movie = relationship("Movie")
 
 
+class LLMResponse(Base):
+    """Cached text response of the language model, addressed by a hash of model, prompt and temperature."""
+    __tablename__ = 'llm_responses'
+    key = Column(String(64), primary_key=True)
+    model = Column(String(100), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    last_hit_at = Column(DateTime, default=datetime.utcnow)
+    hits = Column(Integer, default=0)
+
+    # Abgelaufene und am längsten ungenutzte Einträge werden über diese Indizes gelöscht
+    __table_args__ = (
+        Index('idx_llm_responses_expires_at', 'expires_at'),
+        Index('idx_llm_responses_last_hit_at', 'last_hit_at'),
+    )
+
+
+class AppMeta(Base):
+    """AppMeta model storing key/value metadata such as the bootstrapped schema version."""
+    __tablename__ = 'app_meta'
+    key = Column(String(50), primary_key=True)
+    value = Column(String(255))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 def init_db(db_url=None):
     """Initializes the database and creates all tables."""
     global engine
@@ -231,3 +231,29 @@ def test_delete_movie_not_found(data_manager: SQliteDataManager):
         deleted = data_manager.delete_movie(999)
         assert deleted is False
 
+
+
+def test_request_session_is_shared(data_manager: SQliteDataManager):
+    """Test that all session scopes within one Flask request share a session."""
+    from flask import Flask
+
+    app = Flask(__name__)
+    data_manager.init_app(app)
+
+    with app.app_context():
+        with data_manager.session_scope() as first, data_manager.session_scope() as second:
+            assert first is second
+        assert data_manager.session is first
+
+    with data_manager.session_scope() as first, data_manager.session_scope() as second:
+        assert first is not second
+
+
+def test_engine_options():
+    """Test that server databases get an explicitly configured pool."""
+    from datamanager.sqlite_data_manager import engine_options
+
+    assert engine_options(TEST_DB_URL) == {}
+    options = engine_options("postgresql://localhost/movie_app_postgres")
+    assert options['pool_pre_ping'] is True
+    assert options['pool_recycle'] > 0
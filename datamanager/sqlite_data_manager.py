@@ -1,28 +1,106 @@
 """
 sqlite_data_manager.py - SQLite-Implementierung des DataManager-Interfaces
 """
+import os
 from contextlib import contextmanager
 from typing import List, Optional, Dict
+from flask import g, has_app_context
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from .data_manager_interface import DataManagerInterface
-from data_models import Base, User, Movie, UserMovie, Achievement
+from data_models import User, Movie, UserMovie
+from services.bootstrap import bootstrap_database
+from services.genre_service import register_genre_sync
+from services.cache_service import cached
+
+def engine_options(db_url: str) -> Dict:
+    """
+    Pool-Einstellungen für die Engine.
+
+    Für Server-Datenbanken (PostgreSQL) wird der Pool explizit begrenzt,
+    Verbindungen vor der Nutzung geprüft (pre-ping) und regelmäßig erneuert.
+    SQLite nutzt die Standardwerte von SQLAlchemy.
+    """
+    if db_url.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '5')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': True
+    }
+
 
 class SQliteDataManager(DataManagerInterface):
     """SQLite-Implementierung des DataManager-Interfaces."""
 
     def __init__(self, db_url: str):
         """Initialisiere die Datenbankverbindung."""
-        self.engine = create_engine(db_url)
-        Base.metadata.create_all(self.engine)
+        self.engine = create_engine(db_url, **engine_options(db_url))
         self.SessionFactory = sessionmaker(bind=self.engine)
-        self._init_achievements()
+        self._request_key = f"db_session_{id(self)}"
+        # Genre-Verknüpfungen bei jedem Flush aus Movie.genre ableiten
+        register_genre_sync()
+        # Schema und Achievements nur bei neuer Version anlegen, Zuordnung Code -> Achievement im Speicher
+        self.achievements = bootstrap_database(self.engine, self.SessionFactory)
+
+    def init_app(self, app) -> None:
+        """Schließe die Request-Session am Ende jeder Anfrage."""
+        app.teardown_appcontext(self.remove_session)
+
+    def _request_session(self) -> Session:
+        """Hole die Session der aktuellen Flask-Anfrage oder lege sie an."""
+        session = g.get(self._request_key)
+        if session is None:
+            session = self.SessionFactory()
+            setattr(g, self._request_key, session)
+        return session
+
+    def remove_session(self, exception=None) -> None:
+        """Schließe die Session der aktuellen Anfrage und gib die Verbindung frei."""
+        session = g.pop(self._request_key, None)
+        if session is not None:
+            if exception is not None:
+                session.rollback()
+            session.close()
+
+    @property
+    def session(self) -> Session:
+        """Session der aktuellen Flask-Anfrage."""
+        return self._request_session()
 
     @contextmanager
-    def get_session(self):
-        """Context Manager für Datenbank-Sessions."""
+    def session_scope(self):
+        """
+        Context Manager für Datenbank-Sessions.
+
+        Innerhalb einer Flask-Anfrage teilen sich alle Services eine Session
+        (und damit eine Verbindung), die erst beim Teardown geschlossen wird.
+        Außerhalb von Flask (Skripte, Tests) gibt es eine eigene Session.
+        """
+        if has_app_context():
+            yield self._request_session()
+            return
+
         session = self.SessionFactory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    @contextmanager
+    def get_session(self):
+        """
+        Context Manager für eine eigene Transaktion mit automatischem Commit.
+
+        Nutzt bewusst nicht die Request-Session: Commit und Rollback betreffen
+        nur die Änderungen dieses Blocks, nicht die noch offene Arbeit der
+        Route. Geladene Objekte verfallen beim Commit nicht, damit sie nach
+        dem Block noch lesbar sind.
+        """
+        session = self.SessionFactory(expire_on_commit=False)
         try:
             yield session
             session.commit()
@@ -180,58 +258,15 @@ class SQliteDataManager(DataManagerInterface):
 
     def get_movie_by_title(self, title: str) -> Optional[Movie]:
         """Hole einen Film anhand seines Titels."""
+        movie_id = self._find_movie_id_by_title(title)
+        if movie_id is None:
+            return None
         with self.get_session() as session:
-            return session.query(Movie).filter(Movie.title.ilike(f"%{title}%")).first()
-
-    def _init_achievements(self):
-        """Initialisiert die Standard-Achievements."""
-        achievements = [
-            {
-                "name": "🎯 Perfect Quiz",
-                "description": "Erreiche die perfekte Punktzahl in einem Quiz!",
-                "code": "perfect_quiz"
-            },
-            {
-                "name": "🏆 First Highscore",
-                "description": "Erreiche deinen ersten Highscore!",
-                "code": "first_highscore"
-            },
-            {
-                "name": "👑 Quiz Master",
-                "description": "Erreiche in 5 verschiedenen Quizzen mindestens 400 Punkte!",
-                "code": "quiz_master"
-            },
-            {
-                "name": "🎓 Quiz Profi",
-                "description": "Schließe ein schweres Quiz mit mindestens 1000 Punkten ab!",
-                "code": "quiz_expert"
-            },
-            {
-                "name": "📚 Wissensdurst",
-                "description": "Beantworte 100 Fragen korrekt!",
-                "code": "knowledge_seeker"
-            },
-            {
-                "name": "🎬 Film Enthusiast",
-                "description": "Schließe Quizze zu 10 verschiedenen Filmen ab!",
-                "code": "movie_enthusiast"
-            },
-            {
-                "name": "🌟 Perfektionist",
-                "description": "Erreiche 3 perfekte Quizze in Folge!",
-                "code": "perfectionist"
-            },
-            {
-                "name": "🔥 Streak Master",
-                "description": "Beantworte 20 Fragen in Folge richtig!",
-                "code": "streak_master"
-            }
-        ]
-        with self.SessionFactory() as session:
-            for achievement_data in achievements:
-                existing = session.query(Achievement).filter_by(
-                    code=achievement_data["code"]).first()
-                if not existing:
-                    achievement = Achievement(**achievement_data)
-                    session.add(achievement)
-            session.commit()
+            return session.get(Movie, movie_id)
+
+    @cached(timeout=600, key_prefix='movie_title', negative_timeout=60, tags=['movies'])
+    def _find_movie_id_by_title(self, title: str) -> Optional[int]:
+        """Suche die ID eines Films per Titel (auch Fehlschläge werden kurz gecacht)."""
+        with self.get_session() as session:
+            row = session.query(Movie.id).filter(Movie.title.ilike(f"%{title}%")).first()
+            return row[0] if row else None
@@ -15,7 +15,7 @@ const MovieApp = () => {
   const [isLoading, setIsLoading] = useState(false)
 
   const debouncedSearch = useDebounce(searchQuery, 300)
-  const { movies, loading, error, refetch } = useMovies({
+  const { movies, loading, loadingMore, error, hasMore, total, loadMoreRef, refetch } = useMovies({
     search: debouncedSearch,
     genre: selectedGenre,
     sort: sortBy
@@ -43,26 +43,14 @@ const MovieApp = () => {
   const filteredMovies = useMemo(() => {
     if (!movies) return []
 
+    // Suche (Volltext inkl. Regisseur und Handlung) und Genre-Filter erledigt die API
     let filtered = [...movies]
 
-    // Search filter
-    if (debouncedSearch) {
-      filtered = filtered.filter(movie =>
-        movie.title.toLowerCase().includes(debouncedSearch.toLowerCase()) ||
-        movie.genre?.toLowerCase().includes(debouncedSearch.toLowerCase())
-      )
-    }
-
-    // Genre filter
-    if (selectedGenre) {
-      filtered = filtered.filter(movie =>
-        movie.genre?.toLowerCase() === selectedGenre.toLowerCase()
-      )
-    }
-
     // Sort
     filtered.sort((a, b) => {
       switch (sortBy) {
+        case 'relevance':
+          return 0
         case 'title':
           return a.title.localeCompare(b.title)
         case 'year_desc':
@@ -122,7 +110,7 @@ const MovieApp = () => {
         <div className="stats-bar">
           <div className="stat-item">
             <Star className="stat-icon" />
-            <span className="stat-value">{filteredMovies.length}</span>
+            <span className="stat-value">{total ?? filteredMovies.length}</span>
             <span className="stat-label">Filme gefunden</span>
           </div>
           {selectedGenre && (
@@ -202,6 +190,13 @@ const MovieApp = () => {
         )}
       </AnimatePresence>
 
+      {/* Infinite Scroll: lädt die nächste Seite, sobald das Listenende sichtbar wird */}
+      {!loading && !error && hasMore && (
+        <div ref={loadMoreRef} className="load-more-sentinel">
+          {loadingMore && <div className="loader-text">Lade weitere Filme...</div>}
+        </div>
+      )}
+
       {/* Results Summary */}
       <motion.div
         className="results-summary"
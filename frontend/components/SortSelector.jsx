@@ -4,6 +4,7 @@ import { SortAsc, Star, Calendar, AlphabeticallyIcon } from 'lucide-react'
 
 const SortSelector = ({ value, onChange }) => {
   const sortOptions = [
+    { value: 'relevance', label: '🔎 Relevanz', icon: SortAsc },
     { value: 'rating', label: '⭐ Beste Bewertung', icon: Star },
     { value: 'title', label: '🔤 Titel A-Z', icon: AlphabeticallyIcon },
     { value: 'year_desc', label: '📅 Neuste zuerst', icon: Calendar },
@@ -1,31 +1,88 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import axios from 'axios'
 
+const PER_PAGE = 50
+
 export const useMovies = ({ search, genre, sort }) => {
   const [movies, setMovies] = useState([])
   const [loading, setLoading] = useState(false)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState(null)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [hasMore, setHasMore] = useState(false)
+  const [total, setTotal] = useState(null)
+
+  // Verhindert, dass Antworten einer alten Suche neue Ergebnisse überschreiben
+  const requestId = useRef(0)
+  const observer = useRef(null)
+
+  const fetchPage = async (cursor) => {
+    const params = new URLSearchParams()
+    if (search) params.append('search', search)
+    if (genre) params.append('genre', genre)
+    if (sort) params.append('sort', sort)
+    params.append('per_page', PER_PAGE)
+    if (cursor) {
+      params.append('cursor', cursor)
+    } else {
+      // Gesamtzahl nur für die erste Seite anfragen
+      params.append('include_total', '1')
+    }
+
+    const response = await axios.get(`/api/movies?${params.toString()}`)
+    return response.data
+  }
 
   const fetchMovies = async () => {
+    const currentRequest = ++requestId.current
     setLoading(true)
     setError(null)
 
     try {
-      const params = new URLSearchParams()
-      if (search) params.append('search', search)
-      if (genre) params.append('genre', genre)
-      if (sort) params.append('sort', sort)
-
-      const response = await axios.get(`/api/movies?${params.toString()}`)
-      setMovies(response.data.movies || [])
+      const data = await fetchPage(null)
+      if (currentRequest !== requestId.current) return
+      setMovies(data.movies || [])
+      setNextCursor(data.pagination?.next_cursor || null)
+      setHasMore(Boolean(data.pagination?.has_next))
+      setTotal(data.pagination?.total ?? null)
     } catch (err) {
       setError(err.response?.data?.error || 'Fehler beim Laden der Filme')
       console.error('Error fetching movies:', err)
     } finally {
-      setLoading(false)
+      if (currentRequest === requestId.current) setLoading(false)
     }
   }
 
+  const loadMore = async () => {
+    if (loading || loadingMore || !hasMore || !nextCursor) return
+    const currentRequest = requestId.current
+    setLoadingMore(true)
+
+    try {
+      const data = await fetchPage(nextCursor)
+      if (currentRequest !== requestId.current) return
+      setMovies(previous => [...previous, ...(data.movies || [])])
+      setNextCursor(data.pagination?.next_cursor || null)
+      setHasMore(Boolean(data.pagination?.has_next))
+    } catch (err) {
+      setError(err.response?.data?.error || 'Fehler beim Laden der Filme')
+      console.error('Error loading more movies:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  // Ref für ein Element am Listenende: lädt die nächste Seite, sobald es sichtbar wird
+  const loadMoreRef = useCallback(node => {
+    if (observer.current) observer.current.disconnect()
+    if (!node) return
+
+    observer.current = new IntersectionObserver(entries => {
+      if (entries[0].isIntersecting) loadMore()
+    }, { rootMargin: '400px' })
+    observer.current.observe(node)
+  }, [loading, loadingMore, hasMore, nextCursor])
+
   useEffect(() => {
     fetchMovies()
   }, [search, genre, sort])
@@ -33,7 +90,12 @@ export const useMovies = ({ search, genre, sort }) => {
   return {
     movies,
     loading,
+    loadingMore,
     error,
+    hasMore,
+    total,
+    loadMore,
+    loadMoreRef,
     refetch: fetchMovies
   }
 }
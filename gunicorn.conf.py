@@ -0,0 +1,16 @@
+"""
+Gunicorn configuration for MovieProjekt.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+
+
+def on_starting(server):
+    """Start the shared cache server once in the master before workers are forked."""
+    from services.cache_service import start_cache_server
+
+    process = start_cache_server()
+    if process:
+        server.log.info(f"Shared cache server started (pid {process.pid})")
@@ -0,0 +1,49 @@
+"""
+Migration: Fügt die Spalten für KI-Empfehlungen (Quelle, Status, Ablaufzeit) zu movie_recommendations hinzu
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, inspect, text
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+load_dotenv()
+
+COLUMNS = {
+    'source': "VARCHAR(20) NOT NULL DEFAULT 'collaborative'",
+    'source_movie_id': "INTEGER REFERENCES movies(id) ON DELETE CASCADE",
+    'status': "VARCHAR(20) NOT NULL DEFAULT 'ready'",
+    'expires_at': "TIMESTAMP",
+}
+
+
+def add_ai_columns_to_movie_recommendations():
+    """Ergänzt fehlende Spalten und den Index für die KI-Empfehlungen"""
+    database_url = os.getenv('DATABASE_URL', 'postgresql://localhost/movie_app_postgres')
+    engine = create_engine(database_url)
+
+    existing = {column['name'] for column in inspect(engine).get_columns('movie_recommendations')}
+
+    with engine.begin() as connection:
+        try:
+            for name, definition in COLUMNS.items():
+                if name in existing:
+                    print(f"Spalte {name} existiert bereits.")
+                    continue
+                connection.execute(text(f"ALTER TABLE movie_recommendations ADD COLUMN {name} {definition}"))
+                print(f"Spalte {name} hinzugefügt.")
+
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_movie_recommendations_source_movie "
+                "ON movie_recommendations(source_movie_id)"
+            ))
+            print("Migration erfolgreich abgeschlossen!")
+        except Exception as e:
+            print(f"Fehler bei der Migration: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    add_ai_columns_to_movie_recommendations()
@@ -0,0 +1,40 @@
+"""
+Migration: Legt die Tabellen genres/movie_genres an und befüllt sie aus Movie.genre
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_models import Base, Genre, MovieGenre
+from services.genre_service import backfill_movie_genres
+
+load_dotenv()
+
+
+def backfill_genres():
+    """Erstellt die Genre-Tabellen und baut alle Verknüpfungen neu auf"""
+    database_url = os.getenv('DATABASE_URL', 'postgresql://localhost/movie_app_postgres')
+    engine = create_engine(database_url)
+
+    # Nur die neuen Tabellen anlegen, bestehende bleiben unverändert
+    Base.metadata.create_all(engine, tables=[Genre.__table__, MovieGenre.__table__])
+
+    session = sessionmaker(bind=engine)()
+    try:
+        links = backfill_movie_genres(session)
+        session.commit()
+        print(f"{links} Genre-Verknüpfungen für {session.query(Genre).count()} Genres geschrieben.")
+    except Exception as e:
+        print(f"Fehler bei der Migration: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    backfill_genres()
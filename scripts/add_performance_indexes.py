@@ -23,9 +23,19 @@ def add_database_indexes():
                 "CREATE INDEX IF NOT EXISTS idx_movie_genre_rating ON movies(genre, rating);",
                 "CREATE INDEX IF NOT EXISTS idx_movie_title_genre ON movies(title, genre);",
 
+                # Keyset-Pagination: Sortierspalte plus ID als Tiebreaker
+                "CREATE INDEX IF NOT EXISTS idx_movie_rating_keyset ON movies(rating DESC NULLS LAST, id);",
+                "CREATE INDEX IF NOT EXISTS idx_movie_year_desc_keyset ON movies(release_year DESC NULLS LAST, id);",
+                "CREATE INDEX IF NOT EXISTS idx_movie_year_asc_keyset ON movies(release_year ASC NULLS LAST, id);",
+                "CREATE INDEX IF NOT EXISTS idx_movie_title_keyset ON movies(title, id);",
+
                 # Indizes für andere Tabellen
                 "CREATE INDEX IF NOT EXISTS idx_review_movie_id ON reviews(movie_id);",
                 "CREATE INDEX IF NOT EXISTS idx_review_user_id ON reviews(user_id);",
+                "CREATE INDEX IF NOT EXISTS idx_movie_recommendations_user_score ON movie_recommendations(user_id, score);",
+                "CREATE INDEX IF NOT EXISTS idx_quiz_questions_movie_difficulty ON quiz_questions(movie_id, difficulty);",
+                "CREATE INDEX IF NOT EXISTS idx_quiz_attempt_questions_attempt ON quiz_attempt_questions(attempt_id);",
+                "CREATE INDEX IF NOT EXISTS idx_quiz_attempts_user_movie ON quiz_attempts(user_id, movie_id, completed_at);",
                 "CREATE INDEX IF NOT EXISTS idx_user_movie_user_id ON user_movies(user_id);",
                 "CREATE INDEX IF NOT EXISTS idx_user_movie_movie_id ON user_movies(movie_id);",
                 "CREATE INDEX IF NOT EXISTS idx_watchlist_user_id ON watchlist_items(user_id);",
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Datenbank-Bootstrap: Legt Schema und Achievements einmalig pro Deployment an
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from dotenv import load_dotenv
+
+from services.bootstrap import bootstrap_database, schema_version
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Führt den Bootstrap für DATABASE_URL aus."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--force', action='store_true',
+                        help='Bootstrap auch bei unveränderter Schema-Version ausführen')
+    args = parser.parse_args()
+
+    db_url = os.getenv('DATABASE_URL', 'postgresql://localhost/movie_app_postgres')
+    engine = create_engine(db_url)
+    achievements = bootstrap_database(engine, sessionmaker(bind=engine), force=args.force)
+
+    logger.info(f"Schema-Version: {schema_version()}")
+    logger.info(f"Achievements im Katalog: {len(achievements)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Ähnlichkeits-Job: Berechnet die ähnlichsten Filme pro Film (Genre, Jahr, Regie, Schauspieler)
+"""
+
+import os
+import sys
+import argparse
+import logging
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.similarity_service import SimilarityService, TOP_N
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Baut die movie_similarity-Tabelle für DATABASE_URL neu auf."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--movie-id', type=int, action='append',
+                        help='Nur diese Filme neu berechnen (mehrfach möglich)')
+    parser.add_argument('--top-n', type=int, default=TOP_N,
+                        help='Anzahl gespeicherter ähnlicher Filme pro Film')
+    args = parser.parse_args()
+
+    db_url = os.getenv('DATABASE_URL', 'postgresql://localhost/movie_app_postgres')
+    service = SimilarityService(SQliteDataManager(db_url), top_n=args.top_n)
+
+    start = time.perf_counter()
+    if args.movie_id:
+        for movie_id in args.movie_id:
+            logger.info(f"Film {movie_id}: {service.refresh_movie(movie_id)} ähnliche Filme gespeichert")
+    else:
+        logger.info(f"{service.rebuild()} Ähnlichkeiten gespeichert")
+    logger.info(f"Dauer: {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Empfehlungs-Job: Berechnet personalisierte Empfehlungen aus Bewertungen, Watchlists und Filmlisten
+"""
+
+import os
+import sys
+import argparse
+import logging
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.recommendation_service import RecommendationService, TOP_N
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Baut die movie_recommendations-Tabelle für DATABASE_URL neu auf."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--top-n', type=int, default=TOP_N,
+                        help='Anzahl gespeicherter Empfehlungen pro Benutzer')
+    args = parser.parse_args()
+
+    db_url = os.getenv('DATABASE_URL', 'postgresql://localhost/movie_app_postgres')
+    service = RecommendationService(SQliteDataManager(db_url), top_n=args.top_n)
+
+    start = time.perf_counter()
+    logger.info(f"{service.rebuild()} Empfehlungen gespeichert")
+    logger.info(f"Dauer: {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
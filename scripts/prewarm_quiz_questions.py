@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Quiz-Vorbereitung: Füllt die Fragenpools aller Filme und Schwierigkeitsgrade, beliebte Filme zuerst
+"""
+
+import os
+import sys
+import argparse
+import logging
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.quiz_generation_service import DIFFICULTIES, QUIZ_BATCH_CONCURRENCY, FakeQuizModel, QuizGenerationService
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Erstellt fehlende Quizfragen für DATABASE_URL."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Höchstens so viele Filme pro Schwierigkeitsgrad')
+    parser.add_argument('--difficulty', choices=DIFFICULTIES, action='append',
+                        help='Nur diese Schwierigkeitsgrade (mehrfach möglich)')
+    parser.add_argument('--fake', action='store_true',
+                        help='Fragen ohne KI aus den Filmdaten erzeugen (Test/Entwicklung)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='Mehrere Filme pro KI-Anfrage erzeugen (z.B. 4 für das Auffüllen des ganzen Katalogs)')
+    parser.add_argument('--concurrency', type=int, default=QUIZ_BATCH_CONCURRENCY,
+                        help='Gleichzeitige KI-Anfragen im Batch-Modus')
+    args = parser.parse_args()
+
+    if args.fake:
+        model = FakeQuizModel()
+    else:
+        from ai_request import get_ai_client
+        model = get_ai_client()
+
+    db_url = os.getenv('DATABASE_URL', 'postgresql://localhost/movie_app_postgres')
+    service = QuizGenerationService(SQliteDataManager(db_url), model)
+
+    start = time.perf_counter()
+    if args.batch_size:
+        report = service.backfill(args.difficulty or DIFFICULTIES, limit=args.limit,
+                                  batch_size=args.batch_size, concurrency=args.concurrency)
+        service.shutdown()
+        logger.info(f"{report['questions']} Fragen für {report['pools']} Fragenpools in {report['batches']} Anfragen "
+                    f"({report['questions_per_second']} Fragen/s)")
+        for failure in report['failed_batches']:
+            logger.warning(f"Batch {failure['batch']} fehlgeschlagen: {failure['error']}")
+    else:
+        queued = service.prewarm(args.difficulty or DIFFICULTIES, limit=args.limit)
+        logger.info(f"{queued} Fragenpools eingeplant")
+        service.wait()
+        service.shutdown()
+        logger.info(f"Ergebnis: {service.stats()}")
+    logger.info(f"Dauer: {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,65 @@
 """
 achievement_service.py - Service for managing user achievements
 """
+from collections import namedtuple
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from data_models import Achievement, UserAchievement, User, QuizAttempt, Review, WatchlistItem
 
+# Single source of truth for all achievements, seeded once by the bootstrap
+ACHIEVEMENT_CATALOG = [
+    {'code': 'quiz_beginner', 'name': '🎉 Quiz Beginner', 'description': 'Complete your first quiz!'},
+    {'code': 'perfect_quiz', 'name': '🎯 Perfect Quiz', 'description': 'Achieve perfect score in a quiz!'},
+    {'code': 'quiz_expert', 'name': '🎓 Quiz Expert',
+     'description': 'Complete a hard quiz with at least 8 correct answers!'},
+    {'code': 'first_highscore', 'name': '🏆 First Highscore', 'description': 'Achieve your first highscore!'},
+    {'code': 'quiz_master', 'name': '👑 Quiz Master',
+     'description': 'Achieve at least 400 points in 5 different quizzes!'},
+    {'code': 'knowledge_seeker', 'name': '📚 Knowledge Seeker', 'description': 'Answer 100 questions correctly!'},
+    {'code': 'movie_enthusiast', 'name': '🎬 Movie Enthusiast', 'description': 'Complete 10 different movie quizzes!'},
+    {'code': 'perfectionist', 'name': '🌟 Perfectionist', 'description': 'Achieve 3 perfect quizzes in a row!'},
+    {'code': 'streak_master', 'name': '🔥 Streak Master', 'description': 'Answer 20 questions in a row correctly!'},
+    {'code': 'streak_5', 'name': '🔥 5 Streak', 'description': 'Answer 5 questions in a row correctly!'},
+    {'code': 'streak_10', 'name': '🔥 10 Streak', 'description': 'Answer 10 questions in a row correctly!'},
+    {'code': 'quiz_100', 'name': '💯 Quiz Veteran', 'description': 'Complete 100 quizzes!'},
+    {'code': 'first_watchlist', 'name': '📺 First Collector', 'description': 'Add your first movie to watchlist!'},
+    {'code': 'collector_10', 'name': '📺 Collector', 'description': 'Add 10 movies to watchlist!'},
+    {'code': 'collector_50', 'name': '📺 Mega Collector', 'description': 'Add 50 movies to watchlist!'},
+    {'code': 'first_review', 'name': '📝 First Critic', 'description': 'Write your first review!'},
+    {'code': 'critic_10', 'name': '📝 Critic', 'description': 'Write 10 reviews!'},
+    {'code': 'prolific_critic', 'name': '📝 Prolific Critic', 'description': 'Write 25 reviews!'},
+    {'code': 'mega_critic', 'name': '📝 Mega Critic', 'description': 'Write 50 reviews!'},
+]
+
+# Immutable snapshot of an achievement row, safe to keep in memory across sessions
+AchievementRef = namedtuple('AchievementRef', ['id', 'code', 'name', 'description'])
+
+
+def seed_achievements(session: Session) -> int:
+    """Insert catalog achievements whose code is missing. Returns the number added."""
+    existing = {code for (code,) in session.query(Achievement.code)}
+    missing = [data for data in ACHIEVEMENT_CATALOG if data['code'] not in existing]
+    if not missing:
+        return 0
+    session.add_all(Achievement(**data) for data in missing)
+    try:
+        session.flush()
+    except IntegrityError as e:
+        # Another process seeded the same codes concurrently
+        session.rollback()
+        print(f"Achievements were already seeded: {e}")
+        return 0
+    return len(missing)
+
+
+def load_achievement_refs(session: Session) -> Dict[str, AchievementRef]:
+    """Load the code -> achievement map in a single query."""
+    rows = session.query(Achievement.id, Achievement.code, Achievement.name,
+                         Achievement.description).filter(Achievement.code.isnot(None))
+    return {row.code: AchievementRef(*row) for row in rows}
+
 
 class AchievementService:
     """Service for managing achievements and their assignment."""
@@ -13,164 +67,22 @@ class AchievementService:
     def __init__(self, data_manager):
         self.data_manager = data_manager
 
-    def _init_achievements(self, session):
-        """Initialize quiz, watchlist, and review-related achievements."""
-        default_achievements = [
-            {
-                'code': 'quiz_beginner',
-                'name': '🎉 Quiz Beginner',
-                'description': 'Complete your first quiz!'
-            },
-            {
-                'code': 'perfect_quiz',
-                'name': '🎯 Perfect Quiz',
-                'description': 'Achieve perfect score in a quiz!'
-            },
-            {
-                'code': 'quiz_expert',
-                'name': '🎓 Quiz Expert',
-                'description': 'Complete a hard quiz with at least 8 correct answers!'
-            },
-            {
-                'code': 'first_highscore',
-                'name': '🏆 First Highscore',
-                'description': 'Achieve your first highscore!'
-            },
-            {
-                'code': 'quiz_master',
-                'name': '👑 Quiz Master',
-                'description': 'Achieve at least 400 points in 5 different quizzes!'
-            },
-            {
-                'code': 'knowledge_seeker',
-                'name': '📚 Knowledge Seeker',
-                'description': 'Answer 100 questions correctly!'
-            },
-            {
-                'code': 'movie_enthusiast',
-                'name': '🎬 Movie Enthusiast',
-                'description': 'Complete 10 different movie quizzes!'
-            },
-            {
-                'code': 'perfectionist',
-                'name': '🌟 Perfectionist',
-                'description': 'Achieve 3 perfect quizzes in a row!'
-            },
-            {
-                'code': 'streak_master',
-                'name': '🔥 Streak Master',
-                'description': 'Answer 20 questions in a row correctly!'
-            },
-            {
-                'code': 'streak_5',
-                'name': '🔥 5 Streak',
-                'description': 'Answer 5 questions in a row correctly!'
-            },
-            {
-                'code': 'streak_10',
-                'name': '🔥 10 Streak',
-                'description': 'Answer 10 questions in a row correctly!'
-            },
-            {
-                'code': 'quiz_100',
-                'name': '💯 Quiz Veteran',
-                'description': 'Complete 100 quizzes!'
-            },
-            {
-                'code': 'first_watchlist',
-                'name': '📺 First Collector',
-                'description': 'Add your first movie to watchlist!'
-            },
-            {
-                'code': 'collector_10',
-                'name': '📺 Collector',
-                'description': 'Add 10 movies to watchlist!'
-            },
-            {
-                'code': 'collector_50',
-                'name': '📺 Mega Collector',
-                'description': 'Add 50 movies to watchlist!'
-            },
-            {
-                'code': 'first_review',
-                'name': '📝 First Critic',
-                'description': 'Write your first review!'
-            },
-            {
-                'code': 'critic_10',
-                'name': '📝 Critic',
-                'description': 'Write 10 reviews!'
-            },
-            {
-                'code': 'prolific_critic',
-                'name': '📝 Prolific Critic',
-                'description': 'Write 25 reviews!'
-            },
-            {
-                'code': 'mega_critic',
-                'name': '📝 Mega Critic',
-                'description': 'Write 50 reviews!'
-            }
-        ]
-
-        for achievement_data in default_achievements:
-            # Check by both code AND name to avoid unique constraint violations
-            existing = session.query(Achievement).filter(
-                (Achievement.code == achievement_data['code']) |
-                (Achievement.name == achievement_data['name'])
-            ).first()
-
-            if not existing:
-                try:
-                    achievement = Achievement(
-                        code=achievement_data['code'],
-                        name=achievement_data['name'],
-                        description=achievement_data['description']
-                    )
-                    session.add(achievement)
-                    session.flush()  # Flush to catch any constraint violations immediately
-                except Exception as e:
-                    # If there's a constraint violation, just continue
-                    session.rollback()
-                    print(f"Achievement {achievement_data['code']} already exists or has constraint violation: {e}")
-
-    def _grant_achievement(self, user_id: int, achievement_code: str, session) -> Optional[Achievement]:
+    def _achievement(self, code: str, session) -> Optional[AchievementRef]:
+        """Look up an achievement in the in-memory catalog map."""
+        refs = self.data_manager.achievements
+        ref = refs.get(code)
+        if ref is None and any(data['code'] == code for data in ACHIEVEMENT_CATALOG):
+            # Row was removed after the bootstrap: restore it and refresh the map
+            seed_achievements(session)
+            refs.update(load_achievement_refs(session))
+            ref = refs.get(code)
+        return ref
+
+    def _grant_achievement(self, user_id: int, achievement_code: str, session) -> Optional[AchievementRef]:
         """Grant an achievement to a user."""
         try:
             with session.no_autoflush:
-                achievement = session.query(Achievement).filter_by(code=achievement_code).first()
-                if not achievement:
-                    achievement_data = self._get_achievement_data(achievement_code)
-                    if achievement_data:
-                        # Check if achievement with this name already exists
-                        existing_by_name = session.query(Achievement).filter_by(
-                            name=achievement_data['name']
-                        ).first()
-
-                        if existing_by_name:
-                            # Use the existing achievement
-                            achievement = existing_by_name
-                        else:
-                            try:
-                                achievement = Achievement(
-                                    code=achievement_data['code'],
-                                    name=achievement_data['name'],
-                                    description=achievement_data['description']
-                                )
-                                session.add(achievement)
-                                session.flush()
-                            except Exception as e:
-                                # If constraint violation, try to find existing achievement by name
-                                session.rollback()
-                                achievement = session.query(Achievement).filter_by(
-                                    name=achievement_data['name']
-                                ).first()
-                                if not achievement:
-                                    print(f"Failed to create or find achievement {achievement_code}: {e}")
-                                    return None
-                    else:
-                        return None
-
+                achievement = self._achievement(achievement_code, session)
                 if not achievement:
                     return None
 
@@ -207,112 +119,10 @@ class AchievementService:
             session.rollback()
             return None
 
-    def _get_achievement_data(self, code: str) -> Optional[dict]:
-        """Get achievement data based on code."""
-        achievements = {
-            'quiz_beginner': {
-                'code': 'quiz_beginner',
-                'name': '🎉 Quiz Beginner',
-                'description': 'Complete your first quiz!'
-            },
-            'perfect_quiz': {
-                'code': 'perfect_quiz',
-                'name': '🎯 Perfect Quiz',
-                'description': 'Achieve perfect score in a quiz!'
-            },
-            'quiz_expert': {
-                'code': 'quiz_expert',
-                'name': '🎓 Quiz Expert',
-                'description': 'Complete a hard quiz with at least 8 correct answers!'
-            },
-            'first_highscore': {
-                'code': 'first_highscore',
-                'name': '🏆 First Highscore',
-                'description': 'Achieve your first highscore!'
-            },
-            'quiz_master': {
-                'code': 'quiz_master',
-                'name': '👑 Quiz Master',
-                'description': 'Achieve at least 400 points in 5 different quizzes!'
-            },
-            'knowledge_seeker': {
-                'code': 'knowledge_seeker',
-                'name': '📚 Knowledge Seeker',
-                'description': 'Answer 100 questions correctly!'
-            },
-            'movie_enthusiast': {
-                'code': 'movie_enthusiast',
-                'name': '🎬 Movie Enthusiast',
-                'description': 'Complete 10 different movie quizzes!'
-            },
-            'perfectionist': {
-                'code': 'perfectionist',
-                'name': '🌟 Perfectionist',
-                'description': 'Achieve 3 perfect quizzes in a row!'
-            },
-            'streak_master': {
-                'code': 'streak_master',
-                'name': '🔥 Streak Master',
-                'description': 'Answer 20 questions in a row correctly!'
-            },
-            'streak_5': {
-                'code': 'streak_5',
-                'name': '🔥 5 Streak',
-                'description': 'Answer 5 questions in a row correctly!'
-            },
-            'streak_10': {
-                'code': 'streak_10',
-                'name': '🔥 10 Streak',
-                'description': 'Answer 10 questions in a row correctly!'
-            },
-            'quiz_100': {
-                'code': 'quiz_100',
-                'name': '💯 Quiz Veteran',
-                'description': 'Complete 100 quizzes!'
-            },
-            'first_watchlist': {
-                'code': 'first_watchlist',
-                'name': '📺 First Collector',
-                'description': 'Add your first movie to watchlist!'
-            },
-            'collector_10': {
-                'code': 'collector_10',
-                'name': '📺 Collector',
-                'description': 'Add 10 movies to watchlist!'
-            },
-            'collector_50': {
-                'code': 'collector_50',
-                'name': '📺 Mega Collector',
-                'description': 'Add 50 movies to watchlist!'
-            },
-            'first_review': {
-                'code': 'first_review',
-                'name': '📝 First Critic',
-                'description': 'Write your first review!'
-            },
-            'critic_10': {
-                'code': 'critic_10',
-                'name': '📝 Critic',
-                'description': 'Write 10 reviews!'
-            },
-            'prolific_critic': {
-                'code': 'prolific_critic',
-                'name': '📝 Prolific Critic',
-                'description': 'Write 25 reviews!'
-            },
-            'mega_critic': {
-                'code': 'mega_critic',
-                'name': '📝 Mega Critic',
-                'description': 'Write 50 reviews!'
-            }
-        }
-        return achievements.get(code)
-
     def check_quiz_achievements(self, user_id: int, score: int, difficulty: str) -> List[dict]:
         """Check and award quiz-related achievements."""
-        with self.data_manager.SessionFactory() as session:
+        with self.data_manager.session_scope() as session:
             try:
-                self._init_achievements(session)
                 earned_achievements = []
 
                 # Get all quiz attempts for this user
@@ -434,8 +244,7 @@ class AchievementService:
 
     def check_watchlist_achievements(self, user_id: int) -> List[dict]:
         """Check and award watchlist-related achievements."""
-        with self.data_manager.SessionFactory() as session:
-            self._init_achievements(session)
+        with self.data_manager.session_scope() as session:
             new_achievements = []
 
             watchlist_count = session.query(WatchlistItem).filter_by(user_id=user_id).count()
@@ -460,8 +269,7 @@ class AchievementService:
 
     def check_review_achievements(self, user_id: int) -> List[dict]:
         """Check and award review-related achievements."""
-        with self.data_manager.SessionFactory() as session:
-            self._init_achievements(session)
+        with self.data_manager.session_scope() as session:
             new_achievements = []
 
             review_count = session.query(Review).filter_by(user_id=user_id).count()
@@ -487,7 +295,7 @@ class AchievementService:
 
     def _award_achievement(self, session, user_id: int, code: str) -> Optional[dict]:
         """Award an achievement to a user."""
-        achievement = session.query(Achievement).filter_by(code=code).first()
+        achievement = self._achievement(code, session)
         if not achievement:
             return None
 
@@ -0,0 +1,238 @@
+"""
+AI movie recommendations computed off the request path.
+
+The movie detail page only reads the stored AI recommendation of a movie from
+movie_recommendations (source 'ai'). Missing or expired recommendations are
+generated by a small background thread pool, so a Gemini and OMDB round trip
+never delays a page render. Until the first recommendation is ready the page
+shows a pending state and polls for it; expired ones are still shown while
+they are refreshed.
+
+A 'pending' row marks a movie whose recommendation is being generated, so
+other requests and workers do not queue it again. Pending and failed rows
+expire quickly, so a crashed worker or an API error is retried later.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Dict, Optional, Set
+
+from sqlalchemy import delete
+
+from data_models import Movie, MovieRecommendation
+
+SOURCE = 'ai'
+
+AI_RECOMMENDATION_TTL = int(os.getenv('AI_RECOMMENDATION_TTL', str(7 * 24 * 3600)))
+
+# Seconds after which a pending or failed recommendation is requested again
+PENDING_TIMEOUT = 300
+FAILED_RETRY = 600
+
+# status is 'ready', 'pending' or 'failed'; movie and reason are only set when ready
+AIRecommendation = namedtuple('AIRecommendation', ['status', 'movie', 'reason'])
+
+
+def correct_rating(raw_rating: float) -> float:
+    """Map implausible ratings of AI/OMDB answers onto the 0-10 scale."""
+    if raw_rating > 1000000:  # Extremely high values like IMDB ids
+        return 7.5
+    if raw_rating > 10:
+        return min(raw_rating / 10, 10.0)
+    if raw_rating < 1:
+        return 6.5  # Default rating for unknown movies
+    return min(raw_rating, 10.0)
+
+
+def parse_ai_response(response: Optional[Dict]):
+    """Extract (movie data, reason) from the old ('movie' key) or flat response format."""
+    if not response:
+        return None, None
+    if 'movie' in response:
+        movie_data = response['movie']
+        reason = response.get('reasoning') or response.get('reason')
+    elif 'title' in response:
+        movie_data = {
+            'title': response.get('title'),
+            'year': response.get('year'),
+            'director': response.get('director'),
+            'genre': response.get('genre'),
+            'plot': response.get('plot') or response.get('description'),
+            'poster': response.get('poster'),
+            'imdb': response.get('imdb') or response.get('rating', 0)
+        }
+        reason = response.get('explanation')
+    else:
+        return None, None
+    if not movie_data or not movie_data.get('title') or 'error' in movie_data:
+        return None, None
+    return movie_data, reason or 'KI-Empfehlung'
+
+
+class AIRecommendationService:
+    """Stores AI recommendations per movie and generates them in the background."""
+
+    def __init__(self, data_manager, ai_client, ttl: int = AI_RECOMMENDATION_TTL, max_workers: int = 2):
+        self.data_manager = data_manager
+        self.ai_client = ai_client
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-recommendations')
+        self._lock = Lock()
+        self._inflight: Set[int] = set()
+
+    def get(self, session, movie_id: int) -> AIRecommendation:
+        """
+        Stored recommendation of a movie, never blocking on the AI.
+
+        Schedules a generation when there is none yet or it has expired.
+        """
+        now = datetime.utcnow()
+        rows = session.query(MovieRecommendation).filter(
+            MovieRecommendation.source == SOURCE,
+            MovieRecommendation.source_movie_id == movie_id
+        ).order_by(MovieRecommendation.recommended_at.desc(), MovieRecommendation.id.desc()).all()
+
+        ready = next((row for row in rows if row.status == 'ready' and row.movie is not None), None)
+        current = rows[0] if rows else None
+        if current is None or current.expires_at is None or current.expires_at <= now:
+            self.request(movie_id)
+            status = 'pending'
+        else:
+            status = current.status
+
+        if ready is not None:
+            return AIRecommendation('ready', ready.movie, ready.reason)
+        return AIRecommendation(status, None, None)
+
+    def request(self, movie_id: int, force: bool = False) -> bool:
+        """
+        Queue the generation of a movie's recommendation.
+
+        Without force, movies that are already pending (in any worker) are
+        skipped. Returns whether a job was queued.
+        """
+        with self._lock:
+            if movie_id in self._inflight:
+                return False
+            self._inflight.add(movie_id)
+
+        try:
+            now = datetime.utcnow()
+            # Own transaction: committing must not touch (or expire) the objects of the page view
+            with self.data_manager.get_session() as session:
+                pending = session.query(MovieRecommendation.id).filter(
+                    MovieRecommendation.source == SOURCE,
+                    MovieRecommendation.source_movie_id == movie_id,
+                    MovieRecommendation.status == 'pending',
+                    MovieRecommendation.expires_at > now
+                ).first()
+                if pending is not None and not force:
+                    self._done(movie_id)
+                    return False
+
+                self._clear_markers(session, movie_id)
+                session.add(MovieRecommendation(source=SOURCE, source_movie_id=movie_id, status='pending',
+                                                recommended_at=now,
+                                                expires_at=now + timedelta(seconds=PENDING_TIMEOUT)))
+
+            self._executor.submit(self._generate, movie_id)
+            return True
+        except Exception as e:
+            print(f"Error queueing AI recommendation for movie {movie_id}: {e}")
+            self._done(movie_id)
+            return False
+
+    def _done(self, movie_id: int) -> None:
+        with self._lock:
+            self._inflight.discard(movie_id)
+
+    @staticmethod
+    def _clear_markers(session, movie_id: int) -> None:
+        """Delete the pending and failed rows of a movie, ready ones stay visible."""
+        session.execute(delete(MovieRecommendation).where(
+            MovieRecommendation.source == SOURCE,
+            MovieRecommendation.source_movie_id == movie_id,
+            MovieRecommendation.status != 'ready'
+        ))
+
+    def _generate(self, movie_id: int) -> None:
+        """Background job: ask the AI and store the result, or a failed marker."""
+        try:
+            with self.data_manager.SessionFactory() as session:
+                movie = session.get(Movie, movie_id)
+                if movie is None:
+                    self._clear_markers(session, movie_id)
+                    session.commit()
+                    return
+                movie_info = (f"Title: {movie.title}, Genre: {movie.genre}, "
+                              f"Year: {movie.release_year}, Rating: {movie.rating}")
+                # A refresh (expired or forced) must not get the cached answer of the last generation
+                refresh = session.query(MovieRecommendation.id).filter(
+                    MovieRecommendation.source == SOURCE,
+                    MovieRecommendation.source_movie_id == movie_id,
+                    MovieRecommendation.status == 'ready'
+                ).first() is not None
+
+            # No session (and connection) is held during the AI round trip
+            movie_data, reason = parse_ai_response(self.ai_client.ai_request(movie_info, refresh=refresh))
+            if movie_data is None:
+                raise ValueError("AI response contains no movie")
+
+            now = datetime.utcnow()
+            with self.data_manager.SessionFactory() as session:
+                recommended = self._find_or_create_movie(session, movie_data)
+                session.execute(delete(MovieRecommendation).where(
+                    MovieRecommendation.source == SOURCE,
+                    MovieRecommendation.source_movie_id == movie_id
+                ))
+                session.add(MovieRecommendation(source=SOURCE, source_movie_id=movie_id, movie_id=recommended.id,
+                                                reason=reason, status='ready', recommended_at=now,
+                                                expires_at=now + timedelta(seconds=self.ttl)))
+                session.commit()
+        except Exception as e:
+            print(f"Error generating AI recommendation for movie {movie_id}: {e}")
+            self._mark_failed(movie_id)
+        finally:
+            self._done(movie_id)
+
+    def _mark_failed(self, movie_id: int) -> None:
+        now = datetime.utcnow()
+        try:
+            with self.data_manager.SessionFactory() as session:
+                self._clear_markers(session, movie_id)
+                session.add(MovieRecommendation(source=SOURCE, source_movie_id=movie_id, status='failed',
+                                                recommended_at=now,
+                                                expires_at=now + timedelta(seconds=FAILED_RETRY)))
+                session.commit()
+        except Exception as e:
+            print(f"Error storing failed AI recommendation for movie {movie_id}: {e}")
+
+    @staticmethod
+    def _find_or_create_movie(session, movie_data: Dict) -> Movie:
+        """The recommended movie from the database, added with a corrected rating if unknown."""
+        movie = session.query(Movie).filter(Movie.title.ilike(movie_data['title'])).first()
+        if movie:
+            return movie
+
+        raw_rating = float(movie_data.get('imdb', 0)) if movie_data.get('imdb') else 0
+        year = str(movie_data.get('year') or '')[:4]
+        movie = Movie(
+            title=movie_data['title'],
+            release_year=int(year) if year.isdigit() else None,
+            director=movie_data.get('director', 'Unknown'),
+            genre=movie_data.get('genre', 'Drama'),
+            plot=movie_data.get('plot', f"Ein Film aus dem Jahr {movie_data.get('year', 'unbekannt')}."),
+            poster_url=movie_data.get('poster'),
+            rating=correct_rating(raw_rating),
+            country=movie_data.get('country')
+        )
+        session.add(movie)
+        session.flush()
+        print(f"AI movie added: {movie.title} with corrected rating {movie.rating} (original: {raw_rating})")
+        return movie
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the worker threads (e.g. in tests)."""
+        self._executor.shutdown(wait=wait)
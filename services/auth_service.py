@@ -1,11 +1,24 @@
 """Service for user authentication."""
-from typing import Optional
+from typing import Optional, Set
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import LoginManager, UserMixin
 from data_models import User
 from datamanager.sqlite_data_manager import SQliteDataManager
+from services.cache_service import LRUCache
+from services.cache_invalidation import add_tag_listener
 import os
 
+# Per-worker cache of loaded users, so authenticated requests skip the user query
+USER_CACHE_TIMEOUT = int(os.getenv('USER_CACHE_TIMEOUT', '60'))
+user_cache = LRUCache(default_timeout=USER_CACHE_TIMEOUT, max_entries=1024)
+
+
+def _evict_users(tags: Set[str]) -> None:
+    """Drop cached users whose rows changed in a committed transaction."""
+    for tag in tags:
+        if tag.startswith('user:'):
+            user_cache.delete(tag.split(':', 1)[1])
+
 
 class AuthService:
     """Service for handling user authentication and authorization."""
@@ -25,7 +38,7 @@ class AuthService:
 
     def register_user(self, username: str, email: str, password: str) -> Optional[User]:
         """Register a new user."""
-        with self.data_manager.SessionFactory() as session:
+        with self.data_manager.session_scope() as session:
             if session.query(User).filter(
                 (User.username == username) | (User.email == email)
             ).first():
@@ -47,7 +60,7 @@ class AuthService:
 
     def authenticate_user(self, email: str, password: str) -> Optional[User]:
         """Authenticate a user."""
-        with self.data_manager.SessionFactory() as session:
+        with self.data_manager.session_scope() as session:
             user = session.query(User).filter_by(email=email).first()
             if user and self.verify_password(password, user.password_hash):
                 return user
@@ -55,7 +68,7 @@ class AuthService:
 
     def change_password(self, user_id: int, old_password: str, new_password: str) -> bool:
         """Change a user's password."""
-        with self.data_manager.SessionFactory() as session:
+        with self.data_manager.session_scope() as session:
             user = session.query(User).get(user_id)
             if not user or not self.verify_password(old_password, user.password_hash):
                 return False
@@ -65,23 +78,27 @@ class AuthService:
             return True
 
 
-def init_login_manager(app):
-    """Initialize and configure the login manager."""
+def init_login_manager(app, data_manager: SQliteDataManager):
+    """Initialize and configure the login manager using the app's data manager."""
     login_manager = LoginManager()
     login_manager.init_app(app)
     login_manager.login_view = 'login'
     login_manager.login_message = 'Please log in to access this page.'
     login_manager.login_message_category = 'info'
 
+    add_tag_listener(_evict_users)
+
     @login_manager.user_loader
     def load_user(user_id):
-        from data_models import User
-        from datamanager.sqlite_data_manager import SQliteDataManager
-        import os
+        user = user_cache.get(str(user_id))
+        if user is not None:
+            return user
 
-        db_url = os.getenv('DATABASE_URL', 'postgresql://localhost/movie_app_postgres')
-        data_manager = SQliteDataManager(db_url)
+        # Own short-lived session: the cached user must not stay attached to a request session
         with data_manager.SessionFactory() as session:
-            return session.query(User).get(int(user_id))
+            user = session.get(User, int(user_id))
+        if user is not None:
+            user_cache.set(str(user_id), user)
+        return user
 
     return login_manager
@@ -0,0 +1,75 @@
+"""
+bootstrap.py - One-time database bootstrap
+
+Creates the schema and seeds the achievement catalog only when the stored
+schema version differs from the code's version, and at most once per process
+and database. Every further data manager for the same database reuses the
+in-memory achievement map.
+"""
+import hashlib
+import json
+from threading import Lock
+from typing import Dict, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from data_models import Base, AppMeta, MovieGenre
+from services.achievement_service import ACHIEVEMENT_CATALOG, AchievementRef, load_achievement_refs, seed_achievements
+from services.genre_service import backfill_movie_genres
+from services.search_service import SEARCH_INDEX_VERSION, install_search_index
+
+SCHEMA_VERSION_KEY = 'schema_version'
+
+_bootstrapped: Dict[str, Dict[str, AchievementRef]] = {}
+_lock = Lock()
+
+
+def schema_version() -> str:
+    """Version derived from the mapped tables, the achievement catalog and the search index."""
+    payload = json.dumps({
+        'tables': sorted(Base.metadata.tables),
+        'achievements': ACHIEVEMENT_CATALOG,
+        'search_index': SEARCH_INDEX_VERSION
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _stored_version(engine: Engine, session) -> Optional[str]:
+    """Read the bootstrapped version, None for a fresh database."""
+    if not inspect(engine).has_table(AppMeta.__tablename__):
+        return None
+    meta = session.get(AppMeta, SCHEMA_VERSION_KEY)
+    return meta.value if meta else None
+
+
+def bootstrap_database(engine: Engine, session_factory, force: bool = False) -> Dict[str, AchievementRef]:
+    """
+    Bring the database up to the current version and return the achievement map.
+
+    In-memory SQLite databases are never remembered, since every engine
+    opens a different database.
+    """
+    key = engine.url.render_as_string(hide_password=True)
+    remember = engine.url.database not in (None, '', ':memory:')
+
+    with _lock:
+        if remember and not force and key in _bootstrapped:
+            return _bootstrapped[key]
+
+        version = schema_version()
+        with session_factory() as session:
+            if force or _stored_version(engine, session) != version:
+                Base.metadata.create_all(engine)
+                install_search_index(engine)
+                added = seed_achievements(session)
+                if session.query(MovieGenre).first() is None:
+                    backfill_movie_genres(session)
+                session.merge(AppMeta(key=SCHEMA_VERSION_KEY, value=version))
+                session.commit()
+                print(f"Database bootstrapped to version {version} ({added} achievements added)")
+            refs = load_achievement_refs(session)
+
+        if remember:
+            _bootstrapped[key] = refs
+        return refs
@@ -0,0 +1,92 @@
+"""
+Event-driven cache invalidation.
+
+Listens to SQLAlchemy session events and invalidates the cache tags that
+depend on the rows written in a transaction. Tags are collected on flush and
+only purged after a successful commit, so a rolled back transaction leaves
+the cache untouched.
+"""
+from typing import Callable, Dict, Iterable, List, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from data_models import (Movie, User, Review, WatchlistItem, QuizAttempt, QuizQuestion,
+                         UserMovie, UserAchievement, MovieActor, MovieRecommendation, Genre)
+from services.cache_service import invalidate_tags
+
+
+def _recommendation_tags(recommendation) -> List[str]:
+    """Per-user (collaborative) rows feed the recommendation caches; AI rows only concern their movie."""
+    if recommendation.user_id is None:
+        return [f'ai_recommendation:{recommendation.source_movie_id}']
+    return ['recommendations', f'recommendations:{recommendation.user_id}']
+
+# Which cache tags depend on which model. Cached functions declare the same
+# tags, e.g. @cached(tags=['movie:{movie_id}']).
+INVALIDATION_RULES: Dict[type, Callable[[object], Iterable[str]]] = {
+    Movie: lambda movie: ['movies', 'genres', f'movie:{movie.id}'],
+    MovieActor: lambda link: [f'movie:{link.movie_id}'],
+    Genre: lambda genre: ['genres'],
+    User: lambda user: ['users', f'user:{user.id}'],
+    Review: lambda review: ['reviews', f'movie:{review.movie_id}', f'user:{review.user_id}'],
+    WatchlistItem: lambda item: ['watchlists', f'movie:{item.movie_id}', f'user:{item.user_id}'],
+    QuizAttempt: lambda attempt: ['highscores', f'quiz:{attempt.movie_id}', f'user:{attempt.user_id}'],
+    QuizQuestion: lambda question: [f'quiz:{question.movie_id}'],
+    UserMovie: lambda user_movie: [f'movie:{user_movie.movie_id}', f'user:{user_movie.user_id}'],
+    UserAchievement: lambda earned: [f'user:{earned.user_id}'],
+    MovieRecommendation: _recommendation_tags,
+}
+
+_PENDING_TAGS = 'pending_cache_tags'
+
+# Callbacks for process-local caches that are not managed by cached()
+_tag_listeners: List[Callable[[Set[str]], None]] = []
+
+
+def tags_for(instance) -> List[str]:
+    """Get the cache tags affected by a changed model instance."""
+    rule = INVALIDATION_RULES.get(type(instance))
+    return list(rule(instance)) if rule else []
+
+
+def _collect_tags(session, flush_context) -> None:
+    """Remember the tags of everything written in this flush."""
+    pending: Set[str] = session.info.setdefault(_PENDING_TAGS, set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        pending.update(tags_for(instance))
+
+
+def add_tag_listener(callback: Callable[[Set[str]], None]) -> None:
+    """Call callback with the invalidated tags after every commit."""
+    if callback not in _tag_listeners:
+        _tag_listeners.append(callback)
+
+
+def _purge_tags(session) -> None:
+    """Invalidate the collected tags once the transaction is committed."""
+    pending = session.info.pop(_PENDING_TAGS, None)
+    if pending:
+        try:
+            invalidate_tags(*pending)
+            for callback in _tag_listeners:
+                callback(pending)
+        except Exception as e:
+            print(f"Error invalidating cache tags {sorted(pending)}: {e}")
+
+
+def _discard_tags(session) -> None:
+    """Nothing was persisted, so nothing has to be invalidated."""
+    session.info.pop(_PENDING_TAGS, None)
+
+
+def register_cache_invalidation(session_class=Session) -> None:
+    """Subscribe the invalidation handlers to the session events (idempotent)."""
+    listeners = [
+        ('after_flush', _collect_tags),
+        ('after_commit', _purge_tags),
+        ('after_rollback', _discard_tags),
+    ]
+    for name, handler in listeners:
+        if not event.contains(session_class, name, handler):
+            event.listen(session_class, name, handler)
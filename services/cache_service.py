@@ -1,59 +1,605 @@
 """Cache service for better performance."""
+from abc import ABC, abstractmethod
+from collections import OrderedDict, namedtuple
+from datetime import date, datetime
 from functools import wraps
+from multiprocessing.connection import Client, Listener
+from urllib.parse import urlparse
+import hashlib
+import inspect
+import json
+import math
+import multiprocessing
+import os
+import pickle
+import random
+import sys
+import threading
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
 
+from sqlalchemy import inspect as sa_inspect
 
-class SimpleCache:
-    """Simple in-memory cache implementation."""
 
-    def __init__(self, default_timeout: int = 300):
-        self._cache: Dict[str, Dict[str, Any]] = {}
+class CacheBackend(ABC):
+    """Abstract base class for cache backends used by the cached decorator."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from cache, None if missing or expired."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        """Set value in cache; None uses the default timeout, 0 or less stores nothing."""
+        pass
+
+    @abstractmethod
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        """Set value only if the key is not present. Returns True if it was set."""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Delete value from cache."""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Clear all cache entries."""
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Get cache statistics."""
+        pass
+
+
+class LRUCache(CacheBackend):
+    """
+    Bounded in-memory cache with LRU eviction and TTL expiry.
+
+    The cache is limited both by the number of entries and by the approximate
+    size of the stored values. Expired entries are removed when they are read
+    and by a periodic sweep that runs as part of regular cache operations.
+    """
+
+    def __init__(self, default_timeout: int = 300, max_entries: int = 1024,
+                 max_bytes: int = 64 * 1024 * 1024, sweep_interval: int = 60):
+        self._cache: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._lock = threading.RLock()
         self.default_timeout = default_timeout
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._total_bytes = 0
+        self._last_sweep = time.monotonic()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    @staticmethod
+    def _size_of(value: Any) -> int:
+        """Estimate the memory footprint of a value in bytes."""
+        try:
+            return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return sys.getsizeof(value)
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._cache.pop(key)
+        self._total_bytes -= size
+
+    def _sweep(self, now: float) -> None:
+        """Drop all expired entries."""
+        expired = [key for key, (_, expires, _) in self._cache.items() if expires <= now]
+        for key in expired:
+            self._remove(key)
+        self._stats['expirations'] += len(expired)
+        self._last_sweep = time.monotonic()
+
+    def _maybe_sweep(self) -> None:
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self._sweep(time.time())
+
+    def _evict(self) -> None:
+        """Evict least recently used entries until both limits are met."""
+        while self._cache and (len(self._cache) > self.max_entries or
+                               self._total_bytes > self.max_bytes):
+            oldest_key = next(iter(self._cache))
+            self._remove(oldest_key)
+            self._stats['evictions'] += 1
 
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache."""
-        if key in self._cache:
-            data = self._cache[key]
-            if time.time() < data['expires']:
-                return data['value']
-            else:
-                del self._cache[key]
-        return None
+        with self._lock:
+            self._maybe_sweep()
+            entry = self._cache.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            value, expires, _ = entry
+            if time.time() >= expires:
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._cache.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
 
     def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
-        """Set value in cache."""
-        timeout = timeout or self.default_timeout
-        self._cache[key] = {
-            'value': value,
-            'expires': time.time() + timeout
-        }
+        """
+        Set value in cache.
+
+        None uses default_timeout; a timeout of 0 or less means "do not
+        cache": nothing is stored and an older value of the key is dropped.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        size = self._size_of(value)
+
+        with self._lock:
+            self._maybe_sweep()
+            if key in self._cache:
+                self._remove(key)
+
+            # Values larger than the whole budget are never stored
+            if timeout <= 0 or size > self.max_bytes:
+                return
+
+            self._cache[key] = (value, time.time() + timeout, size)
+            self._total_bytes += size
+            self._evict()
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        """Set value only if the key is missing or expired."""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.time() < entry[1]:
+                return False
+            self.set(key, value, timeout)
+            return True
 
     def delete(self, key: str) -> None:
         """Delete value from cache."""
-        self._cache.pop(key, None)
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
 
     def clear(self) -> None:
         """Clear all cache entries."""
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Get hit, miss and eviction counters together with the current size."""
+        with self._lock:
+            return {
+                **self._stats,
+                'entries': len(self._cache),
+                'bytes': self._total_bytes
+            }
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class CacheServer:
+    """
+    Serves a single LRUCache to other processes over a local socket.
+
+    All gunicorn workers connect to the same server, so they share hits and
+    invalidations. This is a local stand-in for an external cache like Redis.
+    """
+
+    def __init__(self, address, family: str, authkey: bytes, backend: Optional[LRUCache] = None):
+        self.address = address
+        self.family = family
+        self.authkey = authkey
+        self.backend = backend or LRUCache(max_entries=10000, max_bytes=256 * 1024 * 1024)
+        self._listener = None
+
+    def serve_forever(self) -> None:
+        """Accept client connections and answer their requests."""
+        if self.family == 'AF_UNIX' and os.path.exists(self.address):
+            os.unlink(self.address)
+
+        self._listener = Listener(self.address, family=self.family, authkey=self.authkey)
+        while True:
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError, multiprocessing.AuthenticationError):
+                if self._listener is None:
+                    break
+                continue
+            threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+
+    def close(self) -> None:
+        """Stop accepting new connections."""
+        listener, self._listener = self._listener, None
+        if listener:
+            listener.close()
+
+    def _handle(self, connection) -> None:
+        operations = {
+            'get': self.backend.get,
+            'set': self.backend.set,
+            'add': self.backend.add,
+            'delete': self.backend.delete,
+            'clear': self.backend.clear,
+            'stats': self.backend.stats
+        }
+        with connection:
+            while True:
+                try:
+                    operation, args = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    connection.send((True, operations[operation](*args)))
+                except Exception as e:
+                    connection.send((False, str(e)))
+
+
+class SocketCache(CacheBackend):
+    """
+    Client for a CacheServer.
+
+    Each process opens its own connection on first use. If the server is not
+    reachable, reads behave like misses and writes are dropped, so a cache
+    outage never breaks a request.
+    """
+
+    def __init__(self, address, family: str, authkey: bytes, timeout: float = 1.0,
+                 retry_interval: float = 5.0):
+        self.address = address
+        self.family = family
+        self.authkey = authkey
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._connection = None
+        self._pid = None
+        self._retry_after = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Connections must not be shared across forked workers
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection
+        if time.monotonic() < self._retry_after:
+            return None
+        try:
+            self._connection = Client(self.address, family=self.family, authkey=self.authkey)
+            self._pid = os.getpid()
+            return self._connection
+        except (OSError, EOFError) as e:
+            print(f"Cache server not reachable at {self.address}: {e}")
+            self._connection = None
+            self._retry_after = time.monotonic() + self.retry_interval
+            return None
+
+    def _call(self, operation: str, *args, default=None):
+        with self._lock:
+            connection = self._connect()
+            if connection is None:
+                return default
+            try:
+                connection.send((operation, args))
+                if not connection.poll(self.timeout):
+                    raise TimeoutError(f"cache operation '{operation}' timed out")
+                success, result = connection.recv()
+            except (OSError, EOFError, TimeoutError) as e:
+                print(f"Cache error during {operation}: {e}")
+                connection.close()
+                self._connection = None
+                self._retry_after = time.monotonic() + self.retry_interval
+                return default
+            return result if success else default
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from the shared cache."""
+        return self._call('get', key)
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        """Set value in the shared cache."""
+        self._call('set', key, value, timeout)
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        """Set value in the shared cache if the key is missing."""
+        # Without a server there is nothing to coordinate, so the caller may proceed
+        return self._call('add', key, value, timeout, default=True)
+
+    def delete(self, key: str) -> None:
+        """Delete value from the shared cache."""
+        self._call('delete', key)
+
+    def clear(self) -> None:
+        """Clear all entries of the shared cache."""
+        self._call('clear')
 
+    def stats(self) -> Dict[str, int]:
+        """Get statistics of the shared cache."""
+        return self._call('stats', default={})
 
-cache = SimpleCache()
 
+def _parse_cache_url(url: str):
+    """Split a cache URL into listener address and socket family."""
+    parsed = urlparse(url)
+    if parsed.scheme == 'unix':
+        return parsed.path, 'AF_UNIX'
+    if parsed.scheme == 'tcp':
+        return (parsed.hostname or '127.0.0.1', parsed.port or 11311), 'AF_INET'
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+def _cache_authkey() -> bytes:
+    return os.getenv('CACHE_AUTHKEY', os.getenv('SECRET_KEY', 'movieapp-cache')).encode()
+
+
+def create_cache_backend(url: Optional[str] = None) -> CacheBackend:
+    """
+    Create a cache backend from a URL.
+
+    Supported URLs:
+        memory://                  per-process LRUCache (default)
+        unix:///path/to/socket     shared CacheServer on a Unix socket
+        tcp://127.0.0.1:11311      shared CacheServer on a local TCP port
+    """
+    url = url or os.getenv('CACHE_URL', 'memory://')
+    if url.startswith('memory://'):
+        return LRUCache()
+    address, family = _parse_cache_url(url)
+    return SocketCache(address, family, _cache_authkey())
+
+
+def start_cache_server(url: Optional[str] = None) -> Optional[multiprocessing.Process]:
+    """
+    Start a CacheServer in a separate process.
+
+    Meant to be called once in the gunicorn master before the workers are
+    forked. Returns None for the in-memory backend.
+    """
+    url = url or os.getenv('CACHE_URL', 'memory://')
+    if url.startswith('memory://'):
+        return None
+
+    address, family = _parse_cache_url(url)
+    server = CacheServer(address, family, _cache_authkey())
+    process = multiprocessing.Process(target=server.serve_forever, name='cache-server', daemon=True)
+    process.start()
+    return process
+
+
+def configure_cache(backend: CacheBackend) -> None:
+    """Replace the backend used by the cached decorator."""
+    global cache
+    cache = backend
+
+
+cache = create_cache_backend()
+
+# Cached results are wrapped with their logical expiry and the time it took
+# to compute them, which drives stale serving and early refresh. The wrapper
+# also acts as the sentinel that tells a cached None apart from a miss, and
+# remembers the versions of the tags the result depends on.
+CacheEntry = namedtuple('CacheEntry', ['value', 'expires', 'delta', 'tags'], defaults=(None,))
+
+# Tag versions live in the cache itself, so invalidations reach every worker
+# that shares the backend
+TAG_VERSION_TIMEOUT = 30 * 24 * 3600
+
+
+def _tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+
+def _tag_versions(tags: Iterable[str]) -> Dict[str, str]:
+    """Get the current version of each tag, creating missing versions."""
+    versions = {}
+    for tag in tags:
+        version = cache.get(_tag_key(tag))
+        if version is None:
+            version = os.urandom(8).hex()
+            if not cache.add(_tag_key(tag), version, TAG_VERSION_TIMEOUT):
+                version = cache.get(_tag_key(tag))
+        versions[tag] = version
+    return versions
+
+
+def _is_current(entry: Optional[CacheEntry]) -> bool:
+    """Check that none of the tags of an entry were invalidated since it was stored."""
+    if entry is None:
+        return False
+    if not entry.tags:
+        return True
+    return all(cache.get(_tag_key(tag)) == version for tag, version in entry.tags.items())
+
+
+def invalidate_tags(*tags: str) -> None:
+    """Invalidate all cached results that depend on one of the given tags."""
+    for tag in tags:
+        cache.set(_tag_key(tag), os.urandom(8).hex(), TAG_VERSION_TIMEOUT)
+
+
+def _key_part(value: Any) -> Any:
+    """
+    Convert a function argument into a stable, JSON serializable form.
+
+    ORM instances are represented by their class and primary key instead of
+    their repr, so the same row always produces the same key.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_key_part(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_key_part(item) for item in value), key=json.dumps)
+    if isinstance(value, dict):
+        return {str(key): _key_part(item) for key, item in value.items()}
+
+    state = sa_inspect(value, raiseerr=False)
+    if state is not None and getattr(state, 'identity', None) is not None:
+        return f"{type(value).__name__}:{_key_part(state.identity)}"
+
+    raise TypeError(
+        f"Cannot build a stable cache key from {type(value).__name__}; "
+        f"use key_func or ignore_args"
+    )
+
+
+def make_cache_key(func: Callable, args: tuple, kwargs: dict, key_prefix: str = "",
+                   ignore_args: Iterable[str] = (), key_func: Optional[Callable] = None) -> str:
+    """
+    Build a deterministic cache key for a function call.
+
+    Arguments are bound to the function signature, so positional and keyword
+    calls produce the same key. A leading self/cls argument is never part of
+    the key. The key is identical across processes and restarts.
+    """
+    if key_func is not None:
+        parts = key_func(*args, **kwargs)
+    else:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        ignored = set(ignore_args) | {'self', 'cls'}
+        parts = {name: value for name, value in bound.arguments.items() if name not in ignored}
+
+    payload = json.dumps(_key_part(parts), sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return f"{key_prefix}:{func.__module__}.{func.__qualname__}:{digest}"
+
+
+def _should_refresh(entry: CacheEntry, early_refresh: float) -> bool:
+    """
+    Decide whether an entry has to be recomputed.
+
+    With early_refresh > 0 an entry is refreshed before it expires with a
+    probability that grows as expiry approaches and with the cost of the
+    computation (probabilistic early expiration), so not all workers see the
+    entry expire at the same moment.
+    """
+    now = time.time()
+    if early_refresh > 0:
+        now -= entry.delta * early_refresh * math.log(1.0 - random.random())
+    return now >= entry.expires
+
+
+def cached(timeout: int = 300, key_prefix: str = "", key_func: Optional[Callable] = None,
+           ignore_args: Iterable[str] = (), stale_ttl: int = 0, early_refresh: float = 0.0,
+           lock_timeout: int = 30, negative_timeout: int = 60,
+           negative_when: Optional[Callable[[Any], bool]] = None,
+           tags: Union[Iterable[str], Callable[..., Iterable[str]]] = ()):
+    """
+    Decorator for caching function results.
+
+    Args:
+        timeout: Lifetime of a cached result in seconds
+        key_prefix: Prefix for all keys of this function
+        key_func: Optional callable receiving the call arguments and returning
+            the values the key is derived from
+        ignore_args: Names of arguments that are not part of the key
+        stale_ttl: How long an expired result may still be served while
+            another caller recomputes it
+        early_refresh: Weight of the probabilistic early refresh, 0 disables
+            it and 1.0 is a sensible default for expensive queries
+        lock_timeout: Maximum time a recomputation holds the lock
+        negative_timeout: Lifetime of negative results (None, empty results
+            or results matching negative_when), usually shorter than timeout
+        negative_when: Optional predicate marking additional results as
+            negative, e.g. error responses of an external API
+        tags: Tags the result depends on. Tags may reference arguments
+            ("movie:{movie_id}") or be a callable receiving the call
+            arguments. invalidate_tags() drops every result with that tag.
+
+    Only one caller at a time recomputes a missing or expired result, across
+    all workers that share the cache backend. The others get the stale value
+    if there is one, or wait for the new result.
+
+    The wrapped function gets an invalidate(*args, **kwargs) helper that
+    removes the cached result for the given arguments.
+    """
+    ignore_args = tuple(ignore_args)
 
-def cached(timeout: int = 300, key_prefix: str = ""):
-    """Decorator for caching function results."""
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            cache_key = f"{key_prefix}:{func.__name__}:{hash(str(args) + str(kwargs))}"
+        signature = inspect.signature(func)
+
+        def cache_key(*args, **kwargs) -> str:
+            return make_cache_key(func, args, kwargs, key_prefix, ignore_args, key_func)
 
-            result = cache.get(cache_key)
-            if result is not None:
-                return result
+        def resolve_tags(args: tuple, kwargs: dict) -> Tuple[str, ...]:
+            if callable(tags):
+                return tuple(tags(*args, **kwargs))
+            if not tags:
+                return ()
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return tuple(tag.format(**bound.arguments) for tag in tags)
 
+        def is_negative(result) -> bool:
+            if result is None or (not result and isinstance(result, (str, bytes, list, tuple, dict, set))):
+                return True
+            return bool(negative_when and negative_when(result))
+
+        def compute(key: str, args: tuple, kwargs: dict):
+            # Snapshot the tag versions first, so an invalidation that happens
+            # while computing marks this result as outdated
+            versions = _tag_versions(resolve_tags(args, kwargs))
+            started = time.time()
             result = func(*args, **kwargs)
-            cache.set(cache_key, result, timeout)
+            lifetime = min(negative_timeout, timeout) if is_negative(result) else timeout
+            entry = CacheEntry(result, time.time() + lifetime, time.time() - started, versions)
+            cache.set(key, entry, lifetime + stale_ttl)
             return result
+
+        def wait_for(key: str) -> Optional[CacheEntry]:
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = cache.get(key)
+                if not _is_current(entry):
+                    entry = None
+                if entry is not None and time.time() < entry.expires:
+                    return entry
+                if cache.get(f"{key}:lock") is None:
+                    return entry
+            return None
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = cache_key(*args, **kwargs)
+
+            entry = cache.get(key)
+            if not _is_current(entry):
+                entry = None
+            if entry is not None and not _should_refresh(entry, early_refresh):
+                return entry.value
+
+            lock_key = f"{key}:lock"
+            if cache.add(lock_key, os.getpid(), lock_timeout):
+                try:
+                    return compute(key, args, kwargs)
+                finally:
+                    cache.delete(lock_key)
+
+            # Someone else is recomputing: serve the old value if we have one
+            if entry is not None:
+                return entry.value
+
+            entry = wait_for(key)
+            if entry is not None:
+                return entry.value
+            return compute(key, args, kwargs)
+
+        def invalidate(*args, **kwargs) -> None:
+            """Remove the cached result for these arguments."""
+            cache.delete(cache_key(*args, **kwargs))
+
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = invalidate
         return wrapper
     return decorator
@@ -0,0 +1,149 @@
+"""
+Normalized movie genres.
+
+Movie.genre stays the human readable string (e.g. "Action, Thriller"), while
+the genres/movie_genres tables hold one row per genre and link. The links are
+synchronized automatically whenever a movie's genre string is flushed, so
+genre filters can use an indexed join instead of LIKE scans.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, event, func, inspect, insert, or_, select
+from sqlalchemy.orm import Session
+
+from data_models import Genre, Movie, MovieGenre
+
+_GENRE_CACHE = 'genre_by_name'
+
+# Genre preferences of the recommendation forms. Each preference is a list of
+# alternatives (any of these genres, none of those), combined with OR.
+GENRE_PREFERENCES: Dict[str, List[Tuple[Tuple[str, ...], Tuple[str, ...]]]] = {
+    'Action & Spannung': [(('Action', 'Thriller', 'Adventure', 'Sci-Fi'), ())],
+    'Drama & Gefühl': [(('Drama', 'Romance'), ())],
+    'Comedy & Humor': [(('Comedy',), ())],
+    'Horror & Mystery': [
+        (('Horror', 'Mystery'), ()),
+        (('Thriller',), ('Action', 'Comedy')),
+    ],
+}
+
+
+def canonical_genre(name: str) -> str:
+    """Trim whitespace and capitalize the first letter of every word."""
+    return ' '.join(word[:1].upper() + word[1:] for word in name.strip().split())
+
+
+def split_genres(genre: Optional[str]) -> List[str]:
+    """Split a genre string like 'Action, Sci-Fi' into unique canonical names."""
+    names: Dict[str, str] = {}
+    for part in re.split(r'[,/|]', genre or ''):
+        name = canonical_genre(part)
+        if name and name.lower() not in names:
+            names[name.lower()] = name
+    return list(names.values())
+
+
+def _get_or_create_genre(session, name: str) -> Genre:
+    """Find a genre case-insensitively or create it (cached per session)."""
+    cache: Dict[str, Genre] = session.info.setdefault(_GENRE_CACHE, {})
+    key = name.lower()
+    genre = cache.get(key)
+    if genre is None or genre not in session:
+        genre = session.query(Genre).filter(func.lower(Genre.name) == key).first()
+        if genre is None:
+            genre = Genre(name=name)
+            session.add(genre)
+        cache[key] = genre
+    return genre
+
+
+def _sync_genres(session, flush_context, instances) -> None:
+    """Rebuild the genre links of new movies and movies whose genre string changed."""
+    movies = [
+        instance for instance in list(session.new) + list(session.dirty)
+        if isinstance(instance, Movie) and
+        (instance in session.new or inspect(instance).attrs.genre.history.has_changes())
+    ]
+    if not movies:
+        return
+    with session.no_autoflush:
+        for movie in movies:
+            movie.genres = [_get_or_create_genre(session, name) for name in split_genres(movie.genre)]
+
+
+def _clear_genre_cache(session) -> None:
+    """Genres created in a rolled back transaction must not be reused."""
+    session.info.pop(_GENRE_CACHE, None)
+
+
+def register_genre_sync(session_class=Session) -> None:
+    """Keep movie_genres in sync with Movie.genre on every flush (idempotent)."""
+    listeners = [
+        ('before_flush', _sync_genres),
+        ('after_rollback', _clear_genre_cache),
+    ]
+    for name, handler in listeners:
+        if not event.contains(session_class, name, handler):
+            event.listen(session_class, name, handler)
+
+
+def backfill_movie_genres(session) -> int:
+    """
+    Rebuild all genre links from the genre strings of existing movies.
+
+    Returns the number of links written. The caller commits.
+    """
+    session.execute(MovieGenre.__table__.delete())
+
+    movie_names = [(movie_id, split_genres(genre)) for movie_id, genre in
+                   session.query(Movie.id, Movie.genre).filter(Movie.genre.isnot(None))]
+    with session.no_autoflush:
+        genres = {name.lower(): _get_or_create_genre(session, name)
+                  for _, names in movie_names for name in names}
+    session.flush()
+
+    links = [{'movie_id': movie_id, 'genre_id': genres[name.lower()].id}
+             for movie_id, names in movie_names for name in names]
+    if links:
+        session.execute(insert(MovieGenre), links)
+    return len(links)
+
+
+def movies_with_genres(names: Iterable[str], excluded: Sequence[str] = ()):
+    """
+    Filter clause: movie has any of the genres and none of the excluded ones.
+
+    Names are matched case-insensitively against the small genres table;
+    the movies are then read from the (genre_id, movie_id) index of
+    movie_genres.
+    """
+    def linked(genre_names):
+        return Movie.id.in_(
+            select(MovieGenre.movie_id)
+            .join(Genre, Genre.id == MovieGenre.genre_id)
+            .where(func.lower(Genre.name).in_([name.strip().lower() for name in genre_names]))
+        )
+
+    clause = linked(names)
+    if excluded:
+        clause = and_(clause, ~linked(excluded))
+    return clause
+
+
+def genre_preference_filter(preference: str):
+    """Filter clause for a recommendation preference like 'Action & Spannung', or None."""
+    for label, alternatives in GENRE_PREFERENCES.items():
+        if label in preference:
+            return or_(*(movies_with_genres(names, excluded) for names, excluded in alternatives))
+    return None
+
+
+def genre_counts(session) -> List[dict]:
+    """All genres with their number of movies, most common first."""
+    rows = session.query(Genre.name, func.count(MovieGenre.movie_id).label('count')) \
+        .join(MovieGenre, MovieGenre.genre_id == Genre.id) \
+        .group_by(Genre.id, Genre.name) \
+        .order_by(func.count(MovieGenre.movie_id).desc(), Genre.name) \
+        .all()
+    return [{'name': name, 'count': count} for name, count in rows]
@@ -0,0 +1,175 @@
+"""
+Persistent cache for language model responses.
+
+Identical prompts (the recommendation prompt of the same movie, the quiz
+prompt of the same title and difficulty, ...) are answered from the
+llm_responses table instead of paying the model's latency and cost again.
+Entries are addressed by a SHA-256 hash of (model, generation settings,
+prompt), since temperature, output budget and response mode all shape the
+answer. They expire after a TTL and the table is kept below max_entries by
+deleting the least recently used rows. Because the cache lives in the
+database it is shared by all workers and survives restarts.
+
+Cache failures never break a model call: they are counted and the model is
+asked directly.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, delete, select, update
+from sqlalchemy.orm import sessionmaker
+
+from data_models import LLMResponse
+
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(30 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))
+
+# Larger responses are not stored
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(64 * 1024)))
+
+# The size limit is enforced every this many writes
+PRUNE_INTERVAL = 50
+
+
+def response_key(model: str, prompt: str, settings: Any) -> str:
+    """
+    Content address of a prompt: identical inputs give the same key.
+
+    settings are the generation settings (e.g. a dict of the effective
+    config, or just a temperature); they must be JSON serializable.
+    """
+    payload = json.dumps({'model': model, 'settings': settings, 'prompt': prompt}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """Database-backed response cache with TTL, size limit and hit/miss counters."""
+
+    def __init__(self, url: Optional[str] = None, ttl: int = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 engine=None):
+        self.url = url
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._engine = engine
+        self._session_factory = None
+        self._lock = Lock()
+        self._writes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'skipped': 0, 'errors': 0}
+
+    def _sessions(self):
+        """Create the engine and the table on first use (retried after failures)."""
+        if self._session_factory is None:
+            with self._lock:
+                if self._session_factory is None:
+                    engine = self._engine or create_engine(self.url, pool_pre_ping=True)
+                    LLMResponse.__table__.create(engine, checkfirst=True)
+                    self._engine = engine
+                    self._session_factory = sessionmaker(bind=engine)
+        return self._session_factory
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def get(self, model: str, prompt: str, settings: Any = None) -> Optional[str]:
+        """Cached response for the prompt, or None."""
+        key = response_key(model, prompt, settings)
+        now = datetime.utcnow()
+        try:
+            with self._sessions()() as session:
+                text = session.execute(select(LLMResponse.response).where(
+                    LLMResponse.key == key, LLMResponse.expires_at > now
+                )).scalar()
+                if text is not None:
+                    session.execute(update(LLMResponse).where(LLMResponse.key == key).values(
+                        hits=LLMResponse.hits + 1, last_hit_at=now
+                    ))
+                    session.commit()
+        except Exception as e:
+            print(f"Error reading LLM response cache: {e}")
+            self._count('errors')
+            return None
+
+        self._count('hits' if text is not None else 'misses')
+        return text
+
+    def set(self, model: str, prompt: str, settings: Any, text: str) -> None:
+        """Store a response, replacing an expired entry of the same prompt."""
+        if not text or len(text.encode('utf-8')) > self.max_bytes:
+            self._count('skipped')
+            return
+
+        key = response_key(model, prompt, settings)
+        now = datetime.utcnow()
+        try:
+            with self._sessions()() as session:
+                session.merge(LLMResponse(key=key, model=model, response=text, created_at=now,
+                                          expires_at=now + timedelta(seconds=self.ttl), last_hit_at=now, hits=0))
+                session.commit()
+        except Exception as e:
+            # E.g. a concurrent insert of the same prompt by another worker
+            print(f"Error writing LLM response cache: {e}")
+            self._count('errors')
+            return
+
+        self._count('writes')
+        with self._lock:
+            self._writes += 1
+            due = self._writes % PRUNE_INTERVAL == 0
+        if due:
+            self.prune()
+
+    def delete(self, model: str, prompt: str, settings: Any = None) -> None:
+        """Forget the response of a prompt."""
+        try:
+            with self._sessions()() as session:
+                session.execute(delete(LLMResponse).where(
+                    LLMResponse.key == response_key(model, prompt, settings)
+                ))
+                session.commit()
+        except Exception as e:
+            print(f"Error deleting from LLM response cache: {e}")
+            self._count('errors')
+
+    def prune(self) -> int:
+        """Delete expired entries and the least recently used ones above max_entries."""
+        try:
+            with self._sessions()() as session:
+                removed = session.execute(delete(LLMResponse).where(
+                    LLMResponse.expires_at <= datetime.utcnow()
+                )).rowcount or 0
+
+                # Keys beyond the newest max_entries by last use
+                stale = select(LLMResponse.key).order_by(
+                    LLMResponse.last_hit_at.desc(), LLMResponse.key
+                ).offset(self.max_entries)
+                removed += session.execute(delete(LLMResponse).where(
+                    LLMResponse.key.in_(stale)
+                ), execution_options={'synchronize_session': False}).rowcount or 0
+                session.commit()
+        except Exception as e:
+            print(f"Error pruning LLM response cache: {e}")
+            self._count('errors')
+            return 0
+
+        self._count('evictions', removed)
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss, write and eviction counters of this process plus the stored entries."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        try:
+            with self._sessions()() as session:
+                stats['entries'] = session.query(LLMResponse).count()
+        except Exception:
+            stats['entries'] = None
+        return stats
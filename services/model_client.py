@@ -0,0 +1,178 @@
+"""
+Guarded calls to the language model.
+
+A slow or hanging Gemini call must not pin a gunicorn worker, and a degraded
+provider must not tie up every worker at once. Every model call therefore
+goes through a process-wide ModelClient that
+
+- runs the call in its own thread pool and stops waiting after a hard
+  deadline,
+- admits at most max_in_flight calls at a time (calls that timed out still
+  count until they actually return),
+- opens a circuit breaker after consecutive failures, so callers fail fast
+  until a single probe call succeeds again, and
+- records latency and outcome counters.
+
+Callers see a ModelUnavailableError, which the AI methods already handle
+like any other API error.
+"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Dict, Optional
+
+AI_TIMEOUT = float(os.getenv('AI_TIMEOUT', '20'))
+AI_MAX_IN_FLIGHT = int(os.getenv('AI_MAX_IN_FLIGHT', '4'))
+
+# Seconds a call waits for a free slot before it is rejected
+AI_QUEUE_TIMEOUT = float(os.getenv('AI_QUEUE_TIMEOUT', '2'))
+
+# Consecutive failures that open the circuit, and seconds until a probe call is allowed
+AI_FAILURE_THRESHOLD = int(os.getenv('AI_FAILURE_THRESHOLD', '5'))
+AI_RESET_TIMEOUT = float(os.getenv('AI_RESET_TIMEOUT', '30'))
+
+# Latencies kept for the percentiles
+LATENCY_SAMPLES = 500
+
+
+class ModelUnavailableError(RuntimeError):
+    """A model call was rejected or did not finish; reason is 'timeout', 'busy' or 'circuit_open'."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class ModelClient:
+    """Deadline, concurrency limit, circuit breaker and metrics for model calls."""
+
+    def __init__(self, timeout: float = AI_TIMEOUT, max_in_flight: int = AI_MAX_IN_FLIGHT,
+                 queue_timeout: float = AI_QUEUE_TIMEOUT, failure_threshold: int = AI_FAILURE_THRESHOLD,
+                 reset_timeout: float = AI_RESET_TIMEOUT):
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._slots = BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='model-calls')
+        self._lock = Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._in_flight = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._stats = {'calls': 0, 'successes': 0, 'errors': 0, 'timeouts': 0, 'rejected_busy': 0,
+                       'rejected_open': 0, 'circuit_opened': 0}
+
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half_open' (the reset timeout has passed, a probe is allowed)."""
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def _admit(self) -> Optional[str]:
+        """
+        Whether the breaker lets a call through: 'call', 'probe' or None.
+
+        In half-open state only one probe at a time is admitted; the token
+        is passed on to _record, so only the probe itself ends the probing.
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            state = self._state()
+            if state == 'closed':
+                return 'call'
+            if state == 'half_open' and not self._probing:
+                self._probing = True
+                return 'probe'
+            self._stats['rejected_open'] += 1
+            return None
+
+    def _record(self, outcome: str, latency: Optional[float] = None, token: str = 'call') -> None:
+        with self._lock:
+            # Calls started before the circuit opened may finish while the probe is still running
+            if token == 'probe':
+                self._probing = False
+            if latency is not None:
+                self._latencies.append(latency)
+            if outcome == 'successes':
+                self._failures = 0
+                self._opened_at = None
+            else:
+                self._failures += 1
+                if self._opened_at is not None or self._failures >= self.failure_threshold:
+                    if self._opened_at is None:
+                        self._stats['circuit_opened'] += 1
+                    # A failed probe keeps the circuit open for another reset timeout
+                    self._opened_at = time.monotonic()
+            self._stats[outcome] += 1
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def call(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        Run func(*args, **kwargs) under the deadline (default self.timeout).
+
+        Raises ModelUnavailableError when the circuit is open, no slot frees
+        up within queue_timeout or the deadline passes; errors of func are
+        re-raised and count as failures.
+        """
+        token = self._admit()
+        if token is None:
+            raise ModelUnavailableError('circuit_open', 'AI provider is unavailable, try again later')
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                if token == 'probe':
+                    self._probing = False
+                self._stats['rejected_busy'] += 1
+            raise ModelUnavailableError('busy', f"More than {self.max_in_flight} AI calls in flight")
+        with self._lock:
+            self._in_flight += 1
+
+        started = time.perf_counter()
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        # The slot is freed when the call really ends, even after its deadline has passed
+        future.add_done_callback(self._release)
+
+        deadline = self.timeout if timeout is None else timeout
+        try:
+            result = future.result(timeout=deadline)
+        except FutureTimeoutError:
+            self._record('timeouts', time.perf_counter() - started, token)
+            raise ModelUnavailableError('timeout', f"AI call exceeded {deadline:.0f}s") from None
+        except Exception:
+            self._record('errors', time.perf_counter() - started, token)
+            raise
+        self._record('successes', time.perf_counter() - started, token)
+        return result
+
+    def stats(self) -> Dict:
+        """Outcome counters, circuit state and latency percentiles (seconds) of this process."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['state'] = self._state()
+            stats['in_flight'] = self._in_flight
+            latencies = sorted(self._latencies)
+        if latencies:
+            stats['latency_p50'] = round(latencies[len(latencies) // 2], 3)
+            stats['latency_p95'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3)
+            stats['latency_max'] = round(latencies[-1], 3)
+        return stats
@@ -0,0 +1,72 @@
+"""
+Random movie sampling without ORDER BY random().
+
+Sorting the whole filtered movie set by random() only to keep a few rows
+gets slower with every movie added. Instead each worker keeps the movie IDs
+of every genre preference in memory, draws k of them with random.sample()
+and loads only those rows by primary key. The cost per request depends on k,
+not on the catalog size.
+
+The ID buckets are loaded on first use, dropped when movies or genres are
+committed and rebuilt after max_age seconds, so commits of other workers are
+picked up as well.
+"""
+import random
+import time
+from threading import RLock
+from typing import Dict, List, Set, Tuple
+
+from data_models import Movie
+from services.cache_invalidation import add_tag_listener
+from services.genre_service import genre_preference_filter
+
+
+class MovieSampler:
+    """Per-preference movie ID buckets for O(k) random picks."""
+
+    def __init__(self, data_manager, max_age: float = 600):
+        self.data_manager = data_manager
+        self.max_age = max_age
+        self._lock = RLock()
+        self._buckets: Dict[str, Tuple[float, List[int]]] = {}
+        add_tag_listener(self._on_commit)
+
+    def _on_commit(self, tags: Set[str]) -> None:
+        """Changed movies or genres make every bucket stale."""
+        if tags & {'movies', 'genres'}:
+            self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def bucket(self, preference: str = '') -> List[int]:
+        """IDs of all movies matching a genre preference (all movies for an unknown one)."""
+        with self._lock:
+            entry = self._buckets.get(preference)
+        if entry is not None and time.time() - entry[0] <= self.max_age:
+            return entry[1]
+
+        with self.data_manager.session_scope() as session:
+            query = session.query(Movie.id)
+            clause = genre_preference_filter(preference) if preference else None
+            if clause is not None:
+                query = query.filter(clause)
+            ids = [row[0] for row in query]
+
+        with self._lock:
+            self._buckets[preference] = (time.time(), ids)
+        return ids
+
+    def sample_ids(self, preference: str = '', k: int = 5) -> List[int]:
+        """Up to k distinct random movie IDs of a genre preference."""
+        ids = self.bucket(preference)
+        return random.sample(ids, min(k, len(ids)))
+
+    def sample(self, session, preference: str = '', k: int = 5) -> List[Movie]:
+        """Up to k random movies, loaded by primary key in the sampled order."""
+        ids = self.sample_ids(preference, k)
+        if not ids:
+            return []
+        movies = {movie.id: movie for movie in session.query(Movie).filter(Movie.id.in_(ids))}
+        return [movies[movie_id] for movie_id in ids if movie_id in movies]
@@ -4,10 +4,11 @@ Movie Update Service - Automatic movie database updates.
 import os
 import requests
 from datetime import datetime, timedelta
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set
 from dotenv import load_dotenv
 from datamanager.sqlite_data_manager import SQliteDataManager
 from data_models import Movie, Actor, MovieActor
+from services.title_index import TitleIndex, TitleMatch, normalize_title, similarity, title_numerals
 
 # Load environment variables
 load_dotenv()
@@ -15,8 +16,15 @@ load_dotenv()
 class MovieUpdateService:
     """Service for automatic movie database updates."""
 
-    def __init__(self, data_manager: SQliteDataManager):
+    # Minimum trigram similarity of two titles to count as the same movie
+    DUPLICATE_THRESHOLD = 0.8
+
+    # Release years of the same movie may differ by this much between sources
+    YEAR_TOLERANCE = 1
+
+    def __init__(self, data_manager: SQliteDataManager, title_index: Optional[TitleIndex] = None):
         self.data_manager = data_manager
+        self.title_index = title_index
         self.tmdb_api_key = os.getenv("TMDB_API_KEY")
         self.omdb_api_key = os.getenv("OMDB_API_KEY")
         self.base_url = "https://api.themoviedb.org/3"
@@ -119,18 +127,44 @@ class MovieUpdateService:
             return []
 
     def is_similar_title(self, title1: str, title2: str, threshold: float = 0.9) -> bool:
-        """Check if two titles are similar."""
-        from difflib import SequenceMatcher
+        """Check if two titles are similar (trigram similarity of the cleaned titles)."""
+        return similarity(self.clean_title(title1), self.clean_title(title2)) >= threshold
 
-        # Clean and normalize both titles
-        clean1 = self.clean_title(title1)
-        clean2 = self.clean_title(title2)
-        norm1 = self.normalize_title(clean1)
-        norm2 = self.normalize_title(clean2)
-
-        # Calculate the similarity
-        similarity = SequenceMatcher(None, norm1, norm2).ratio()
-        return similarity >= threshold
+    def find_duplicate(self, session, title: str, year: Optional[int] = None) -> Optional[Movie]:
+        """
+        Find an existing movie with the same or a very similar title.
+
+        Both titles are compared in full (no cleaning), so 'Star Wars: The
+        Empire Strikes Back' is not taken for 'Star Wars'. Titles with
+        different sequel numbers ('Rocky II' / 'Rocky III') never match,
+        and a fuzzy match also needs release years at most YEAR_TOLERANCE
+        apart. Uses the in-memory title index when available, so no full
+        table scan is needed; falls back to an exact title query otherwise.
+        """
+        if self.title_index is not None:
+            self.title_index.ensure_fresh(
+                lambda: session.query(Movie.id, Movie.title, Movie.release_year).all())
+            match = self.title_index.find_similar(
+                title, self.DUPLICATE_THRESHOLD, accept=lambda match: self._same_movie(title, year, match))
+            return session.get(Movie, match.movie_id) if match else None
+
+        query = session.query(Movie).filter(Movie.title.ilike(title))
+        if year is not None:
+            query = query.filter((Movie.release_year.is_(None)) |
+                                 (Movie.release_year.between(year - self.YEAR_TOLERANCE, year + self.YEAR_TOLERANCE)))
+        return query.first()
+
+    def _same_movie(self, title: str, year: Optional[int], match: TitleMatch) -> bool:
+        """Whether a similar indexed title is really the same movie and not a sequel or remake."""
+        if title_numerals(title) != title_numerals(match.title):
+            return False
+        years_known = year is not None and match.year is not None
+        if years_known and abs(year - match.year) > self.YEAR_TOLERANCE:
+            return False
+        if normalize_title(title) == normalize_title(match.title):
+            return True
+        # A merely similar title is only trusted with a matching year
+        return years_known
 
     def get_actors_from_omdb(self, title: str) -> List[Dict]:
         """Fetch actors from OMDB API."""
@@ -172,13 +206,19 @@ class MovieUpdateService:
         new_movies = self.get_new_movies()
         added_count = 0
 
-        with self.data_manager.SessionFactory() as session:
+        with self.data_manager.session_scope() as session:
             try:
                 for movie_data in new_movies:
-                    # Check if the movie already exists
-                    existing_movie = session.query(Movie).filter_by(
-                        title=movie_data['title']
-                    ).first()
+                    try:
+                        release_date = datetime.strptime(
+                            movie_data.get('release_date', ''),
+                            '%Y-%m-%d'
+                        ).year if movie_data.get('release_date') else None
+                    except ValueError:
+                        release_date = None
+
+                    # Check if the movie (or a near duplicate) already exists
+                    existing_movie = self.find_duplicate(session, movie_data['title'], release_date)
 
                     if not existing_movie:
                         # Fetch additional details from OMDB
@@ -189,13 +229,6 @@ class MovieUpdateService:
                             omdb_data = {}
 
                         # Create a new movie
-                        try:
-                            release_date = datetime.strptime(
-                                movie_data.get('release_date', ''),
-                                '%Y-%m-%d'
-                            ).year if movie_data.get('release_date') else None
-                        except ValueError:
-                            release_date = None
 
                         # Safe conversion of IMDB rating
                         try:
@@ -272,12 +305,10 @@ class MovieUpdateService:
 
     def add_movie(self, title: str) -> Movie:
         """Manually add a single movie."""
-        with self.data_manager.SessionFactory() as session:
+        with self.data_manager.session_scope() as session:
             try:
-                # Check if the movie already exists
-                existing_movie = session.query(Movie).filter(
-                    Movie.title.ilike(f"%{title}%")
-                ).first()
+                # Check if the movie (or a near duplicate) already exists
+                existing_movie = self.find_duplicate(session, title)
 
                 if existing_movie:
                     return existing_movie
@@ -291,6 +322,11 @@ class MovieUpdateService:
                 year = int(movie_data.get('Year', '0').split('–')[0]) if movie_data.get('Year', 'N/A') != 'N/A' else None
                 rating = float(movie_data.get('imdbRating', '0')) if movie_data.get('imdbRating', 'N/A') != 'N/A' else None
 
+                # With the official title and year, near duplicates can be recognized as well
+                existing_movie = self.find_duplicate(session, movie_data.get('Title', title), year)
+                if existing_movie:
+                    return existing_movie
+
                 # Create new movie
                 new_movie = Movie(
                     title=movie_data.get('Title', title),
@@ -355,7 +391,7 @@ class MovieUpdateService:
     def check_for_duplicates(self, title: str, year: int = None) -> bool:
         """Check for duplicate movies in the database."""
         try:
-            with self.data_manager.SessionFactory() as session:
+            with self.data_manager.session_scope() as session:
                 query = session.query(Movie).filter(Movie.title.ilike(f"%{title}%"))
                 if year:
                     query = query.filter(Movie.release_year == year)
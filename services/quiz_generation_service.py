@@ -0,0 +1,319 @@
+"""
+Background generation of quiz questions.
+
+Quiz starts only read the question bank (see QuizService). Pools that are
+empty or running low are filled by a small pool of worker threads that take
+jobs from a priority queue: pools a user is waiting for first, then top-ups
+of pools that are running low, then the prewarm jobs ordered by movie
+popularity. Failed generations are retried with exponential backoff.
+
+The model is pluggable: anything with generate_quiz_questions(movie_context,
+difficulty, exclude) works, e.g. AIRequest or FakeQuizModel for tests and
+local development without an API key. backfill() additionally needs
+generate_quiz_questions_batch(jobs, exclude). exclude holds the questions
+already in a pool, so a top-up asks for new ones.
+"""
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import PriorityQueue
+from threading import Condition, Lock, Thread, Timer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, union_all
+
+from data_models import Movie, QuizAttempt, QuizQuestion, Review, UserMovie
+from services.quiz_service import QuizService
+from utils.rate_limiting import TokenBucket
+
+DIFFICULTIES = ('leicht', 'mittel', 'schwer')
+
+# Queue priorities, lower runs first; prewarm jobs follow in popularity order
+PRIORITY_WAITING = 0
+PRIORITY_TOP_UP = 1
+PRIORITY_PREWARM = 2
+
+QUIZ_GENERATION_WORKERS = int(os.getenv('QUIZ_GENERATION_WORKERS', '2'))
+QUIZ_GENERATION_RETRIES = int(os.getenv('QUIZ_GENERATION_RETRIES', '3'))
+
+# Seconds before the first retry, doubled for every further one
+QUIZ_GENERATION_BACKOFF = float(os.getenv('QUIZ_GENERATION_BACKOFF', '10'))
+
+# Batched backfill: pools per prompt, prompts in flight and the model's request quota
+QUIZ_BATCH_SIZE = int(os.getenv('QUIZ_BATCH_SIZE', '4'))
+QUIZ_BATCH_CONCURRENCY = int(os.getenv('QUIZ_BATCH_CONCURRENCY', '4'))
+AI_REQUESTS_PER_MINUTE = float(os.getenv('AI_REQUESTS_PER_MINUTE', '30'))
+
+
+class FakeQuizModel:
+    """Offline stand-in for the AI: builds questions from the movie's own data."""
+
+    def generate_quiz_questions(self, movie_context: dict, difficulty: str,
+                                exclude: Sequence[str] = ()) -> List[Dict]:
+        title = movie_context['title']
+        year = movie_context.get('year') or 2000
+        facts = [
+            ('In welchem Jahr erschien', str(year), [str(year - 2), str(year + 1), str(year + 3)]),
+            ('Wer führte Regie bei', movie_context.get('director') or 'Unbekannt',
+             ['Steven Spielberg', 'Sofia Coppola', 'Akira Kurosawa']),
+            ('Zu welchem Genre gehört', movie_context.get('genre') or 'Drama',
+             ['Musical', 'Western', 'Dokumentarfilm']),
+        ]
+        questions = []
+        # Numbered after the pool's questions, so top-ups are new questions
+        for number in range(len(exclude), len(exclude) + 10):
+            prefix, correct, wrong = facts[number % len(facts)]
+            questions.append({
+                'question': f"{prefix} \"{title}\"? ({difficulty} #{number + 1})",
+                'correct_answer': correct,
+                'wrong_answers': [answer for answer in wrong if answer != correct][:3] or ['-', '--', '---']
+            })
+        return questions
+
+    def generate_quiz_questions_batch(self, jobs: List[Tuple[dict, str]],
+                                      exclude: Optional[List[Sequence[str]]] = None) -> List[List[Dict]]:
+        exclude = exclude or [()] * len(jobs)
+        return [self.generate_quiz_questions(movie_context, difficulty, known)
+                for (movie_context, difficulty), known in zip(jobs, exclude)]
+
+
+class QuizGenerationService:
+    """Priority job queue with worker threads that fill the quiz question pools."""
+
+    def __init__(self, data_manager, ai_client, workers: int = QUIZ_GENERATION_WORKERS,
+                 max_retries: int = QUIZ_GENERATION_RETRIES, backoff: float = QUIZ_GENERATION_BACKOFF,
+                 requests_per_minute: float = AI_REQUESTS_PER_MINUTE):
+        self.data_manager = data_manager
+        self.ai_client = ai_client
+        self.rate_limiter = TokenBucket(requests_per_minute / 60)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue: PriorityQueue = PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = Lock()
+        self._idle = Condition(self._lock)
+        # Jobs waiting in the queue (or for a retry) by (movie_id, difficulty), with their priority
+        self._queued: Dict[Tuple[int, str], int] = {}
+        self._running = set()
+        self._timers = set()
+        self._stats = {'generated': 0, 'skipped': 0, 'retries': 0, 'failed': 0}
+        self._workers = [Thread(target=self._work, name=f'quiz-generation-{number}', daemon=True)
+                         for number in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def request(self, movie_id: int, difficulty: str, waiting: bool = False) -> bool:
+        """
+        Queue a top-up of a pool up to QuizService.MAX_POOL_SIZE.
+
+        waiting marks a pool a user is waiting for, it goes ahead of all
+        other jobs. Returns whether a job was queued.
+        """
+        priority = PRIORITY_WAITING if waiting else PRIORITY_TOP_UP
+        return self._put(movie_id, difficulty, priority, QuizService.MAX_POOL_SIZE)
+
+    def is_pending(self, movie_id: int, difficulty: str) -> bool:
+        """Whether a generation for the pool is queued, running or waiting for a retry."""
+        key = (movie_id, difficulty)
+        with self._lock:
+            return key in self._queued or key in self._running
+
+    @staticmethod
+    def _pools_to_fill(session, difficulties: Sequence[str], limit: Optional[int]) -> List[Tuple[int, str, int]]:
+        """
+        (movie_id, difficulty, rank) of every pool below QuizService.MIN_POOL_SIZE.
+
+        Ranked by popularity, the number of reviews, list entries and quiz
+        attempts of a movie, per difficulty.
+        """
+        interactions = union_all(
+            select(Review.movie_id.label('movie_id')),
+            select(UserMovie.movie_id),
+            select(QuizAttempt.movie_id)
+        ).subquery()
+        popularity = select(
+            interactions.c.movie_id, func.count().label('hits')
+        ).group_by(interactions.c.movie_id).subquery()
+
+        pools = []
+        for difficulty in difficulties:
+            sizes = select(
+                QuizQuestion.movie_id, func.count().label('size')
+            ).where(QuizQuestion.difficulty == difficulty).group_by(QuizQuestion.movie_id).subquery()
+            query = select(Movie.id).outerjoin(
+                popularity, popularity.c.movie_id == Movie.id
+            ).outerjoin(
+                sizes, sizes.c.movie_id == Movie.id
+            ).where(
+                func.coalesce(sizes.c.size, 0) < QuizService.MIN_POOL_SIZE
+            ).order_by(func.coalesce(popularity.c.hits, 0).desc(), Movie.id).limit(limit)
+            pools += [(movie_id, difficulty, rank)
+                      for rank, movie_id in enumerate(session.execute(query).scalars())]
+        return pools
+
+    def prewarm(self, difficulties: Sequence[str] = DIFFICULTIES, limit: Optional[int] = None) -> int:
+        """Queue every pool below QuizService.MIN_POOL_SIZE, most popular movies first. Returns the queued jobs."""
+        with self.data_manager.SessionFactory() as session:
+            pools = self._pools_to_fill(session, difficulties, limit)
+        return sum(self._put(movie_id, difficulty, PRIORITY_PREWARM + rank, QuizService.MIN_POOL_SIZE)
+                   for movie_id, difficulty, rank in pools)
+
+    def backfill(self, difficulties: Sequence[str] = DIFFICULTIES, limit: Optional[int] = None,
+                 batch_size: int = QUIZ_BATCH_SIZE, concurrency: int = QUIZ_BATCH_CONCURRENCY) -> Dict:
+        """
+        Fill every pool below QuizService.MIN_POOL_SIZE with batched model calls.
+
+        Instead of one call per movie and difficulty, batch_size pools share
+        one prompt (generate_quiz_questions_batch). At most concurrency
+        batches run at once and every call waits for the rate limiter.
+        Blocks until done and returns a report with the throughput and the
+        failed batches; failed batches are not retried, a later run picks
+        their pools up again.
+        """
+        started = time.perf_counter()
+        with self.data_manager.SessionFactory() as session:
+            pools = self._pools_to_fill(session, difficulties, limit)
+            # Most popular first over all difficulties
+            pools.sort(key=lambda pool: pool[2])
+            movies = {movie.id: QuizService.movie_context(movie) for movie in session.query(Movie).filter(
+                Movie.id.in_({movie_id for movie_id, _, _ in pools}))} if pools else {}
+            known = {(movie_id, difficulty): [q.question_text for q in QuizService.question_pool(
+                session, movie_id, difficulty)] for movie_id, difficulty, _ in pools}
+
+        jobs = [(movie_id, difficulty) for movie_id, difficulty, _ in pools]
+        batches = [jobs[start:start + batch_size] for start in range(0, len(jobs), batch_size)]
+        failures = []
+
+        def run(number: int, batch: List[Tuple[int, str]]) -> Tuple[int, int]:
+            try:
+                self.rate_limiter.acquire()
+                results = self.ai_client.generate_quiz_questions_batch(
+                    [(movies[movie_id], difficulty) for movie_id, difficulty in batch],
+                    exclude=[known[job] for job in batch])
+                added = 0
+                with self.data_manager.SessionFactory() as session:
+                    for (movie_id, difficulty), questions_data in zip(batch, results):
+                        pool = QuizService.question_pool(session, movie_id, difficulty)
+                        added += len(QuizService.add_to_pool(
+                            session, pool, QuizService.build_questions(movie_id, difficulty, questions_data)))
+                    session.commit()
+                return added, sum(1 for questions_data in results if not questions_data)
+            except Exception as e:
+                print(f"Error generating quiz batch {number}: {e}")
+                failures.append({'batch': number, 'pools': batch, 'error': str(e)})
+                return 0, len(batch)
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='quiz-batches') as executor:
+            outcomes = list(executor.map(run, range(len(batches)), batches))
+
+        seconds = time.perf_counter() - started
+        questions = sum(added for added, _ in outcomes)
+        return {
+            'pools': len(jobs),
+            'batches': len(batches),
+            'questions': questions,
+            'empty_pools': sum(missing for _, missing in outcomes),
+            'failed_batches': sorted(failures, key=lambda failure: failure['batch']),
+            'seconds': round(seconds, 2),
+            'questions_per_second': round(questions / seconds, 2) if seconds else 0.0,
+        }
+
+    def _put(self, movie_id: int, difficulty: str, priority: int, pool_size: int, attempt: int = 0) -> bool:
+        key = (movie_id, difficulty)
+        with self._lock:
+            if key in self._running or self._queued.get(key, priority + 1) <= priority:
+                return False
+            self._queued[key] = priority
+        self._queue.put((priority, next(self._sequence), movie_id, difficulty, pool_size, attempt))
+        return True
+
+    def _work(self) -> None:
+        while True:
+            priority, _, movie_id, difficulty, pool_size, attempt = self._queue.get()
+            if movie_id is None:
+                return
+            key = (movie_id, difficulty)
+            with self._lock:
+                # A job queued again with a higher priority already ran
+                if self._queued.get(key) != priority:
+                    continue
+                del self._queued[key]
+                self._running.add(key)
+
+            retry = False
+            try:
+                self._generate(movie_id, difficulty, pool_size)
+            except Exception as e:
+                print(f"Error generating quiz questions for movie {movie_id} ({difficulty}): {e}")
+                retry = attempt < self.max_retries
+                self._count('retries' if retry else 'failed')
+            finally:
+                with self._lock:
+                    self._running.discard(key)
+                    if retry:
+                        self._queued[key] = priority
+                    self._idle.notify_all()
+
+            if retry:
+                self._schedule_retry(movie_id, difficulty, priority, pool_size, attempt + 1)
+
+    def _schedule_retry(self, movie_id: int, difficulty: str, priority: int, pool_size: int, attempt: int) -> None:
+        def retry():
+            with self._lock:
+                self._timers.discard(timer)
+            self._queue.put((priority, next(self._sequence), movie_id, difficulty, pool_size, attempt))
+
+        timer = Timer(self.backoff * 2 ** (attempt - 1), retry)
+        timer.daemon = True
+        with self._lock:
+            self._timers.add(timer)
+        timer.start()
+
+    def _generate(self, movie_id: int, difficulty: str, pool_size: int) -> None:
+        """Generate one batch of questions unless the pool has reached pool_size meanwhile."""
+        with self.data_manager.SessionFactory() as session:
+            movie = session.get(Movie, movie_id)
+            if movie is None or len(QuizService.question_pool(session, movie_id, difficulty)) >= pool_size:
+                self._count('skipped')
+                return
+            movie_context = QuizService.movie_context(movie)
+            known = [q.question_text for q in QuizService.question_pool(session, movie_id, difficulty)]
+
+        # No session (and connection) is held during the AI round trip
+        self.rate_limiter.acquire()
+        questions_data = self.ai_client.generate_quiz_questions(movie_context, difficulty, exclude=known)
+        if not questions_data:
+            raise ValueError("AI returned no questions")
+
+        with self.data_manager.SessionFactory() as session:
+            pool = QuizService.question_pool(session, movie_id, difficulty)
+            QuizService.add_to_pool(session, pool, QuizService.build_questions(movie_id, difficulty, questions_data))
+            session.commit()
+        self._count('generated')
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Job counters of this process plus the current queue length."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queued'] = len(self._queued)
+            stats['running'] = len(self._running)
+        return stats
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until no job is queued, running or waiting for a retry (e.g. in scripts and tests)."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._queued and not self._running, timeout)
+
+    def shutdown(self) -> None:
+        """Stop the workers after the jobs queued so far and cancel pending retries."""
+        with self._lock:
+            timers, self._timers = self._timers, set()
+        for timer in timers:
+            timer.cancel()
+        for _ in self._workers:
+            self._queue.put((float('inf'), next(self._sequence), None, None, 0, 0))
@@ -1,100 +1,220 @@
 """
 Service for quiz functionality.
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Set
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 from flask_login import current_user
 from data_models import (QuizQuestion, QuizAttempt, Highscore, Movie, User,
                         Achievement, UserAchievement, QuizAttemptQuestion)
-from ai_request import AIRequest
+from ai_request import get_ai_client
 import random
 
 
 class QuizService:
     """Service for managing quiz functionality."""
 
-    def __init__(self, data_manager):
-        """Initialize the quiz service with a DataManager."""
-        self.data_manager = data_manager
-        self.ai_client = AIRequest()
+    QUESTIONS_PER_QUIZ = 5
+
+    # Questions are generated while the bank of a movie and difficulty is smaller than this
+    MIN_POOL_SIZE = 10
+
+    # Above this size seen questions are repeated instead of generating new ones
+    MAX_POOL_SIZE = 50
+
+    # Questions answered in this many recent attempts count as seen
+    RECENT_ATTEMPTS = 5
 
-    def get_questions_for_movie(self, movie_id: int, difficulty: str = 'mittel') -> List[Dict]:
-        """Get or generate new quiz questions for a specific movie."""
-        with self.data_manager.SessionFactory() as session:
+    # Answers needed before the correct answer rate is trusted, and the rate aimed at per difficulty
+    MIN_USAGE_FOR_RATE = 3
+    TARGET_CORRECT_RATE = {'leicht': 0.8, 'mittel': 0.6, 'schwer': 0.4}
+
+    def __init__(self, data_manager, generator=None, ai_client=None):
+        """
+        Initialize the quiz service with a DataManager.
+
+        With a generator (QuizGenerationService) missing questions are
+        generated in the background instead of during the request.
+        Without an ai_client the shared AIRequest is used.
+        """
+        self.data_manager = data_manager
+        self.generator = generator
+        self.ai_client = ai_client or get_ai_client()
+
+    def get_questions_for_movie(self, movie_id: int, difficulty: str = 'mittel',
+                                user_id: Optional[int] = None) -> List[Dict]:
+        """
+        Get quiz questions for a movie from the question bank.
+
+        Questions are reused per (movie, difficulty). New ones are only
+        generated when the bank is smaller than MIN_POOL_SIZE or the user
+        has already seen too many of them recently. user_id defaults to
+        the logged in user.
+
+        With a generator this never waits for the AI: an empty list means
+        the pool cannot fill a quiz yet and is being generated.
+        """
+        with self.data_manager.session_scope() as session:
             try:
-                movie = session.query(Movie).get(movie_id)
+                movie = session.get(Movie, movie_id)
                 if not movie:
                     return []
 
-                recent_questions = set()
-                if current_user.is_authenticated:
-                    recent_attempts = session.query(QuizAttempt).filter_by(
-                        user_id=current_user.id
-                    ).order_by(QuizAttempt.completed_at.desc()).limit(5).all()
-
-                    for attempt in recent_attempts:
-                        attempt_questions = session.query(QuizAttemptQuestion).filter_by(
-                            attempt_id=attempt.id
-                        ).all()
-                        for aq in attempt_questions:
-                            question = session.query(QuizQuestion).get(aq.question_id)
-                            if question and question.movie_id == movie_id:
-                                recent_questions.add(aq.question_id)
-
-                new_questions = self._generate_questions(movie, difficulty)
-
-                for q in new_questions:
-                    session.add(q)
-                session.commit()
+                if user_id is None and current_user and current_user.is_authenticated:
+                    user_id = current_user.id
+                pool = self.question_pool(session, movie_id, difficulty)
+                recent_questions = self._recent_question_ids(session, user_id, movie_id) if user_id else set()
+                unseen = [q for q in pool if q.id not in recent_questions]
+
+                if len(pool) < self.MIN_POOL_SIZE or (
+                        len(unseen) < self.QUESTIONS_PER_QUIZ and len(pool) < self.MAX_POOL_SIZE):
+                    if self.generator is not None:
+                        waiting = len(pool) < self.QUESTIONS_PER_QUIZ
+                        self.generator.request(movie.id, difficulty, waiting=waiting)
+                        if waiting:
+                            return []
+                    else:
+                        added = self.add_to_pool(session, pool, self._generate_questions(movie, difficulty, pool))
+                        session.commit()
+                        pool += added
+                        unseen += added
 
-                questions_data = []
-                for i, q in enumerate(new_questions[:5], 1):
-                    questions_data.append({
-                        'id': q.id,
-                        'question_text': q.question_text,
-                        'correct_answer': q.correct_answer,
-                        'wrong_answer_1': q.wrong_answer_1,
-                        'wrong_answer_2': q.wrong_answer_2,
-                        'wrong_answer_3': q.wrong_answer_3
-                    })
+                selected = self._select_questions(unseen, difficulty, self.QUESTIONS_PER_QUIZ)
+                if len(selected) < self.QUESTIONS_PER_QUIZ:
+                    # Not enough unseen questions: fill up with seen ones
+                    seen = [q for q in pool if q.id in recent_questions]
+                    selected += self._select_questions(seen, difficulty, self.QUESTIONS_PER_QUIZ - len(selected))
 
-                return questions_data
+                return [{
+                    'id': q.id,
+                    'question_text': q.question_text,
+                    'correct_answer': q.correct_answer,
+                    'wrong_answer_1': q.wrong_answer_1,
+                    'wrong_answer_2': q.wrong_answer_2,
+                    'wrong_answer_3': q.wrong_answer_3
+                } for q in selected]
 
             except Exception as e:
                 session.rollback()
                 print(f"Error loading/generating quiz questions: {str(e)}")
                 return []
 
-    def _generate_questions(self, movie: Movie, difficulty: str) -> List[QuizQuestion]:
-        """Generate new quiz questions for a movie."""
+    @staticmethod
+    def question_pool(session, movie_id: int, difficulty: str) -> List[QuizQuestion]:
+        """All banked questions of a movie and difficulty."""
+        return session.query(QuizQuestion).filter(
+            QuizQuestion.movie_id == movie_id,
+            QuizQuestion.difficulty == difficulty
+        ).all()
+
+    def _recent_question_ids(self, session, user_id: int, movie_id: int) -> Set[int]:
+        """IDs of the questions the user answered in their last quizzes of this movie."""
+        recent_attempts = session.query(QuizAttempt.id).filter(
+            QuizAttempt.user_id == user_id,
+            QuizAttempt.movie_id == movie_id
+        ).order_by(QuizAttempt.completed_at.desc()).limit(self.RECENT_ATTEMPTS)
+
+        rows = session.query(QuizAttemptQuestion.question_id).filter(
+            QuizAttemptQuestion.attempt_id.in_(recent_attempts.scalar_subquery())
+        )
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def add_to_pool(session, pool: List[QuizQuestion], questions: List[QuizQuestion]) -> List[QuizQuestion]:
+        """Add generated questions to the bank, skipping ones it already contains."""
+        known = {' '.join(q.question_text.lower().split()) for q in pool}
+        added = []
+        for question in questions:
+            text = ' '.join(question.question_text.lower().split())
+            if text in known:
+                continue
+            known.add(text)
+            session.add(question)
+            added.append(question)
+        session.flush()
+        return added
+
+    def _select_questions(self, questions: List[QuizQuestion], difficulty: str, count: int) -> List[QuizQuestion]:
+        """
+        Weighted random pick of count questions.
+
+        Rarely used questions are preferred, and once a question has been
+        answered often enough its correct answer rate should fit the
+        difficulty (easy questions are answered correctly more often).
+        """
+        if count <= 0 or not questions:
+            return []
+        target = self.TARGET_CORRECT_RATE.get(difficulty, 0.6)
+
+        def weight(question: QuizQuestion) -> float:
+            usage = question.question_usage_count or 0
+            fit = 1.0
+            if usage >= self.MIN_USAGE_FOR_RATE:
+                fit = max(0.1, 1.0 - abs((question.correct_answer_rate or 0.0) - target))
+            return fit / (1 + usage)
+
+        # Weighted sampling without replacement (Efraimidis-Spirakis keys)
+        keyed = sorted(questions, key=lambda q: random.random() ** (1.0 / weight(q)), reverse=True)
+        return keyed[:count]
+
+    def record_answers(self, session, attempt_id: int, question_results: List[Dict]) -> None:
+        """
+        Store the answered questions of an attempt and update the bank statistics.
+
+        The attempt questions mark them as recently seen for the user, usage
+        count and correct answer rate steer the selection of later quizzes.
+        """
+        results = {int(result['question_id']): result for result in question_results}
+        if not results:
+            return
+        now = datetime.now()
+        for question in session.query(QuizQuestion).filter(QuizQuestion.id.in_(results)):
+            result = results[question.id]
+            usage = question.question_usage_count or 0
+            rate = question.correct_answer_rate or 0.0
+            question.correct_answer_rate = (rate * usage + (1.0 if result['is_correct'] else 0.0)) / (usage + 1)
+            question.question_usage_count = usage + 1
+            session.add(QuizAttemptQuestion(
+                attempt_id=attempt_id,
+                question_id=question.id,
+                user_answer=result.get('user_answer'),
+                is_correct=result['is_correct'],
+                answered_at=now
+            ))
+
+    @staticmethod
+    def movie_context(movie: Movie) -> Dict:
+        """The movie data the AI generates questions from."""
+        return {
+            'title': movie.title,
+            'plot': movie.plot,
+            'genre': movie.genre,
+            'director': movie.director,
+            'year': movie.release_year
+        }
+
+    @staticmethod
+    def build_questions(movie_id: int, difficulty: str, questions_data: List[Dict]) -> List[QuizQuestion]:
+        """Quiz questions from the AI's question dicts."""
+        return [QuizQuestion(
+            movie_id=movie_id,
+            question_text=q_data['question'],
+            correct_answer=q_data['correct_answer'],
+            wrong_answer_1=q_data['wrong_answers'][0],
+            wrong_answer_2=q_data['wrong_answers'][1],
+            wrong_answer_3=q_data['wrong_answers'][2],
+            difficulty=difficulty,
+            source='ai'
+        ) for q_data in questions_data or []]
+
+    def _generate_questions(self, movie: Movie, difficulty: str,
+                            pool: Sequence[QuizQuestion] = ()) -> List[QuizQuestion]:
+        """Generate new quiz questions for a movie, different from the ones in pool."""
         try:
-            movie_context = {
-                'title': movie.title,
-                'plot': movie.plot,
-                'genre': movie.genre,
-                'director': movie.director,
-                'year': movie.release_year
-            }
-
-            questions_data = self.ai_client.generate_quiz_questions(movie_context, difficulty)
-
-            quiz_questions = []
-            if questions_data:
-                for q_data in questions_data:
-                    question = QuizQuestion(
-                        movie_id=movie.id,
-                        question_text=q_data['question'],
-                        correct_answer=q_data['correct_answer'],
-                        wrong_answer_1=q_data['wrong_answers'][0],
-                        wrong_answer_2=q_data['wrong_answers'][1],
-                        wrong_answer_3=q_data['wrong_answers'][2],
-                        difficulty=difficulty
-                    )
-                    quiz_questions.append(question)
-
-            return quiz_questions
+            questions_data = self.ai_client.generate_quiz_questions(
+                self.movie_context(movie), difficulty, exclude=[q.question_text for q in pool])
+            return self.build_questions(movie.id, difficulty, questions_data)
 
         except Exception as e:
             print(f"Error generating questions: {str(e)}")
@@ -103,7 +223,7 @@ class QuizService:
     def save_quiz_attempt(self, movie_id: int, user_id: int, score: int, difficulty: str) -> Optional[QuizAttempt]:
         """Save a quiz attempt to the database."""
         try:
-            with self.data_manager.SessionFactory() as session:
+            with self.data_manager.session_scope() as session:
                 quiz_attempt = QuizAttempt(
                     user_id=user_id,
                     score=score,
@@ -120,7 +240,7 @@ class QuizService:
 
     def calculate_score(self, movie_id: int, answers: dict, difficulty: str) -> dict:
         """Calculate the score for a quiz attempt."""
-        with self.data_manager.SessionFactory() as session:
+        with self.data_manager.session_scope() as session:
             try:
                 question_ids = list(answers.keys())
                 questions = session.query(QuizQuestion).filter(
@@ -183,7 +303,7 @@ class QuizService:
 
     def get_user_stats(self, user_id: int) -> dict:
         """Get user statistics for quizzes."""
-        with self.data_manager.SessionFactory() as session:
+        with self.data_manager.session_scope() as session:
             try:
                 total_attempts = session.query(QuizAttempt).filter_by(
                     user_id=user_id
@@ -242,7 +362,7 @@ class QuizService:
 
     def get_highscores(self, limit: int = 10) -> List[Dict]:
         """Get the top highscores."""
-        with self.data_manager.SessionFactory() as session:
+        with self.data_manager.session_scope() as session:
             try:
                 highscores = session.query(Highscore).order_by(
                     Highscore.score.desc()
@@ -261,7 +381,7 @@ class QuizService:
 
     def update_highscore(self, user_id: int, score: int, movie_id: int = None) -> bool:
         """Update or create a highscore entry."""
-        with self.data_manager.SessionFactory() as session:
+        with self.data_manager.session_scope() as session:
             try:
                 existing_highscore = session.query(Highscore).filter_by(
                     user_id=user_id,
@@ -0,0 +1,162 @@
+"""
+Collaborative-filtering recommendations.
+
+A batch job builds item-item cosine similarities from implicit feedback
+(reviews, watchlist entries and user_movies) and scores every unseen movie
+for every user by the movies they liked. The best TOP_N per user are written
+to movie_recommendations with source 'collaborative', where the recommend
+routes read them with an indexed lookup on (user_id, score).
+"""
+from collections import defaultdict
+from datetime import datetime
+from math import sqrt
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import delete, insert
+
+from data_models import Movie, MovieRecommendation, Review, UserMovie, WatchlistItem
+from services.cache_service import invalidate_tags
+
+SOURCE = 'collaborative'
+
+TOP_N = 20
+
+# Neighbours kept per movie when scoring users
+NEIGHBOURS = 50
+
+# Interactions per user used for co-occurrence counting, the strongest first
+MAX_USER_ITEMS = 200
+
+# Implicit feedback weights; low reviews mark a movie as seen without liking it
+REVIEW_WEIGHTS = {5: 1.0, 4: 0.8, 3: 0.3}
+FAVORITE_WEIGHT = 1.0
+WATCHED_WEIGHT = 0.4
+WATCHLIST_WEIGHT = 0.5
+
+Interactions = Dict[int, Dict[int, float]]
+
+
+def load_interactions(session) -> Tuple[Interactions, Dict[int, Set[int]]]:
+    """
+    Collect the feedback of all users.
+
+    Returns the positive weights per user and movie (the strongest signal
+    wins) and the set of movies every user has already seen or listed.
+    """
+    likes: Interactions = defaultdict(dict)
+    seen: Dict[int, Set[int]] = defaultdict(set)
+
+    def like(user_id, movie_id, weight):
+        seen[user_id].add(movie_id)
+        if weight > 0:
+            likes[user_id][movie_id] = max(likes[user_id].get(movie_id, 0.0), weight)
+
+    for user_id, movie_id, rating in session.query(Review.user_id, Review.movie_id, Review.rating):
+        like(user_id, movie_id, REVIEW_WEIGHTS.get(rating, 0.0))
+    for user_id, movie_id in session.query(WatchlistItem.user_id, WatchlistItem.movie_id):
+        like(user_id, movie_id, WATCHLIST_WEIGHT)
+    for user_id, movie_id, favorite, watched in session.query(
+            UserMovie.user_id, UserMovie.movie_id, UserMovie.favorite, UserMovie.watched):
+        like(user_id, movie_id, FAVORITE_WEIGHT if favorite else WATCHED_WEIGHT if watched else 0.0)
+    return dict(likes), dict(seen)
+
+
+def item_similarities(likes: Interactions, neighbours: int = NEIGHBOURS) -> Dict[int, List[Tuple[int, float]]]:
+    """
+    Cosine similarity of movies over their user vectors, top neighbours per movie.
+
+    Only pairs that share at least one user are ever touched, so the cost
+    grows with the co-occurrences instead of the square of the catalog.
+    """
+    dots: Dict[int, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+    norms: Dict[int, float] = defaultdict(float)
+    for items in likes.values():
+        strongest = sorted(items.items(), key=lambda item: -item[1])[:MAX_USER_ITEMS]
+        for index, (first, first_weight) in enumerate(strongest):
+            norms[first] += first_weight * first_weight
+            for second, second_weight in strongest[index + 1:]:
+                dots[first][second] += first_weight * second_weight
+                dots[second][first] += first_weight * second_weight
+
+    similar = {}
+    for movie_id, row in dots.items():
+        scored = sorted(((other, dot / sqrt(norms[movie_id] * norms[other])) for other, dot in row.items()),
+                        key=lambda pair: (-pair[1], pair[0]))
+        similar[movie_id] = scored[:neighbours]
+    return similar
+
+
+def score_user(items: Dict[int, float], seen: Set[int], similar: Dict[int, List[Tuple[int, float]]],
+               top_n: int = TOP_N) -> List[Tuple[int, float, int]]:
+    """
+    Score unseen movies for one user.
+
+    The score is the similarity-weighted average of the user's feedback over
+    the liked movies that are neighbours of the candidate, damped for
+    candidates supported by a single movie. Returns (movie_id, score,
+    movie that contributed most) triples, best first.
+    """
+    totals: Dict[int, float] = defaultdict(float)
+    weights: Dict[int, float] = defaultdict(float)
+    because: Dict[int, Tuple[float, int]] = {}
+    for liked, weight in items.items():
+        for candidate, similarity in similar.get(liked, ()):
+            if candidate in seen:
+                continue
+            totals[candidate] += weight * similarity
+            weights[candidate] += similarity
+            if candidate not in because or weight * similarity > because[candidate][0]:
+                because[candidate] = (weight * similarity, liked)
+
+    scored = []
+    for candidate, total in totals.items():
+        support = weights[candidate]
+        score = total / support * min(support, 1.0)
+        scored.append((candidate, round(score, 4), because[candidate][1]))
+    scored.sort(key=lambda entry: (-entry[1], entry[0]))
+    return scored[:top_n]
+
+
+class RecommendationService:
+    """Computes and reads the per-user rows of movie_recommendations."""
+
+    def __init__(self, data_manager, top_n: int = TOP_N):
+        self.data_manager = data_manager
+        self.top_n = top_n
+
+    def rebuild(self, batch_size: int = 5000) -> int:
+        """Recompute the recommendations of all users. Returns the number of rows written."""
+        recommended_at = datetime.utcnow()
+        with self.data_manager.SessionFactory() as session:
+            likes, seen = load_interactions(session)
+            similar = item_similarities(likes)
+
+            scored = {user_id: score_user(items, seen.get(user_id, set()), similar, self.top_n)
+                      for user_id, items in likes.items()}
+            source_ids = {liked for entries in scored.values() for _, _, liked in entries}
+            titles = dict(session.query(Movie.id, Movie.title).filter(Movie.id.in_(source_ids))) if source_ids else {}
+
+            rows = [{'user_id': user_id, 'movie_id': movie_id, 'score': score, 'source': SOURCE,
+                     'reason': f"Weil Ihnen \"{titles.get(liked, 'ein ähnlicher Film')}\" gefallen hat",
+                     'recommended_at': recommended_at}
+                    for user_id, entries in scored.items() for movie_id, score, liked in entries]
+
+            session.execute(delete(MovieRecommendation).where(MovieRecommendation.source == SOURCE))
+            for start in range(0, len(rows), batch_size):
+                session.execute(insert(MovieRecommendation), rows[start:start + batch_size])
+            session.commit()
+
+        invalidate_tags('recommendations')
+        return len(rows)
+
+    @staticmethod
+    def recommended_ids(session, user_id: int, clause=None, limit: int = 5) -> List[int]:
+        """Best stored recommendations of a user, optionally restricted by a Movie filter clause."""
+        query = session.query(MovieRecommendation.movie_id).filter(
+            MovieRecommendation.user_id == user_id,
+            MovieRecommendation.source == SOURCE
+        )
+        if clause is not None:
+            query = query.join(Movie, Movie.id == MovieRecommendation.movie_id).filter(clause)
+        rows = query.order_by(MovieRecommendation.score.desc(), MovieRecommendation.movie_id).limit(limit)
+        return [row[0] for row in rows]
@@ -0,0 +1,161 @@
+"""
+Full-text search over movie title, genre, director and plot.
+
+PostgreSQL uses a generated, weighted tsvector column with a GIN index.
+SQLite (local development and tests) uses an external-content FTS5 table that
+is kept in sync by triggers. Other databases fall back to ILIKE matching.
+"""
+import re
+from typing import List, Tuple
+
+from sqlalchemy import column, func, literal, literal_column, select, table, text
+from sqlalchemy.engine import Engine
+
+from data_models import Movie
+
+# Bump when the DDL below changes, so the bootstrap installs it again
+SEARCH_INDEX_VERSION = 1
+
+SEARCH_CONFIG = 'english'
+MAX_SEARCH_TERMS = 8
+
+_PG_DDL = [
+    f"""
+    ALTER TABLE movies ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(genre, '')), 'B') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(director, '')), 'B') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(plot, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_movie_search_vector ON movies USING GIN (search_vector)",
+]
+
+_SQLITE_FTS_TABLE = """
+    CREATE VIRTUAL TABLE movies_fts USING fts5(
+        title, genre, director, plot,
+        content='movies', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+_SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN
+        INSERT INTO movies_fts(rowid, title, genre, director, plot)
+        VALUES (new.id, new.title, new.genre, new.director, new.plot);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title, genre, director, plot)
+        VALUES ('delete', old.id, old.title, old.genre, old.director, old.plot);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE ON movies BEGIN
+        INSERT INTO movies_fts(movies_fts, rowid, title, genre, director, plot)
+        VALUES ('delete', old.id, old.title, old.genre, old.director, old.plot);
+        INSERT INTO movies_fts(rowid, title, genre, director, plot)
+        VALUES (new.id, new.title, new.genre, new.director, new.plot);
+    END
+    """,
+]
+
+# BM25 column weights for title, genre, director and plot
+_FTS_WEIGHTS = (10.0, 4.0, 4.0, 1.0)
+
+movies_fts = table('movies_fts', column('rowid'))
+
+
+def install_search_index(engine: Engine) -> None:
+    """Create the full-text index for the engine's dialect (idempotent)."""
+    dialect = engine.dialect.name
+    with engine.begin() as connection:
+        if dialect == 'postgresql':
+            for statement in _PG_DDL:
+                connection.execute(text(statement))
+        elif dialect == 'sqlite':
+            exists = connection.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'movies_fts'"
+            )).first()
+            if not exists:
+                connection.execute(text(_SQLITE_FTS_TABLE))
+                # Index all rows that existed before the table was created
+                connection.execute(text("INSERT INTO movies_fts(movies_fts) VALUES ('rebuild')"))
+            for statement in _SQLITE_TRIGGERS:
+                connection.execute(text(statement))
+
+
+def search_terms(query: str) -> List[str]:
+    """Split user input into plain word tokens (no search operators)."""
+    return re.findall(r'\w+', query.lower())[:MAX_SEARCH_TERMS]
+
+
+class SearchService:
+    """Service for ranked movie full-text search."""
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self.dialect = data_manager.engine.dialect.name
+
+    def match(self, query: str):
+        """
+        Subquery of matching movies with columns movie_id and rank.
+
+        Higher rank means more relevant. Every term is matched as a prefix,
+        so partially typed words already find results. Returns None if the
+        input contains no searchable terms.
+        """
+        terms = search_terms(query)
+        if not terms:
+            return None
+
+        if self.dialect == 'postgresql':
+            vector = literal_column('movies.search_vector')
+            ts_query = func.to_tsquery(literal(SEARCH_CONFIG), ' & '.join(f"{term}:*" for term in terms))
+            statement = select(Movie.id.label('movie_id'),
+                               func.ts_rank_cd(vector, ts_query).label('rank')) \
+                .where(vector.op('@@')(ts_query))
+        elif self.dialect == 'sqlite':
+            fts_query = ' '.join(f'"{term}"*' for term in terms)
+            # bm25() is lower for better matches, so it is negated
+            statement = select(movies_fts.c.rowid.label('movie_id'),
+                               (-func.bm25(literal_column('movies_fts'), *_FTS_WEIGHTS)).label('rank')) \
+                .where(literal_column('movies_fts').op('MATCH')(fts_query))
+        else:
+            statement = select(Movie.id.label('movie_id'), literal(0.0).label('rank'))
+            for term in terms:
+                pattern = f"%{term}%"
+                statement = statement.where(Movie.title.ilike(pattern) | Movie.genre.ilike(pattern) |
+                                            Movie.director.ilike(pattern) | Movie.plot.ilike(pattern))
+        return statement.subquery('search_match')
+
+    def apply(self, query, search_query: str, with_rank: bool = False):
+        """
+        Restrict a Movie query to search results.
+
+        Returns the query and the rank column (None without search terms),
+        which can be used for sorting by relevance.
+        """
+        matches = self.match(search_query)
+        if matches is None:
+            return query, None
+        query = query.join(matches, matches.c.movie_id == Movie.id)
+        if with_rank:
+            query = query.add_columns(matches.c.rank)
+        return query, matches.c.rank
+
+    def search(self, search_query: str, limit: int = 20) -> List[Tuple[int, float]]:
+        """Get (movie_id, rank) pairs of the best matches."""
+        matches = self.match(search_query)
+        if matches is None:
+            return []
+        with self.data_manager.session_scope() as session:
+            rows = session.execute(
+                select(matches.c.movie_id, matches.c.rank)
+                .order_by(matches.c.rank.desc(), matches.c.movie_id)
+                .limit(limit)
+            ).all()
+            return [(row.movie_id, float(row.rank)) for row in rows]
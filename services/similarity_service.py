@@ -0,0 +1,270 @@
+"""
+Precomputed movie similarity.
+
+Movie pairs are scored by genre overlap, release year proximity, director and
+shared actors. The best TOP_N matches of every movie are stored in the
+movie_similarity table, so detail pages read their similar movies with one
+indexed query instead of scanning the movies table on every view.
+
+The full table is rebuilt by scripts/compute_movie_similarity.py. Single
+movies (e.g. newly added ones) are scored incrementally by refresh_movie(),
+which similar_ids() queues on a background thread when a movie has no rows
+yet, so a page view never waits for the scoring.
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, insert, or_, select
+
+from data_models import Movie, MovieActor, MovieGenre, MovieSimilarity
+from services.cache_service import invalidate_tags
+
+TOP_N = 12
+
+# Share of each feature in the final score (sums up to 1)
+WEIGHTS = {'genres': 0.5, 'year': 0.2, 'director': 0.15, 'actors': 0.15}
+
+# Movies this many years apart get no year points
+YEAR_WINDOW = 10
+
+# Number of shared actors that already counts as a full match
+ACTOR_SATURATION = 3
+
+MovieFeatures = namedtuple('MovieFeatures', ['id', 'genres', 'year', 'directors', 'actors', 'rating'])
+
+
+def split_directors(director: Optional[str]) -> FrozenSet[str]:
+    """Lowercased director names, co-directors are separated by commas."""
+    return frozenset(name.strip().lower() for name in (director or '').split(',') if name.strip())
+
+
+def score_pair(first: MovieFeatures, second: MovieFeatures) -> float:
+    """Similarity of two movies between 0 and 1. Missing data scores 0 for that feature."""
+    score = 0.0
+    if first.genres and second.genres:
+        shared = len(first.genres & second.genres)
+        score += WEIGHTS['genres'] * shared / len(first.genres | second.genres)
+    if first.year is not None and second.year is not None:
+        score += WEIGHTS['year'] * max(0.0, 1 - abs(first.year - second.year) / YEAR_WINDOW)
+    if first.directors & second.directors:
+        score += WEIGHTS['director']
+    if first.actors and second.actors:
+        score += WEIGHTS['actors'] * min(len(first.actors & second.actors) / ACTOR_SATURATION, 1.0)
+    return round(score, 4)
+
+
+def load_features(session, movie_ids: Optional[Iterable[int]] = None) -> Dict[int, MovieFeatures]:
+    """Load the scoring features of all movies or of the given IDs with three queries."""
+    ids = None if movie_ids is None else list(movie_ids)
+    if ids is not None and not ids:
+        return {}
+
+    def restrict(query, column):
+        return query if ids is None else query.filter(column.in_(ids))
+
+    genres: Dict[int, set] = {}
+    for movie_id, genre_id in restrict(session.query(MovieGenre.movie_id, MovieGenre.genre_id),
+                                       MovieGenre.movie_id):
+        genres.setdefault(movie_id, set()).add(genre_id)
+
+    actors: Dict[int, set] = {}
+    for movie_id, actor_id in restrict(session.query(MovieActor.movie_id, MovieActor.actor_id),
+                                       MovieActor.movie_id):
+        actors.setdefault(movie_id, set()).add(actor_id)
+
+    movies = restrict(session.query(Movie.id, Movie.release_year, Movie.director, Movie.rating), Movie.id)
+    return {
+        movie_id: MovieFeatures(movie_id, frozenset(genres.get(movie_id, ())), year,
+                                split_directors(director), frozenset(actors.get(movie_id, ())), rating)
+        for movie_id, year, director, rating in movies
+    }
+
+
+def _feature_keys(features: MovieFeatures) -> List[Tuple[str, object]]:
+    return ([('genre', genre) for genre in features.genres] +
+            [('director', name) for name in features.directors] +
+            [('actor', actor) for actor in features.actors])
+
+
+def _postings(features: Dict[int, MovieFeatures]) -> Dict[Tuple[str, object], List[int]]:
+    """Inverted index from genre, director and actor to movie IDs."""
+    postings: Dict[Tuple[str, object], List[int]] = {}
+    for movie in features.values():
+        for key in _feature_keys(movie):
+            postings.setdefault(key, []).append(movie.id)
+    return postings
+
+
+def rank_similar(target: MovieFeatures, features: Dict[int, MovieFeatures],
+                 candidate_ids: Iterable[int], top_n: int = TOP_N) -> List[Tuple[int, float]]:
+    """
+    Score the candidates against target and return the best (movie_id, score) pairs.
+
+    Ties are broken by rating, then ID, so the result is deterministic.
+    """
+    scored = []
+    for candidate_id in set(candidate_ids):
+        candidate = features.get(candidate_id)
+        if candidate is None or candidate_id == target.id:
+            continue
+        score = score_pair(target, candidate)
+        if score > 0:
+            scored.append((-score, -(candidate.rating or 0), candidate_id))
+    scored.sort()
+    return [(candidate_id, -score) for score, _, candidate_id in scored[:top_n]]
+
+
+class SimilarityService:
+    """Computes and reads the movie_similarity table."""
+
+    def __init__(self, data_manager, top_n: int = TOP_N, max_workers: int = 1):
+        self.data_manager = data_manager
+        self.top_n = top_n
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='movie-similarity')
+        self._lock = Lock()
+        self._queued: Set[int] = set()
+
+    def rebuild(self, batch_size: int = 5000) -> int:
+        """
+        Recompute the similar movies of every movie.
+
+        Only movies sharing at least one genre, director or actor are scored
+        (found via an inverted index), which keeps the job far below the
+        n² pair count. Returns the number of rows written.
+        """
+        computed_at = datetime.utcnow()
+        with self.data_manager.SessionFactory() as session:
+            features = load_features(session)
+            postings = _postings(features)
+
+            rows = []
+            for movie in features.values():
+                candidates = (movie_id for key in _feature_keys(movie) for movie_id in postings[key])
+                rows.extend({'movie_id': movie.id, 'similar_movie_id': similar_id,
+                             'score': score, 'computed_at': computed_at}
+                            for similar_id, score in rank_similar(movie, features, candidates, self.top_n))
+
+            session.execute(delete(MovieSimilarity))
+            for start in range(0, len(rows), batch_size):
+                session.execute(insert(MovieSimilarity), rows[start:start + batch_size])
+            session.commit()
+
+        invalidate_tags('similar')
+        return len(rows)
+
+    def refresh_movie(self, movie_id: int) -> int:
+        """
+        Score a single movie against its candidates and store its top N.
+
+        The movie is also inserted into the lists of its neighbours if it
+        ranks high enough there. Returns the number of similar movies stored.
+        """
+        with self.data_manager.SessionFactory() as session:
+            target = load_features(session, [movie_id]).get(movie_id)
+            if target is None:
+                return 0
+
+            clauses = []
+            if target.genres:
+                clauses.append(Movie.id.in_(select(MovieGenre.movie_id)
+                                            .where(MovieGenre.genre_id.in_(target.genres))))
+            if target.actors:
+                clauses.append(Movie.id.in_(select(MovieActor.movie_id)
+                                            .where(MovieActor.actor_id.in_(target.actors))))
+            if target.directors:
+                clauses.extend(func.lower(Movie.director).contains(name, autoescape=True)
+                               for name in target.directors)
+            candidate_ids = [row[0] for row in session.query(Movie.id).filter(or_(*clauses))] if clauses else []
+
+            features = load_features(session, candidate_ids)
+            ranked = rank_similar(target, features, candidate_ids, self.top_n)
+            computed_at = datetime.utcnow()
+
+            session.execute(delete(MovieSimilarity).where(MovieSimilarity.movie_id == movie_id))
+            if ranked:
+                session.execute(insert(MovieSimilarity), [
+                    {'movie_id': movie_id, 'similar_movie_id': similar_id,
+                     'score': score, 'computed_at': computed_at}
+                    for similar_id, score in ranked
+                ])
+                self._add_to_neighbours(session, movie_id, ranked, computed_at)
+            session.commit()
+
+        invalidate_tags('similar')
+        return len(ranked)
+
+    def _add_to_neighbours(self, session, movie_id: int, ranked: List[Tuple[int, float]],
+                           computed_at: datetime) -> None:
+        """Insert movie_id into neighbour lists where it beats the current last entry."""
+        neighbour_ids = [similar_id for similar_id, _ in ranked]
+        stats = dict((row[0], (row[1], row[2])) for row in session.query(
+            MovieSimilarity.movie_id, func.count(), func.min(MovieSimilarity.score)
+        ).filter(
+            MovieSimilarity.movie_id.in_(neighbour_ids),
+            MovieSimilarity.similar_movie_id != movie_id
+        ).group_by(MovieSimilarity.movie_id))
+
+        for neighbour_id, score in ranked:
+            count, lowest = stats.get(neighbour_id, (0, None))
+            if count >= self.top_n and score <= lowest:
+                continue
+            session.execute(delete(MovieSimilarity).where(
+                MovieSimilarity.movie_id == neighbour_id,
+                MovieSimilarity.similar_movie_id == movie_id
+            ))
+            session.execute(insert(MovieSimilarity).values(
+                movie_id=neighbour_id, similar_movie_id=movie_id, score=score, computed_at=computed_at
+            ))
+            if count >= self.top_n:
+                # Remove the entry that dropped out of the top N
+                weakest = session.query(MovieSimilarity.similar_movie_id).filter(
+                    MovieSimilarity.movie_id == neighbour_id
+                ).order_by(MovieSimilarity.score, MovieSimilarity.similar_movie_id.desc()).first()
+                session.execute(delete(MovieSimilarity).where(
+                    MovieSimilarity.movie_id == neighbour_id,
+                    MovieSimilarity.similar_movie_id == weakest[0]
+                ))
+
+    def similar_ids(self, movie_id: int, limit: int = 4, compute_missing: bool = True) -> List[int]:
+        """
+        Most similar movie IDs, best first.
+
+        Movies that were added after the last rebuild have no rows yet; with
+        compute_missing they are queued for scoring in the background and
+        an empty list is returned meanwhile (callers fall back to another
+        source). The finished job invalidates the 'similar' cache tag.
+        """
+        with self.data_manager.session_scope() as session:
+            rows = session.query(MovieSimilarity.similar_movie_id).filter(
+                MovieSimilarity.movie_id == movie_id
+            ).order_by(MovieSimilarity.score.desc(), MovieSimilarity.similar_movie_id).limit(limit)
+            movie_ids = [row[0] for row in rows]
+
+        if not movie_ids and compute_missing:
+            self.request(movie_id)
+        return movie_ids
+
+    def request(self, movie_id: int) -> bool:
+        """Queue refresh_movie() for a movie unless it is already queued. Returns whether a job was queued."""
+        with self._lock:
+            if movie_id in self._queued:
+                return False
+            self._queued.add(movie_id)
+        self._executor.submit(self._refresh_queued, movie_id)
+        return True
+
+    def _refresh_queued(self, movie_id: int) -> None:
+        try:
+            self.refresh_movie(movie_id)
+        except Exception as e:
+            print(f"Error computing similar movies for movie {movie_id}: {e}")
+        finally:
+            with self._lock:
+                self._queued.discard(movie_id)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the worker threads (e.g. in tests)."""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,233 @@
+"""
+In-memory trigram index over movie titles.
+
+Serves typo-tolerant autocomplete and fuzzy duplicate detection without a
+database round trip. Each worker process holds its own index. It is built
+from the movies table and kept current by session events after every
+commit. Because a worker only sees its own commits, the index is also
+rebuilt periodically so that movies added by other workers show up.
+"""
+import re
+import time
+import unicodedata
+from collections import Counter, namedtuple
+from threading import RLock
+from weakref import WeakSet
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from data_models import Movie
+
+TitleMatch = namedtuple('TitleMatch', ['movie_id', 'title', 'year', 'score'])
+
+_PENDING_TITLES = 'pending_title_changes'
+
+# Roman numerals up to XXXIX, enough for sequel numbers
+_ROMAN_NUMERAL = re.compile(r'x{0,3}(ix|iv|v?i{0,3})')
+_ROMAN_VALUES = {'i': 1, 'v': 5, 'x': 10}
+
+# Indexes updated by the session events
+_indexes: 'WeakSet[TitleIndex]' = WeakSet()
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    decomposed = unicodedata.normalize('NFKD', title or '')
+    ascii_title = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', ascii_title.lower()).split())
+
+
+def title_numerals(title: str) -> Set[int]:
+    """
+    Sequel numbers in a title: digits and Roman numerals from II upwards.
+
+    'Rocky III' gives {3}, 'Ocean's 11' gives {11}. A lone 'I' is skipped,
+    it is far more often the pronoun than a numeral.
+    """
+    numerals = set()
+    for word in normalize_title(title).split():
+        if word.isdigit():
+            numerals.add(int(word))
+        elif word != 'i' and _ROMAN_NUMERAL.fullmatch(word):
+            value = 0
+            for position, char in enumerate(word):
+                digit = _ROMAN_VALUES[char]
+                following = _ROMAN_VALUES[word[position + 1]] if position + 1 < len(word) else 0
+                value += -digit if digit < following else digit
+            numerals.add(value)
+    return numerals
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """Trigrams of every word, padded like pg_trgm ('  a', ' al', 'ali', ...)."""
+    grams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(first: str, second: str) -> float:
+    """Trigram (Jaccard) similarity of two titles between 0 and 1."""
+    first_grams = trigrams(normalize_title(first))
+    second_grams = trigrams(normalize_title(second))
+    if not first_grams or not second_grams:
+        return 0.0
+    shared = len(first_grams & second_grams)
+    return shared / (len(first_grams) + len(second_grams) - shared)
+
+
+class TitleIndex:
+    """Trigram posting lists for all movie titles."""
+
+    def __init__(self, max_age: float = 300):
+        self.max_age = max_age
+        self.built_at: Optional[float] = None
+        self._lock = RLock()
+        self._entries: Dict[int, Tuple[str, Optional[int], str, Set[str]]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, movie_id: int, title: str, year: Optional[int] = None) -> None:
+        """Insert or replace the title of a movie."""
+        normalized = normalize_title(title)
+        grams = trigrams(normalized)
+        with self._lock:
+            self._remove(movie_id)
+            self._entries[movie_id] = (title, year, normalized, grams)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(movie_id)
+
+    def remove(self, movie_id: int) -> None:
+        """Remove a movie from the index."""
+        with self._lock:
+            self._remove(movie_id)
+
+    def _remove(self, movie_id: int) -> None:
+        entry = self._entries.pop(movie_id, None)
+        if entry is None:
+            return
+        for gram in entry[3]:
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(movie_id)
+                if not postings:
+                    del self._postings[gram]
+
+    def build(self, rows: Iterable[Tuple[int, str, Optional[int]]]) -> None:
+        """Replace the whole index with (movie_id, title, year) rows."""
+        fresh = TitleIndex(self.max_age)
+        for movie_id, title, year in rows:
+            fresh.add(movie_id, title, year)
+        with self._lock:
+            self._entries, self._postings = fresh._entries, fresh._postings
+            self.built_at = time.time()
+
+    def ensure_fresh(self, load_rows: Callable[[], Iterable[Tuple[int, str, Optional[int]]]]) -> None:
+        """Build the index on first use and rebuild it once it is older than max_age."""
+        if self.built_at is None or time.time() - self.built_at > self.max_age:
+            self.build(load_rows())
+
+    def _candidates(self, query: str) -> Tuple[str, Set[str], Counter]:
+        normalized = normalize_title(query)
+        grams = trigrams(normalized)
+        shared = Counter()
+        with self._lock:
+            for gram in grams:
+                shared.update(self._postings.get(gram, ()))
+        return normalized, grams, shared
+
+    def suggest(self, query: str, limit: int = 10, min_score: float = 0.3) -> List[TitleMatch]:
+        """
+        Rank titles for autocomplete.
+
+        The score is mostly the share of the query's trigrams found in the
+        title, so a typed prefix like 'star wa' ranks 'Star Wars' high even
+        though the full title is much longer. Exact prefixes get a bonus.
+        """
+        normalized, grams, shared = self._candidates(query)
+        if not grams:
+            return []
+
+        matches = []
+        with self._lock:
+            for movie_id, count in shared.items():
+                title, year, title_normalized, title_grams = self._entries[movie_id]
+                coverage = count / len(grams)
+                jaccard = count / (len(grams) + len(title_grams) - count)
+                score = 0.7 * coverage + 0.3 * jaccard
+                if title_normalized.startswith(normalized):
+                    score += 0.2
+                if score >= min_score:
+                    matches.append(TitleMatch(movie_id, title, year, round(min(score, 1.0), 3)))
+
+        matches.sort(key=lambda match: (-match.score, len(match.title), match.movie_id))
+        return matches[:limit]
+
+    def find_similar(self, title: str, threshold: float = 0.8,
+                     accept: Optional[Callable[[TitleMatch], bool]] = None) -> Optional[TitleMatch]:
+        """
+        Best title with a trigram similarity of at least threshold, e.g. for duplicate checks.
+
+        accept, if given, filters the candidates (e.g. by year), so a
+        rejected best match does not hide an acceptable one.
+        """
+        _, grams, shared = self._candidates(title)
+        matches = []
+        with self._lock:
+            for movie_id, count in shared.items():
+                entry_title, year, _, title_grams = self._entries[movie_id]
+                score = count / (len(grams) + len(title_grams) - count)
+                if score >= threshold:
+                    matches.append(TitleMatch(movie_id, entry_title, year, round(score, 3)))
+        matches.sort(key=lambda match: (-match.score, match.movie_id))
+        for match in matches:
+            if accept is None or accept(match):
+                return match
+        return None
+
+
+def _collect_titles(session, flush_context) -> None:
+    """Remember inserted, changed and deleted movies of this flush."""
+    pending: List[Tuple[str, int, Optional[str], Optional[int]]] = session.info.setdefault(_PENDING_TITLES, [])
+    for instance in list(session.new) + list(session.dirty):
+        if isinstance(instance, Movie):
+            pending.append(('add', instance.id, instance.title, instance.release_year))
+    for instance in session.deleted:
+        if isinstance(instance, Movie):
+            pending.append(('remove', instance.id, None, None))
+
+
+def _apply_titles(session) -> None:
+    """Update all registered indexes once the transaction is committed."""
+    pending = session.info.pop(_PENDING_TITLES, None)
+    if not pending:
+        return
+    for index in list(_indexes):
+        for operation, movie_id, title, year in pending:
+            if operation == 'add':
+                index.add(movie_id, title, year)
+            else:
+                index.remove(movie_id)
+
+
+def _discard_titles(session) -> None:
+    """Rolled back changes never reach the index."""
+    session.info.pop(_PENDING_TITLES, None)
+
+
+def register_title_index(index: TitleIndex, session_class=Session) -> None:
+    """Keep the index current with committed movie changes (idempotent)."""
+    _indexes.add(index)
+    listeners = [
+        ('after_flush', _collect_titles),
+        ('after_commit', _apply_titles),
+        ('after_rollback', _discard_titles),
+    ]
+    for name, handler in listeners:
+        if not event.contains(session_class, name, handler):
+            event.listen(session_class, name, handler)
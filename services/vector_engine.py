@@ -0,0 +1,288 @@
+"""
+Vectorized content-based similarity.
+
+Every movie is encoded as one row of a dense NumPy matrix: multi-hot genres,
+standardized release year and rating, and hashed director and actor
+buckets. Rows are L2-normalized, so the cosine similarity of a query vector
+against the whole catalog is a single matrix-vector product.
+
+The matrix is loaded from the database once per worker. Movies committed
+afterwards are queued by session events and appended on the next query, and
+the whole matrix is rebuilt periodically like the title index.
+"""
+import time
+import zlib
+from threading import RLock
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from weakref import WeakSet
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from data_models import Movie, MovieActor, Review, UserMovie
+from services.similarity_service import MovieFeatures, load_features
+
+DIRECTOR_BUCKETS = 256
+ACTOR_BUCKETS = 1024
+
+# Weight of each feature block after the block itself is L2-normalized
+BLOCK_WEIGHTS = {'genres': 1.0, 'year': 0.4, 'rating': 0.2, 'director': 0.6, 'actors': 0.5}
+
+# Signals of the user profile: favorites count double, reviews are centered on 3 stars
+FAVORITE_WEIGHT = 2.0
+WATCHED_WEIGHT = 0.5
+REVIEW_NEUTRAL = 3
+
+_PENDING_MOVIES = 'pending_vector_movies'
+
+# Engines updated by the session events
+_engines: 'WeakSet[MovieVectorEngine]' = WeakSet()
+
+
+def _bucket(value: str, buckets: int) -> int:
+    """Stable hash bucket (Python's hash() differs between worker processes)."""
+    return zlib.crc32(value.encode('utf-8')) % buckets
+
+
+class MovieVectorEngine:
+    """Movie feature matrix with batched top-k cosine queries."""
+
+    def __init__(self, data_manager, max_age: float = 3600):
+        self.data_manager = data_manager
+        self.max_age = max_age
+        self.built_at: Optional[float] = None
+        self._lock = RLock()
+        self._pending: Set[int] = set()
+        self._genres: Dict[int, int] = {}
+        self._year_stats = (0.0, 1.0)
+        self._rating_stats = (0.0, 1.0)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._positions: Dict[int, int] = {}
+        self._matrix = np.zeros((0, self.dimensions), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def dimensions(self) -> int:
+        return len(self._genres) + 2 + DIRECTOR_BUCKETS + ACTOR_BUCKETS
+
+    def _encode(self, movies: Sequence[MovieFeatures]) -> np.ndarray:
+        """Encode movies into L2-normalized rows (genres must be in the vocabulary)."""
+        genre_count = len(self._genres)
+        director_offset = genre_count + 2
+        actor_offset = director_offset + DIRECTOR_BUCKETS
+        year_mean, year_std = self._year_stats
+        rating_mean, rating_std = self._rating_stats
+
+        rows = np.zeros((len(movies), self.dimensions), dtype=np.float32)
+        for row, movie in zip(rows, movies):
+            if movie.genres:
+                columns = [self._genres[genre] for genre in movie.genres]
+                row[columns] = BLOCK_WEIGHTS['genres'] / np.sqrt(len(columns))
+            # Missing values stay 0, i.e. the catalog average
+            if movie.year is not None:
+                row[genre_count] = BLOCK_WEIGHTS['year'] * (movie.year - year_mean) / year_std
+            if movie.rating is not None:
+                row[genre_count + 1] = BLOCK_WEIGHTS['rating'] * (movie.rating - rating_mean) / rating_std
+            if movie.directors:
+                columns = [director_offset + _bucket(name, DIRECTOR_BUCKETS) for name in movie.directors]
+                np.add.at(row, columns, BLOCK_WEIGHTS['director'] / np.sqrt(len(columns)))
+            if movie.actors:
+                columns = [actor_offset + _bucket(str(actor), ACTOR_BUCKETS) for actor in movie.actors]
+                np.add.at(row, columns, BLOCK_WEIGHTS['actors'] / np.sqrt(len(columns)))
+
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return rows / norms
+
+    @staticmethod
+    def _stats(values: List[float]) -> Tuple[float, float]:
+        if not values:
+            return 0.0, 1.0
+        std = float(np.std(values))
+        return float(np.mean(values)), std if std > 0 else 1.0
+
+    def build(self, movies: Iterable[MovieFeatures]) -> None:
+        """Replace the matrix with the given movies."""
+        movies = list(movies)
+        genres = sorted({genre for movie in movies for genre in movie.genres})
+        with self._lock:
+            self._genres = {genre: column for column, genre in enumerate(genres)}
+            self._year_stats = self._stats([movie.year for movie in movies if movie.year is not None])
+            self._rating_stats = self._stats([movie.rating for movie in movies if movie.rating is not None])
+            self._matrix = self._encode(movies)
+            self._ids = np.array([movie.id for movie in movies], dtype=np.int64)
+            self._positions = {movie.id: position for position, movie in enumerate(movies)}
+            self.built_at = time.time()
+
+    def add(self, movies: Iterable[MovieFeatures]) -> None:
+        """Insert or replace movies without rebuilding the matrix."""
+        movies = list(movies)
+        if not movies:
+            return
+        with self._lock:
+            new_genres = sorted({genre for movie in movies for genre in movie.genres} - set(self._genres))
+            if new_genres:
+                # New genre columns go in front of the year column, existing rows get zeros there
+                genre_count = len(self._genres)
+                self._matrix = np.insert(self._matrix, [genre_count] * len(new_genres), 0.0, axis=1)
+                for offset, genre in enumerate(new_genres):
+                    self._genres[genre] = genre_count + offset
+
+            rows = self._encode(movies)
+            appended = []
+            for movie, row in zip(movies, rows):
+                position = self._positions.get(movie.id)
+                if position is None:
+                    appended.append((movie.id, row))
+                else:
+                    self._matrix[position] = row
+            if appended:
+                start = len(self._ids)
+                self._matrix = np.vstack([self._matrix] + [row[None, :] for _, row in appended])
+                self._ids = np.concatenate([self._ids, [movie_id for movie_id, _ in appended]])
+                for offset, (movie_id, _) in enumerate(appended):
+                    self._positions[movie_id] = start + offset
+
+    def remove(self, movie_ids: Iterable[int]) -> None:
+        """Remove movies from the matrix."""
+        with self._lock:
+            positions = [self._positions[movie_id] for movie_id in movie_ids if movie_id in self._positions]
+            if not positions:
+                return
+            self._matrix = np.delete(self._matrix, positions, axis=0)
+            self._ids = np.delete(self._ids, positions)
+            self._positions = {int(movie_id): position for position, movie_id in enumerate(self._ids)}
+
+    def queue(self, movie_ids: Iterable[int]) -> None:
+        """Mark movies as changed; they are (re)loaded on the next query."""
+        with self._lock:
+            self._pending.update(movie_ids)
+
+    def ensure_fresh(self) -> None:
+        """Load the matrix on first use, apply queued movies and rebuild once older than max_age."""
+        if self.built_at is None or time.time() - self.built_at > self.max_age:
+            with self._lock:
+                self._pending.clear()
+            with self.data_manager.session_scope() as session:
+                self.build(load_features(session).values())
+            return
+
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        if pending:
+            with self.data_manager.session_scope() as session:
+                features = load_features(session, pending)
+            self.remove(pending - set(features))
+            self.add(features.values())
+
+    def _top_k(self, scores: np.ndarray, k: int, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """Best k (movie_id, score) pairs of a score vector over all rows."""
+        scores = scores.copy()
+        excluded = [self._positions[movie_id] for movie_id in exclude if movie_id in self._positions]
+        scores[excluded] = -np.inf
+        k = min(k, len(scores) - len(excluded))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((self._ids[top], -scores[top]))]
+        return [(int(self._ids[position]), round(float(scores[position]), 4))
+                for position in top if scores[position] > 0]
+
+    def similar(self, movie_id: int, k: int = 10, exclude: Iterable[int] = ()) -> List[Tuple[int, float]]:
+        """Movies with the highest cosine similarity to movie_id."""
+        self.ensure_fresh()
+        with self._lock:
+            position = self._positions.get(movie_id)
+            if position is None:
+                return []
+            return self._top_k(self._matrix @ self._matrix[position], k, set(exclude) | {movie_id})
+
+    def similar_batch(self, movie_ids: Sequence[int], k: int = 10) -> Dict[int, List[Tuple[int, float]]]:
+        """Top-k similar movies for several movies with one matrix product."""
+        self.ensure_fresh()
+        with self._lock:
+            known = [movie_id for movie_id in movie_ids if movie_id in self._positions]
+            if not known:
+                return {}
+            scores = self._matrix @ self._matrix[[self._positions[movie_id] for movie_id in known]].T
+            return {movie_id: self._top_k(scores[:, column], k, {movie_id})
+                    for column, movie_id in enumerate(known)}
+
+    def recommend(self, profile: Dict[int, float], k: int = 10, exclude: Iterable[int] = (),
+                  candidates: Optional[Iterable[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Movies closest to a weighted profile of movies (e.g. from user_profile()).
+
+        The profile vector is the weighted sum of the movie rows, negative
+        weights push away from disliked movies. Rated movies are excluded.
+        If candidates is given, only those movies are ranked.
+        """
+        self.ensure_fresh()
+        with self._lock:
+            weights = np.zeros(len(self._ids), dtype=np.float32)
+            for movie_id, weight in profile.items():
+                position = self._positions.get(movie_id)
+                if position is not None:
+                    weights[position] += weight
+            if not weights.any():
+                return []
+            query = weights @ self._matrix
+            scores = self._matrix @ query
+            excluded = set(exclude) | set(profile)
+            if candidates is not None:
+                allowed = set(candidates)
+                excluded |= set(self._positions) - allowed
+            norm = np.linalg.norm(query)
+            return self._top_k(scores / norm if norm else scores, k, excluded)
+
+
+def user_profile(session, user_id: int) -> Dict[int, float]:
+    """Movie weights of a user from reviews, favorites and watched movies."""
+    profile: Dict[int, float] = {}
+    for movie_id, rating in session.query(Review.movie_id, Review.rating).filter(
+            Review.user_id == user_id, Review.rating.isnot(None)):
+        profile[movie_id] = profile.get(movie_id, 0.0) + rating - REVIEW_NEUTRAL
+    for movie_id, favorite, watched in session.query(
+            UserMovie.movie_id, UserMovie.favorite, UserMovie.watched).filter(UserMovie.user_id == user_id):
+        weight = FAVORITE_WEIGHT if favorite else WATCHED_WEIGHT if watched else 0.0
+        profile[movie_id] = profile.get(movie_id, 0.0) + weight
+    return {movie_id: weight for movie_id, weight in profile.items() if weight}
+
+
+def _collect_movies(session, flush_context) -> None:
+    """Remember movies whose features changed in this flush."""
+    pending: Set[int] = session.info.setdefault(_PENDING_MOVIES, set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Movie):
+            pending.add(instance.id)
+        elif isinstance(instance, MovieActor):
+            pending.add(instance.movie_id)
+
+
+def _queue_movies(session) -> None:
+    """Queue the committed movies in all registered engines."""
+    pending = session.info.pop(_PENDING_MOVIES, None)
+    if pending:
+        for engine in list(_engines):
+            engine.queue(pending)
+
+
+def _discard_movies(session) -> None:
+    """Rolled back changes are never queued."""
+    session.info.pop(_PENDING_MOVIES, None)
+
+
+def register_vector_engine(engine: MovieVectorEngine, session_class=Session) -> None:
+    """Keep the engine current with committed movie changes (idempotent)."""
+    _engines.add(engine)
+    listeners = [
+        ('after_flush', _collect_movies),
+        ('after_commit', _queue_movies),
+        ('after_rollback', _discard_movies),
+    ]
+    for name, handler in listeners:
+        if not event.contains(session_class, name, handler):
+            event.listen(session_class, name, handler)
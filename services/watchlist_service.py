@@ -24,7 +24,7 @@ class WatchlistService:
             Exception if movie doesn't exist
         """
         try:
-            with self.data_manager.SessionFactory() as session:
+            with self.data_manager.session_scope() as session:
                 # Check if the movie is already in the watchlist
                 existing = session.query(WatchlistItem).filter_by(
                     user_id=user_id,
@@ -56,7 +56,7 @@ class WatchlistService:
     def get_watchlist(self, user_id: int) -> List[WatchlistItem]:
         """Get all watchlist entries for a user."""
         try:
-            with self.data_manager.SessionFactory() as session:
+            with self.data_manager.session_scope() as session:
                 items = session.query(WatchlistItem).filter_by(user_id=user_id).all()
                 # Explicitly load the associated movies
                 for item in items:
@@ -68,7 +68,7 @@ class WatchlistService:
     def remove_from_watchlist(self, user_id: int, movie_id: int) -> bool:
         """Remove a movie from a user's watchlist."""
         try:
-            with self.data_manager.SessionFactory() as session:
+            with self.data_manager.session_scope() as session:
                 item = session.query(WatchlistItem).filter_by(
                     user_id=user_id,
                     movie_id=movie_id
@@ -85,7 +85,7 @@ class WatchlistService:
     def is_in_watchlist(self, user_id: int, movie_id: int) -> bool:
         """Check if a movie is already in the user's watchlist."""
         try:
-            with self.data_manager.SessionFactory() as session:
+            with self.data_manager.session_scope() as session:
                 return session.query(WatchlistItem).filter_by(
                     user_id=user_id,
                     movie_id=movie_id
@@ -96,7 +96,7 @@ class WatchlistService:
     def get_watchlist_count(self, user_id: int) -> int:
         """Get the number of movies in the watchlist."""
         try:
-            with self.data_manager.SessionFactory() as session:
+            with self.data_manager.session_scope() as session:
                 return session.query(WatchlistItem).filter_by(user_id=user_id).count()
         except Exception as e:
             raise Exception(f"Error getting watchlist count: {str(e)}")
@@ -104,7 +104,7 @@ class WatchlistService:
     def clear_watchlist(self, user_id: int) -> bool:
         """Clear all movies from a user's watchlist."""
         try:
-            with self.data_manager.SessionFactory() as session:
+            with self.data_manager.session_scope() as session:
                 items = session.query(WatchlistItem).filter_by(user_id=user_id).all()
                 for item in items:
                     session.delete(item)
@@ -116,7 +116,7 @@ class WatchlistService:
     def get_popular_watchlist_movies(self, limit: int = 10) -> List[dict]:
         """Get the most popular movies in watchlists."""
         try:
-            with self.data_manager.SessionFactory() as session:
+            with self.data_manager.session_scope() as session:
                 from sqlalchemy import func
 
                 popular_movies = session.query(
@@ -141,7 +141,7 @@ class WatchlistService:
     def get_recent_additions(self, user_id: int, limit: int = 5) -> List[WatchlistItem]:
         """Get the most recently added movies to a user's watchlist."""
         try:
-            with self.data_manager.SessionFactory() as session:
+            with self.data_manager.session_scope() as session:
                 items = session.query(WatchlistItem).filter_by(
                     user_id=user_id
                 ).order_by(
@@ -20,6 +20,12 @@ class MovieRecommendations {
             generateBtn.addEventListener('click', (e) => this.generateRecommendation(e));
         }
 
+        // AI Recommendation still being generated in the background
+        const pending = document.getElementById('ai-recommendation-pending');
+        if (pending) {
+            this.pollRecommendation(pending.dataset.movieId, document.getElementById('ai-recommendation-content'));
+        }
+
         // Similar Movies Load More
         const loadMoreBtn = document.getElementById('load-more-similar');
         if (loadMoreBtn) {
@@ -53,14 +59,12 @@ class MovieRecommendations {
                 throw new Error(`HTTP ${response.status}: ${response.statusText}`);
             }
 
-            const data = await response.json();
-
-            if (data.recommendation) {
-                this.displayRecommendation(container, data.recommendation);
-                this.showToast('KI-Empfehlung erfolgreich generiert!', 'success');
-            } else {
+            // Die Empfehlung wird im Hintergrund erzeugt, Ergebnis per Polling abholen
+            const recommendation = await this.pollRecommendation(movieId, container);
+            if (!recommendation) {
                 throw new Error('Keine Empfehlung erhalten');
             }
+            this.showToast('KI-Empfehlung erfolgreich generiert!', 'success');
 
         } catch (error) {
             console.error('Fehler beim Generieren der Empfehlung:', error);
@@ -76,6 +80,34 @@ class MovieRecommendations {
         }
     }
 
+    async pollRecommendation(movieId, container, interval = 3000, attempts = 40) {
+        for (let attempt = 0; attempt < attempts; attempt++) {
+            await new Promise(resolve => setTimeout(resolve, interval));
+
+            const response = await fetch(`/movies/${movieId}/recommendation`);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+            }
+
+            const data = await response.json();
+            if (data.status === 'ready' && data.recommendation) {
+                this.displayRecommendation(container, data.recommendation);
+                return data.recommendation;
+            }
+            if (data.status === 'failed') {
+                break;
+            }
+        }
+
+        container.innerHTML = `
+            <div class="error-message">
+                <i class="fas fa-exclamation-triangle"></i>
+                KI-Empfehlung ist gerade nicht verfügbar. Bitte später erneut versuchen.
+            </div>
+        `;
+        return null;
+    }
+
     displayRecommendation(container, recommendation) {
         const movie = recommendation.movie;
         container.innerHTML = `
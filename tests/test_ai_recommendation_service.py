@@ -0,0 +1,116 @@
+"""
+Tests for the background AI recommendations.
+"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from data_models import Movie, MovieRecommendation
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.ai_recommendation_service import AIRecommendationService, correct_rating, parse_ai_response
+
+
+class StubAIClient:
+    """Returns a fixed answer once released, so the pending state can be observed."""
+
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.release = threading.Event()
+        self.calls = 0
+        self.refreshes = []
+
+    def ai_request(self, movie_info, refresh=False):
+        self.calls += 1
+        self.refreshes.append(refresh)
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return self.response
+
+
+@pytest.fixture
+def data_manager(tmp_path):
+    """File database, the worker threads need to see the same data."""
+    data_manager = SQliteDataManager(f"sqlite:///{tmp_path / 'movies.db'}")
+    with data_manager.SessionFactory() as session:
+        session.add_all([
+            Movie(id=1, title='Alien', genre='Horror, Sci-Fi', release_year=1979),
+            Movie(id=2, title='Aliens', genre='Action, Sci-Fi', release_year=1986),
+        ])
+        session.commit()
+    return data_manager
+
+
+def get_status(service, data_manager, movie_id=1):
+    with data_manager.SessionFactory() as session:
+        result = service.get(session, movie_id)
+        return result.status, result.movie.title if result.movie else None, result.reason
+
+
+class TestAIRecommendationService:
+    """Tests for the pending, ready and failed states."""
+
+    def test_generated_in_background(self, data_manager):
+        """The first read is pending without waiting for the AI, later reads are served from the table."""
+        client = StubAIClient({'movie': {'title': 'aliens'}, 'reasoning': 'Same universe'})
+        service = AIRecommendationService(data_manager, client)
+
+        assert get_status(service, data_manager) == ('pending', None, None)
+        assert get_status(service, data_manager) == ('pending', None, None)
+        client.release.set()
+        service.shutdown(wait=True)
+
+        assert get_status(service, data_manager) == ('ready', 'Aliens', 'Same universe')
+        assert client.calls == 1
+        assert client.refreshes == [False]
+
+    def test_unknown_movie_is_added(self, data_manager):
+        """Recommended movies that are not in the catalog are created with a corrected rating."""
+        client = StubAIClient({'movie': {'title': 'Predator', 'year': '1987', 'imdb': '1234567'},
+                               'reasoning': 'Creature hunt'})
+        client.release.set()
+        service = AIRecommendationService(data_manager, client)
+        service.request(1)
+        service.shutdown(wait=True)
+
+        with data_manager.SessionFactory() as session:
+            predator = session.query(Movie).filter_by(title='Predator').one()
+            assert predator.release_year == 1987
+            assert predator.rating == 7.5
+
+    def test_failure_is_retried_later(self, data_manager):
+        """A failed generation is remembered for a while instead of hitting the AI on every view."""
+        client = StubAIClient(error=RuntimeError('quota exceeded'))
+        client.release.set()
+        service = AIRecommendationService(data_manager, client)
+        service.request(1)
+        service.shutdown(wait=True)
+
+        service = AIRecommendationService(data_manager, client)
+        assert get_status(service, data_manager)[0] == 'failed'
+        assert client.calls == 1
+
+    def test_expired_recommendation_is_served_while_refreshing(self, data_manager):
+        """Expired recommendations stay visible while a new one is generated."""
+        with data_manager.SessionFactory() as session:
+            session.add(MovieRecommendation(source='ai', source_movie_id=1, movie_id=2, reason='Old',
+                                            status='ready', recommended_at=datetime.utcnow() - timedelta(days=8),
+                                            expires_at=datetime.utcnow() - timedelta(days=1)))
+            session.commit()
+
+        client = StubAIClient({'movie': {'title': 'Aliens'}, 'reasoning': 'New'})
+        service = AIRecommendationService(data_manager, client)
+        assert get_status(service, data_manager) == ('ready', 'Aliens', 'Old')
+        client.release.set()
+        service.shutdown(wait=True)
+        assert get_status(service, data_manager) == ('ready', 'Aliens', 'New')
+        assert client.refreshes == [True]
+
+    def test_response_parsing(self):
+        """Both response formats are understood, OMDB errors are rejected."""
+        assert parse_ai_response({'title': 'Heat', 'explanation': 'Crime'})[1] == 'Crime'
+        assert parse_ai_response({'movie': {'error': 'Movie not found'}}) == (None, None)
+        assert correct_rating(85) == 8.5
+        assert correct_rating(0) == 6.5
@@ -0,0 +1,78 @@
+"""
+Tests for the lazy AI client setup and the response cache.
+"""
+import pytest
+
+import ai_request
+from ai_request import AIRequest, get_ai_client
+from services.llm_cache import response_key
+
+
+class TestLazyInitialization:
+    """The model is neither configured on import nor per AIRequest instance."""
+
+    def test_import_and_construction_are_offline(self, monkeypatch):
+        created = []
+        monkeypatch.setattr(ai_request, '_model', None)
+        monkeypatch.setattr(ai_request.genai, 'GenerativeModel', lambda *args, **kwargs: created.append(args) or object())
+
+        client = AIRequest()
+        assert created == []
+
+        assert client.model is AIRequest().model
+        assert len(created) == 1
+
+    def test_injected_model(self):
+        model = object()
+
+        assert AIRequest(model).model is model
+
+    def test_shared_client(self):
+        assert get_ai_client() is get_ai_client()
+
+
+class StubModel:
+    """Answers with a numbered JSON object and records the generation configs."""
+
+    def __init__(self):
+        self.configs = []
+
+    def generate_content(self, prompt, generation_config=None, request_options=None):
+        self.configs.append(generation_config)
+        return type('Response', (), {'text': f'{{"answer": {len(self.configs)}}}'})()
+
+
+class StubCache:
+    """In-memory stand-in for the LLM response cache."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, model, prompt, settings=None):
+        return self.entries.get(response_key(model, prompt, settings))
+
+    def set(self, model, prompt, settings, text):
+        self.entries[response_key(model, prompt, settings)] = text
+
+
+class TestResponseCache:
+    """Cached answers are keyed by the effective config and can be refreshed."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(ai_request, 'response_cache', StubCache())
+        return AIRequest(StubModel())
+
+    def test_identical_prompts_are_cached(self, client):
+        assert client._generate_json('prompt') == client._generate_json('prompt') == {'answer': 1}
+
+    def test_refresh_replaces_the_cached_answer(self, client):
+        client._generate_json('prompt')
+
+        assert client._generate_json('prompt', refresh=True) == {'answer': 2}
+        assert client._generate_json('prompt') == {'answer': 2}
+
+    def test_key_uses_the_effective_config(self, client):
+        client._generate_json('prompt')
+
+        assert client._generate_json('prompt', config=ai_request.batch_generation_config) == {'answer': 2}
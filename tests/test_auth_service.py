@@ -0,0 +1,59 @@
+"""
+Tests for the authentication service.
+"""
+import pytest
+from flask import Flask
+
+from data_models import User
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services import auth_service
+from services.auth_service import init_login_manager
+from services.cache_invalidation import register_cache_invalidation
+from services.cache_service import LRUCache
+
+
+@pytest.fixture
+def login_setup(monkeypatch):
+    """Flask app with login manager on an in-memory database."""
+    monkeypatch.setattr(auth_service, 'user_cache', LRUCache(default_timeout=60))
+    data_manager = SQliteDataManager("sqlite:///:memory:")
+    register_cache_invalidation()
+
+    with data_manager.SessionFactory() as session:
+        session.add(User(id=1, username='tester', email='t@example.com', password_hash='x'))
+        session.commit()
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    login_manager = init_login_manager(app, data_manager)
+    return data_manager, login_manager._user_callback
+
+
+class TestUserLoader:
+    """Tests for the Flask-Login user loader."""
+
+    def test_user_is_cached(self, login_setup):
+        """Repeated loads of the same user are served from the worker cache."""
+        data_manager, load_user = login_setup
+        first = load_user('1')
+
+        assert first.username == 'tester'
+        assert load_user('1') is first
+        assert auth_service.user_cache.stats()['hits'] == 1
+
+    def test_unknown_user(self, login_setup):
+        """Unknown ids return None and are not cached."""
+        _, load_user = login_setup
+        assert load_user('99') is None
+        assert len(auth_service.user_cache) == 0
+
+    def test_committed_change_evicts_user(self, login_setup):
+        """Changing a user reloads it on the next request."""
+        data_manager, load_user = login_setup
+        load_user('1')
+
+        with data_manager.SessionFactory() as session:
+            session.get(User, 1).theme = 'dark'
+            session.commit()
+
+        assert load_user('1').theme == 'dark'
@@ -0,0 +1,70 @@
+"""
+Tests for the database bootstrap and the achievement catalog.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from data_models import Achievement, AppMeta, QuizAttempt, User, UserAchievement
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services import bootstrap
+from services.achievement_service import ACHIEVEMENT_CATALOG, AchievementService
+from services.bootstrap import SCHEMA_VERSION_KEY, bootstrap_database, schema_version
+
+
+@pytest.fixture
+def file_engine(tmp_path, monkeypatch):
+    """Engine on a temporary SQLite file with an empty bootstrap registry."""
+    monkeypatch.setattr(bootstrap, '_bootstrapped', {})
+    engine = create_engine(f"sqlite:///{tmp_path / 'bootstrap.db'}")
+    return engine, sessionmaker(bind=engine)
+
+
+class TestBootstrap:
+    """Tests for the one-time bootstrap."""
+
+    def test_seeds_catalog_and_version(self, file_engine):
+        """A fresh database gets all achievements and the schema version."""
+        engine, factory = file_engine
+        refs = bootstrap_database(engine, factory)
+
+        assert set(refs) == {data['code'] for data in ACHIEVEMENT_CATALOG}
+        with factory() as session:
+            assert session.query(Achievement).count() == len(ACHIEVEMENT_CATALOG)
+            assert session.get(AppMeta, SCHEMA_VERSION_KEY).value == schema_version()
+
+    def test_runs_once_per_process(self, file_engine):
+        """A second data manager for the same database reuses the map."""
+        engine, factory = file_engine
+        first = bootstrap_database(engine, factory)
+        assert bootstrap_database(engine, factory) is first
+
+    def test_current_version_skips_seeding(self, file_engine, monkeypatch):
+        """With a matching version only the achievement map is loaded."""
+        engine, factory = file_engine
+        bootstrap_database(engine, factory)
+        monkeypatch.setattr(bootstrap, '_bootstrapped', {})
+        monkeypatch.setattr(bootstrap, 'seed_achievements', lambda session: pytest.fail('seeded again'))
+
+        assert len(bootstrap_database(engine, factory)) == len(ACHIEVEMENT_CATALOG)
+
+
+class TestAchievementGrant:
+    """Tests for granting achievements via the in-memory map."""
+
+    def test_quiz_beginner_is_granted_once(self):
+        """The first quiz grants quiz_beginner exactly once."""
+        data_manager = SQliteDataManager("sqlite:///:memory:")
+        with data_manager.SessionFactory() as session:
+            session.add(User(id=1, username='tester', email='t@example.com', password_hash='x'))
+            session.add(QuizAttempt(user_id=1, movie_id=1, score=100, total_questions=5, difficulty='leicht'))
+            session.commit()
+
+        service = AchievementService(data_manager)
+        titles = [a['title'] for a in service.check_quiz_achievements(1, 100, 'leicht')]
+        assert '🎉 Quiz Beginner' in titles
+        assert service.check_quiz_achievements(1, 100, 'leicht') == []
+
+        with data_manager.SessionFactory() as session:
+            beginner_id = data_manager.achievements['quiz_beginner'].id
+            assert session.query(UserAchievement).filter_by(achievement_id=beginner_id).count() == 1
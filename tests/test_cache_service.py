@@ -0,0 +1,405 @@
+"""
+Tests for the cache service.
+"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import make_transient_to_detached, sessionmaker
+
+from data_models import Base, Movie, MovieRecommendation, Review, User
+from services import cache_service
+from services.cache_invalidation import register_cache_invalidation, tags_for
+from services.cache_service import (CacheEntry, CacheServer, LRUCache, SocketCache, cached,
+                                    create_cache_backend, invalidate_tags, make_cache_key)
+
+
+@pytest.fixture
+def lru_cache():
+    """Small cache instance for each test."""
+    return LRUCache(default_timeout=60, max_entries=3, max_bytes=10_000, sweep_interval=0)
+
+
+class TestLRUCache:
+    """Tests for the bounded LRU/TTL cache engine."""
+
+    def test_set_and_get(self, lru_cache):
+        """Stored values can be read back."""
+        lru_cache.set('a', {'value': 1})
+        assert lru_cache.get('a') == {'value': 1}
+
+    def test_lru_eviction(self, lru_cache):
+        """The least recently used entry is evicted first."""
+        lru_cache.set('a', 1)
+        lru_cache.set('b', 2)
+        lru_cache.set('c', 3)
+        lru_cache.get('a')
+        lru_cache.set('d', 4)
+
+        assert lru_cache.get('b') is None
+        assert lru_cache.get('a') == 1
+        assert lru_cache.stats()['evictions'] == 1
+
+    def test_byte_budget(self):
+        """Entries are evicted when the byte budget is exceeded."""
+        small_cache = LRUCache(max_entries=100, max_bytes=300)
+        small_cache.set('a', 'x' * 200)
+        small_cache.set('b', 'y' * 200)
+
+        assert small_cache.get('a') is None
+        assert small_cache.get('b') == 'y' * 200
+        assert small_cache.stats()['bytes'] <= 300
+
+    def test_oversized_value_is_not_stored(self):
+        """A value larger than the whole budget is ignored."""
+        small_cache = LRUCache(max_bytes=100)
+        small_cache.set('big', 'x' * 1000)
+        assert small_cache.get('big') is None
+        assert len(small_cache) == 0
+
+    def test_zero_timeout_is_not_cached(self, lru_cache):
+        """An explicit timeout of 0 stores nothing instead of falling back to the default TTL."""
+        lru_cache.set('a', 1)
+        lru_cache.set('a', 2, timeout=0)
+        lru_cache.set('b', 3, timeout=-1)
+
+        assert lru_cache.get('a') is None
+        assert lru_cache.get('b') is None
+        assert len(lru_cache) == 0
+
+    def test_expiry_sweep(self, lru_cache):
+        """Expired entries are removed by the sweep without being read."""
+        lru_cache.set('a', 1, timeout=0.01)
+        lru_cache.set('b', 2)
+        time.sleep(0.02)
+        lru_cache.set('c', 3)
+
+        assert len(lru_cache) == 2
+        assert lru_cache.stats()['expirations'] == 1
+
+    def test_add_only_sets_missing_keys(self, lru_cache):
+        """add() is a set-if-absent operation."""
+        assert lru_cache.add('lock', 1) is True
+        assert lru_cache.add('lock', 2) is False
+        assert lru_cache.get('lock') == 1
+
+    def test_hit_miss_counters(self, lru_cache):
+        """Hits and misses are counted."""
+        lru_cache.set('a', 1)
+        lru_cache.get('a')
+        lru_cache.get('missing')
+
+        stats = lru_cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+
+@pytest.fixture
+def cache_server(tmp_path):
+    """Shared cache server on a temporary Unix socket."""
+    address = str(tmp_path / 'cache.sock')
+    server = CacheServer(address, 'AF_UNIX', b'test-key')
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    for _ in range(100):
+        if server._listener is not None:
+            break
+        time.sleep(0.01)
+
+    yield address
+    server.close()
+
+
+class TestSharedCache:
+    """Tests for the shared socket cache backend."""
+
+    def test_clients_share_entries(self, cache_server):
+        """A value written by one client is visible to another one."""
+        first = SocketCache(cache_server, 'AF_UNIX', b'test-key')
+        second = SocketCache(cache_server, 'AF_UNIX', b'test-key')
+
+        first.set('shared', [1, 2, 3])
+        assert second.get('shared') == [1, 2, 3]
+
+        second.delete('shared')
+        assert first.get('shared') is None
+
+        first.set('uncached', 1, timeout=0)
+        assert second.get('uncached') is None
+
+    def test_unreachable_server_behaves_like_miss(self, tmp_path):
+        """Without a server, reads miss and writes are dropped."""
+        client = SocketCache(str(tmp_path / 'missing.sock'), 'AF_UNIX', b'test-key')
+        client.set('a', 1)
+        assert client.get('a') is None
+        assert client.stats() == {}
+
+    def test_backend_from_url(self):
+        """The backend is selected by the cache URL."""
+        assert isinstance(create_cache_backend('memory://'), LRUCache)
+        assert isinstance(create_cache_backend('unix:///tmp/movieapp-cache.sock'), SocketCache)
+        with pytest.raises(ValueError):
+            create_cache_backend('redis://localhost')
+
+
+class TestCachedDecorator:
+    """Tests for the cached decorator."""
+
+    def test_result_is_reused(self):
+        """The wrapped function only runs once for the same arguments."""
+        calls = []
+
+        @cached(timeout=60, key_prefix='test')
+        def double(x):
+            calls.append(x)
+            return x * 2
+
+        assert double(21) == 42
+        assert double(21) == 42
+        assert calls == [21]
+
+    def test_invalidate(self):
+        """invalidate() removes the cached result for the given arguments."""
+        calls = []
+
+        @cached(timeout=60)
+        def lookup(movie_id, difficulty='mittel'):
+            calls.append(movie_id)
+            return {'movie_id': movie_id}
+
+        lookup(1)
+        lookup(movie_id=1, difficulty='mittel')
+        assert calls == [1]
+
+        lookup.invalidate(1)
+        lookup(1)
+        assert calls == [1, 1]
+
+
+class TestStampedeProtection:
+    """Tests for single-flight recomputation and early refresh."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(cache_service, 'cache', LRUCache())
+
+    def test_single_flight(self):
+        """Concurrent callers of a missing entry trigger one computation."""
+        calls = []
+
+        @cached(timeout=60)
+        def slow_query():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'result'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow_query())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == [1]
+        assert results == ['result'] * 5
+
+    def test_stale_value_is_served_during_recompute(self):
+        """While one caller recomputes, others get the expired value."""
+        @cached(timeout=60, stale_ttl=60)
+        def top_movies():
+            return 'fresh'
+
+        key = top_movies.cache_key()
+        cache_service.cache.set(key, CacheEntry('stale', time.time() - 1, 0.1), 60)
+        cache_service.cache.add(f"{key}:lock", 1, 60)
+
+        assert top_movies() == 'stale'
+
+        cache_service.cache.delete(f"{key}:lock")
+        assert top_movies() == 'fresh'
+
+    def test_early_refresh(self, monkeypatch):
+        """A nearly expired, expensive entry can be refreshed ahead of time."""
+        entry = CacheEntry('value', time.time() + 1, 10.0)
+
+        monkeypatch.setattr(cache_service.random, 'random', lambda: 0.5)
+        assert cache_service._should_refresh(entry, early_refresh=1.0) is True
+        assert cache_service._should_refresh(entry, early_refresh=0.0) is False
+
+
+class TestNegativeCaching:
+    """Tests for caching None and empty results."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(cache_service, 'cache', LRUCache())
+
+    def test_none_is_cached(self):
+        """A None result is a cached answer, not a miss."""
+        calls = []
+
+        @cached(timeout=600)
+        def find_movie(title):
+            calls.append(title)
+            return None
+
+        assert find_movie('Unknown') is None
+        assert find_movie('Unknown') is None
+        assert calls == ['Unknown']
+
+    def test_negative_results_use_shorter_ttl(self):
+        """Empty and matching results expire after negative_timeout."""
+        @cached(timeout=600, negative_timeout=30,
+                negative_when=lambda result: 'error' in result)
+        def lookup(kind):
+            return {'empty': [], 'error': {'error': 'Movie not found'}, 'hit': {'title': 'Alien'}}[kind]
+
+        now = time.time()
+        for kind, lifetime in (('empty', 30), ('error', 30), ('hit', 600)):
+            lookup(kind)
+            entry = cache_service.cache.get(lookup.cache_key(kind))
+            assert entry.expires - now == pytest.approx(lifetime, abs=1)
+
+
+class TestTagInvalidation:
+    """Tests for tag-based invalidation."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(cache_service, 'cache', LRUCache())
+
+    @pytest.fixture
+    def session_factory(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        factory = sessionmaker(bind=engine)
+        register_cache_invalidation()
+        return factory
+
+    def test_invalidate_tags(self):
+        """Results with an invalidated tag are recomputed."""
+        calls = []
+
+        @cached(timeout=600, tags=['movie:{movie_id}'])
+        def reviews_for(movie_id):
+            calls.append(movie_id)
+            return [movie_id]
+
+        reviews_for(1)
+        reviews_for(2)
+        invalidate_tags('movie:1')
+        reviews_for(1)
+        reviews_for(2)
+
+        assert calls == [1, 2, 1]
+
+    def test_commit_purges_dependent_tags(self, session_factory):
+        """A committed review evicts the cached views of its movie."""
+        calls = []
+
+        @cached(timeout=600, tags=['movie:{movie_id}'])
+        def review_count(movie_id):
+            calls.append(movie_id)
+            with session_factory() as session:
+                return session.query(Review).filter_by(movie_id=movie_id).count()
+
+        with session_factory() as session:
+            session.add_all([
+                User(id=1, username='tester', email='t@example.com', password_hash='x'),
+                Movie(id=1, title='Alien')
+            ])
+            session.commit()
+
+        assert review_count(1) == 0
+
+        with session_factory() as session:
+            session.add(Review(user_id=1, movie_id=1, rating=8))
+            session.commit()
+
+        assert review_count(1) == 1
+        assert calls == [1, 1]
+
+    def test_rollback_keeps_cache(self, session_factory):
+        """Rolled back writes do not invalidate anything."""
+        calls = []
+
+        @cached(timeout=600, tags=['movies'])
+        def movie_count():
+            calls.append(1)
+            return 1
+
+        movie_count()
+        with session_factory() as session:
+            session.add(Movie(title='Never committed'))
+            session.flush()
+            session.rollback()
+        movie_count()
+
+        assert calls == [1]
+
+    def test_recommendation_tags_by_source(self):
+        """Only per-user recommendation rows evict the users' recommendation caches."""
+        collaborative = MovieRecommendation(source='collaborative', user_id=3, movie_id=1)
+        ai = MovieRecommendation(source='ai', source_movie_id=1, movie_id=2)
+
+        assert tags_for(collaborative) == ['recommendations', 'recommendations:3']
+        assert tags_for(ai) == ['ai_recommendation:1']
+
+
+class TestCacheKeys:
+    """Tests for deterministic cache key derivation."""
+
+    @staticmethod
+    def _get_movie(movie, user_id=None):
+        return movie
+
+    def test_positional_and_keyword_calls_match(self):
+        """Binding to the signature makes argument style irrelevant."""
+        first = make_cache_key(self._get_movie, (1,), {})
+        second = make_cache_key(self._get_movie, (), {'movie': 1, 'user_id': None})
+        assert first == second
+
+    def test_key_is_process_independent(self):
+        """The key is a fixed digest and not a salted hash()."""
+        key = make_cache_key(self._get_movie, ('Alien',), {})
+        assert len(key.rsplit(':', 1)[1]) == 64
+        assert key == make_cache_key(self._get_movie, ('Alien',), {})
+
+    def test_orm_objects_use_primary_key(self):
+        """ORM instances are keyed by identity, not by their repr."""
+        movie = Movie(id=5, title='Alien')
+        make_transient_to_detached(movie)
+        renamed = Movie(id=5, title='Aliens')
+        make_transient_to_detached(renamed)
+
+        assert make_cache_key(self._get_movie, (movie,), {}) == \
+            make_cache_key(self._get_movie, (renamed,), {})
+
+    def test_self_is_not_part_of_the_key(self):
+        """Methods on different instances share cached results."""
+        class Service:
+            def __init__(self):
+                self.calls = 0
+
+            @cached(timeout=60)
+            def count(self, value):
+                self.calls += 1
+                return value
+
+        first, second = Service(), Service()
+        first.count(3)
+        second.count(3)
+        assert first.calls + second.calls == 1
+
+    def test_unsupported_argument_raises(self):
+        """Objects without a stable identity need key_func or ignore_args."""
+        with pytest.raises(TypeError):
+            make_cache_key(self._get_movie, (object(),), {})
+
+    def test_key_func_and_ignore_args(self):
+        """key_func and ignore_args control which values form the key."""
+        assert make_cache_key(self._get_movie, (1, object()), {}, ignore_args=('user_id',)) == \
+            make_cache_key(self._get_movie, (1, 42), {}, ignore_args=('user_id',))
+        assert make_cache_key(self._get_movie, (object(),), {}, key_func=lambda movie, **kw: 'fixed') == \
+            make_cache_key(self._get_movie, (None,), {}, key_func=lambda movie, **kw: 'fixed')
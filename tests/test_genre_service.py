@@ -0,0 +1,72 @@
+"""
+Tests for the normalized genre tables.
+"""
+import pytest
+
+from data_models import Genre, Movie, MovieGenre
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.genre_service import (backfill_movie_genres, genre_counts, genre_preference_filter,
+                                    movies_with_genres, split_genres)
+
+
+@pytest.fixture
+def data_manager():
+    """In-memory database with a few movies; genre links are synced on flush."""
+    data_manager = SQliteDataManager("sqlite:///:memory:")
+    with data_manager.SessionFactory() as session:
+        session.add_all([
+            Movie(id=1, title='Alien', genre='Horror, Sci-Fi'),
+            Movie(id=2, title='Heat', genre='Action, Crime, Thriller'),
+            Movie(id=3, title='Se7en', genre='Crime, Mystery, Thriller'),
+            Movie(id=4, title='Hot Fuzz', genre='action, comedy'),
+            Movie(id=5, title='Notebook', genre='Drama/Romance'),
+        ])
+        session.commit()
+    return data_manager
+
+
+def matching_ids(session, clause):
+    return sorted(movie_id for movie_id, in session.query(Movie.id).filter(clause))
+
+
+class TestGenreService:
+    """Tests for genre sync, backfill and filters."""
+
+    def test_split_genres(self):
+        """Genre strings are split, trimmed and deduplicated case-insensitively."""
+        assert split_genres(' action, Sci-Fi |ACTION / drama ') == ['Action', 'Sci-Fi', 'Drama']
+        assert split_genres(None) == []
+
+    def test_links_are_synced_on_flush(self, data_manager):
+        """New movies and genre changes update the link table."""
+        with data_manager.SessionFactory() as session:
+            assert [genre.name for genre in session.get(Movie, 4).genres] == ['Action', 'Comedy']
+            assert session.query(Genre).filter(Genre.name == 'Action').count() == 1
+
+            session.get(Movie, 4).genre = 'Comedy'
+            session.commit()
+            assert [genre.name for genre in session.get(Movie, 4).genres] == ['Comedy']
+
+    def test_backfill_rebuilds_links(self, data_manager):
+        """The backfill recreates links that were lost or written outside the ORM."""
+        with data_manager.SessionFactory() as session:
+            session.query(MovieGenre).delete()
+            session.commit()
+
+            assert backfill_movie_genres(session) == 12
+            session.commit()
+            assert matching_ids(session, movies_with_genres(['crime'])) == [2, 3]
+
+    def test_preference_filter(self, data_manager):
+        """Horror & Mystery includes thrillers unless they are action or comedy."""
+        with data_manager.SessionFactory() as session:
+            assert matching_ids(session, genre_preference_filter('Horror & Mystery')) == [1, 3]
+            assert matching_ids(session, genre_preference_filter('Drama & Gefühl')) == [5]
+            assert genre_preference_filter('Unbekannt') is None
+
+    def test_genre_counts(self, data_manager):
+        """Counts are per single genre, most common first."""
+        with data_manager.SessionFactory() as session:
+            counts = genre_counts(session)
+        assert counts[0] == {'name': 'Action', 'count': 2}
+        assert {'name': 'Sci-Fi', 'count': 1} in counts
@@ -0,0 +1,83 @@
+"""
+Tests for the JSON extraction from model responses.
+"""
+import pytest
+
+from utils.json_extraction import JSONExtractionError, contains_json, extract_json
+
+QUESTION = {'question': str, 'correct_answer': str, 'wrong_answers': [str]}
+
+
+class TestExtractJson:
+    """Tests for the single-pass extraction and repairs."""
+
+    def test_plain_json(self):
+        assert extract_json('{"title": "Alien", "year": 1979}') == {'title': 'Alien', 'year': 1979}
+
+    @pytest.mark.parametrize('text', [
+        '```json\n{"title": "Alien"}\n```',
+        '```\n{"title": "Alien"}\n```',
+        'Here is my recommendation:\n{"title": "Alien"}\nEnjoy!',
+    ])
+    def test_wrapped_json(self, text):
+        assert extract_json(text) == {'title': 'Alien'}
+
+    def test_brackets_inside_strings(self):
+        text = 'Answer: {"title": "Alien [Director\'s Cut] {1979}", "quote": "say \\"hi\\""} done'
+
+        assert extract_json(text) == {'title': "Alien [Director's Cut] {1979}", 'quote': 'say "hi"'}
+
+    def test_trailing_commas(self):
+        assert extract_json('{"genres": ["Horror", "Sci-Fi",], "title": "Alien",}') == \
+            {'genres': ['Horror', 'Sci-Fi'], 'title': 'Alien'}
+
+    def test_raw_line_breaks_in_strings(self):
+        assert extract_json('{"plot": "In space\nno one can hear you scream"}') == \
+            {'plot': 'In space\nno one can hear you scream'}
+
+    def test_truncated_response_is_closed(self):
+        """The last complete key or item is kept, a schema drops the incomplete element."""
+        text = '[{"question": "Q1", "correct_answer": "A"}, {"question": "Q2", "correct_ans'
+
+        assert extract_json(text) == [{'question': 'Q1', 'correct_answer': 'A'}, {'question': 'Q2'}]
+        assert extract_json(text, [{'question': str, 'correct_answer': str}]) == \
+            [{'question': 'Q1', 'correct_answer': 'A'}]
+
+    @pytest.mark.parametrize('text', [None, '', 'No JSON here', '{"title": ', '{"title": "Alien"]'])
+    def test_rejected(self, text):
+        with pytest.raises(JSONExtractionError):
+            extract_json(text)
+
+    def test_contains_json(self):
+        assert contains_json('```json\n[1, 2]\n```')
+        assert not contains_json('"just a string"')
+        assert not contains_json('Sorry, I cannot help with that.')
+
+
+class TestSchema:
+    """Tests for the schema validation."""
+
+    def test_invalid_items_are_dropped(self):
+        text = '''[
+            {"question": "Wer führte Regie?", "correct_answer": "Ridley Scott", "wrong_answers": ["A", "B", "C"]},
+            {"question": "Ohne Antworten?"},
+            {"question": "Falscher Typ?", "correct_answer": 42, "wrong_answers": []}
+        ]'''
+
+        questions = extract_json(text, [QUESTION])
+
+        assert [q['question'] for q in questions] == ['Wer führte Regie?']
+
+    def test_missing_key(self):
+        with pytest.raises(JSONExtractionError, match='year'):
+            extract_json('{"title": "Alien"}', {'title': str, 'year': (str, int)})
+
+    def test_prefers_expected_bracket(self):
+        """Text before the object may contain brackets of its own."""
+        text = 'Recommendation [1 of 1]: {"title": "Alien"}'
+
+        assert extract_json(text, {'title': str}) == {'title': 'Alien'}
+
+    def test_unwraps_common_shape_mixups(self):
+        assert extract_json('[{"title": "Alien"}]', {'title': str}) == {'title': 'Alien'}
+        assert extract_json('{"questions": [{"question": "Q"}]}', [dict]) == [{'question': 'Q'}]
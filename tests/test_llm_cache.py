@@ -0,0 +1,74 @@
+"""
+Tests for the persistent language model response cache.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, update
+
+from data_models import LLMResponse
+from services.llm_cache import LLMResponseCache, response_key
+
+MODEL = 'models/test'
+
+
+@pytest.fixture
+def cache():
+    """Cache on its own in-memory database."""
+    return LLMResponseCache(engine=create_engine("sqlite:///:memory:"), max_entries=3)
+
+
+class TestLLMResponseCache:
+    """Tests for lookups, expiry, size limit and metrics."""
+
+    def test_hit_after_write(self, cache):
+        """A stored response is returned for the identical prompt only."""
+        assert cache.get(MODEL, 'prompt', 0.9) is None
+        cache.set(MODEL, 'prompt', 0.9, '{"title": "Alien"}')
+
+        assert cache.get(MODEL, 'prompt', 0.9) == '{"title": "Alien"}'
+        assert cache.get(MODEL, 'prompt', 0.2) is None
+        assert cache.get('models/other', 'prompt', 0.9) is None
+
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['writes'], stats['entries']) == (1, 3, 1, 1)
+
+    def test_key_is_content_addressed(self):
+        """Keys depend on model, generation settings and prompt only."""
+        assert response_key(MODEL, 'a', 0.9) == response_key(MODEL, 'a', 0.9)
+        assert response_key(MODEL, 'a', 0.9) != response_key(MODEL, 'a ', 0.9)
+
+    def test_expired_entries_are_ignored_and_replaced(self, cache):
+        """Expired responses count as misses and are overwritten by the next write."""
+        cache.set(MODEL, 'prompt', 0.9, 'old')
+        with cache._sessions()() as session:
+            session.execute(update(LLMResponse).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+            session.commit()
+
+        assert cache.get(MODEL, 'prompt', 0.9) is None
+        cache.set(MODEL, 'prompt', 0.9, 'new')
+        assert cache.get(MODEL, 'prompt', 0.9) == 'new'
+
+    def test_prune_keeps_recently_used(self, cache):
+        """Above max_entries the least recently used responses are deleted."""
+        for number in range(5):
+            cache.set(MODEL, f'prompt {number}', 0.9, f'answer {number}')
+            with cache._sessions()() as session:
+                session.execute(update(LLMResponse).where(
+                    LLMResponse.key == response_key(MODEL, f'prompt {number}', 0.9)
+                ).values(last_hit_at=datetime(2024, 1, 1) + timedelta(minutes=number)))
+                session.commit()
+        cache.get(MODEL, 'prompt 0', 0.9)
+
+        assert cache.prune() == 2
+        assert cache.get(MODEL, 'prompt 0', 0.9) == 'answer 0'
+        assert cache.get(MODEL, 'prompt 1', 0.9) is None
+        assert cache.get(MODEL, 'prompt 4', 0.9) == 'answer 4'
+
+    def test_oversized_and_empty_responses_are_skipped(self, cache):
+        """Responses above max_bytes are not stored."""
+        cache.max_bytes = 10
+        cache.set(MODEL, 'long', 0.9, 'x' * 11)
+        cache.set(MODEL, 'empty', 0.9, '')
+        assert cache.get(MODEL, 'long', 0.9) is None
+        assert cache.stats()['skipped'] == 2
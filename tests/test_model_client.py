@@ -0,0 +1,122 @@
+"""
+Tests for the guarded model calls.
+"""
+import threading
+import time
+
+import pytest
+
+from services.model_client import ModelClient, ModelUnavailableError
+
+
+def fail():
+    raise ConnectionError('provider down')
+
+
+class TestModelClient:
+    """Tests for deadline, in-flight limit, circuit breaker and metrics."""
+
+    def test_returns_result_and_records_latency(self):
+        client = ModelClient(timeout=1)
+
+        assert client.call(lambda text: text.upper(), 'ok') == 'OK'
+        stats = client.stats()
+        assert stats['successes'] == 1
+        assert stats['state'] == 'closed'
+        assert stats['latency_max'] >= 0
+
+    def test_deadline(self):
+        """A hanging call is abandoned after the timeout."""
+        release = threading.Event()
+        client = ModelClient(timeout=0.05)
+
+        started = time.perf_counter()
+        with pytest.raises(ModelUnavailableError) as error:
+            client.call(release.wait, 5)
+        assert error.value.reason == 'timeout'
+        assert time.perf_counter() - started < 1
+        assert client.stats()['timeouts'] == 1
+        release.set()
+
+    def test_in_flight_limit(self):
+        """Abandoned calls keep their slot until they really return."""
+        release = threading.Event()
+        client = ModelClient(timeout=0.05, max_in_flight=1, queue_timeout=0.05)
+        with pytest.raises(ModelUnavailableError):
+            client.call(release.wait, 5)
+
+        with pytest.raises(ModelUnavailableError) as error:
+            client.call(lambda: 'ok')
+        assert error.value.reason == 'busy'
+
+        release.set()
+        time.sleep(0.05)
+        assert client.call(lambda: 'ok') == 'ok'
+        assert client.stats()['in_flight'] == 0
+
+    def test_errors_are_reraised(self):
+        client = ModelClient()
+
+        with pytest.raises(ConnectionError):
+            client.call(fail)
+        assert client.stats()['errors'] == 1
+
+    def test_circuit_opens_and_recovers(self):
+        calls = []
+        client = ModelClient(failure_threshold=2, reset_timeout=0.1)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                client.call(fail)
+        assert client.state == 'open'
+
+        # Fails fast without calling the provider
+        with pytest.raises(ModelUnavailableError) as error:
+            client.call(calls.append, 1)
+        assert error.value.reason == 'circuit_open'
+        assert calls == []
+
+        time.sleep(0.1)
+        assert client.state == 'half_open'
+        client.call(calls.append, 1)
+        assert client.state == 'closed'
+        assert client.stats()['circuit_opened'] == 1
+
+    def test_failed_probe_reopens(self):
+        client = ModelClient(failure_threshold=1, reset_timeout=0.1)
+        with pytest.raises(ConnectionError):
+            client.call(fail)
+        time.sleep(0.1)
+
+        with pytest.raises(ConnectionError):
+            client.call(fail)
+
+        assert client.state == 'open'
+
+    def test_late_call_does_not_admit_a_second_probe(self):
+        """A call started before the circuit opened does not end the probe when it finishes."""
+        late, probe = threading.Event(), threading.Event()
+        client = ModelClient(failure_threshold=1, reset_timeout=0.05)
+
+        def late_call():
+            late.wait(5)
+            fail()
+
+        threads = [threading.Thread(target=lambda: pytest.raises(ConnectionError, client.call, late_call))]
+        threads[0].start()
+        with pytest.raises(ConnectionError):
+            client.call(fail)
+        time.sleep(0.06)
+        threads.append(threading.Thread(target=client.call, args=(probe.wait, 5)))
+        threads[1].start()
+        time.sleep(0.02)
+
+        late.set()
+        threads[0].join()
+        time.sleep(0.06)
+        with pytest.raises(ModelUnavailableError) as error:
+            client.call(lambda: 'second probe')
+        assert error.value.reason == 'circuit_open'
+
+        probe.set()
+        threads[1].join()
+        assert client.state == 'closed'
@@ -0,0 +1,55 @@
+"""
+Tests for the O(k) random movie sampler.
+"""
+import pytest
+
+from data_models import Movie
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.cache_invalidation import register_cache_invalidation
+from services.movie_sampler import MovieSampler
+
+
+@pytest.fixture
+def data_manager():
+    """In-memory database with 30 horror and 10 comedy movies."""
+    data_manager = SQliteDataManager("sqlite:///:memory:")
+    register_cache_invalidation()
+    with data_manager.SessionFactory() as session:
+        session.add_all([Movie(id=i, title=f'Horror {i}', genre='Horror') for i in range(1, 31)])
+        session.add_all([Movie(id=i, title=f'Comedy {i}', genre='Comedy') for i in range(31, 41)])
+        session.commit()
+    return data_manager
+
+
+class TestMovieSampler:
+    """Tests for bucketed sampling."""
+
+    def test_samples_match_preference(self, data_manager):
+        """Samples are distinct and come from the preference's genres only."""
+        sampler = MovieSampler(data_manager)
+        ids = sampler.sample_ids('Horror & Mystery', k=5)
+        assert len(set(ids)) == 5
+        assert all(movie_id <= 30 for movie_id in ids)
+
+    def test_sample_loads_rows(self, data_manager):
+        """sample() returns the movies in the sampled order."""
+        sampler = MovieSampler(data_manager)
+        with data_manager.SessionFactory() as session:
+            movies = sampler.sample(session, 'Comedy & Humor', k=20)
+        assert sorted(movie.id for movie in movies) == list(range(31, 41))
+
+    def test_unknown_preference_samples_everything(self, data_manager):
+        """Without a known preference the whole catalog is the bucket."""
+        assert len(MovieSampler(data_manager).bucket('Western')) == 40
+
+    def test_bucket_is_reused_until_commit(self, data_manager):
+        """Buckets are loaded once and dropped when movies are committed."""
+        sampler = MovieSampler(data_manager)
+        first = sampler.bucket('Comedy & Humor')
+        assert sampler.bucket('Comedy & Humor') is first
+
+        with data_manager.SessionFactory() as session:
+            session.add(Movie(id=41, title='Comedy 41', genre='Comedy'))
+            session.commit()
+
+        assert 41 in sampler.bucket('Comedy & Humor')
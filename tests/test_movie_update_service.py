@@ -0,0 +1,91 @@
+"""
+Tests for the duplicate detection of the movie update service.
+"""
+import pytest
+
+from data_models import Movie
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.movie_update_service import MovieUpdateService
+from services.title_index import TitleIndex, title_numerals
+
+
+@pytest.fixture
+def data_manager():
+    data_manager = SQliteDataManager('sqlite:///:memory:')
+    with data_manager.SessionFactory() as session:
+        session.add_all([
+            Movie(id=1, title='Star Wars', release_year=1977),
+            Movie(id=2, title='Rocky II', release_year=1979),
+            Movie(id=3, title='The Godfather Part II', release_year=1974),
+            Movie(id=4, title='The Lord of the Rings: The Fellowship of the Ring', release_year=2001),
+            Movie(id=5, title='Dune', release_year=1984),
+        ])
+        session.commit()
+    return data_manager
+
+
+@pytest.fixture(params=['index', 'query'])
+def service(request, data_manager):
+    """Service with and without the in-memory title index."""
+    title_index = TitleIndex() if request.param == 'index' else None
+    return MovieUpdateService(data_manager, title_index=title_index)
+
+
+def find(service, data_manager, title, year=None):
+    with data_manager.SessionFactory() as session:
+        movie = service.find_duplicate(session, title, year)
+        return movie.id if movie else None
+
+
+class TestFindDuplicate:
+    """Tests for telling duplicates from sequels and remakes."""
+
+    def test_exact_title(self, service, data_manager):
+        assert find(service, data_manager, 'star wars') == 1
+        assert find(service, data_manager, 'Star Wars', 1977) == 1
+
+    def test_subtitled_sequel_is_not_a_duplicate(self, service, data_manager):
+        assert find(service, data_manager, 'Star Wars: The Empire Strikes Back', 1980) is None
+
+    def test_roman_numeral_sequel_is_not_a_duplicate(self, service, data_manager):
+        assert find(service, data_manager, 'Rocky III', 1982) is None
+        assert find(service, data_manager, 'Rocky III', 1979) is None
+
+    def test_part_sequel_is_not_a_duplicate(self, service, data_manager):
+        assert find(service, data_manager, 'The Godfather Part III', 1990) is None
+        assert find(service, data_manager, 'The Godfather Part III', 1974) is None
+
+    def test_remake_with_same_title(self, service, data_manager):
+        """The same title far apart in time is a different movie."""
+        assert find(service, data_manager, 'Dune', 2021) is None
+        assert find(service, data_manager, 'Dune', 1985) == 5
+
+
+class TestFuzzyDuplicate:
+    """Tests for near duplicates found through the title index."""
+
+    @pytest.fixture
+    def service(self, data_manager):
+        return MovieUpdateService(data_manager, title_index=TitleIndex())
+
+    def test_spelling_variant_with_matching_year(self, service, data_manager):
+        title = 'The Lord of the Rings - The Fellowship of the Rings'
+        assert find(service, data_manager, title, 2002) == 4
+
+    def test_spelling_variant_needs_a_year(self, service, data_manager):
+        title = 'The Lord of the Rings - The Fellowship of the Rings'
+        assert find(service, data_manager, title) is None
+        assert find(service, data_manager, title, 2010) is None
+
+
+class TestTitleNumerals:
+    """Tests for the sequel numbers in titles."""
+
+    def test_digits_and_roman_numerals(self):
+        assert title_numerals('Rocky III') == {3}
+        assert title_numerals('The Godfather Part II') == {2}
+        assert title_numerals("Ocean's 11") == {11}
+        assert title_numerals('Star Wars') == set()
+
+    def test_pronoun_is_not_a_numeral(self):
+        assert title_numerals('I, Robot') == set()
@@ -0,0 +1,77 @@
+"""
+Tests for keyset pagination.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from data_models import Base, Movie
+from utils.pagination import decode_cursor, encode_cursor, keyset_paginate
+
+
+@pytest.fixture
+def session():
+    """In-memory database with ties and NULL values in the sort columns."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    ratings = [8.5, 7.0, None, 8.5, 9.1, 7.0, None, 6.2, 8.5]
+    session.add_all([
+        Movie(id=i + 1, title=f"Movie {i + 1}", rating=rating, release_year=2000 + i % 3)
+        for i, rating in enumerate(ratings)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def collect_pages(session, column, descending, per_page):
+    """Walk all pages and return the ids in page order."""
+    ids, cursor = [], None
+    while True:
+        page = keyset_paginate(session.query(Movie.id, column), 'test', column, Movie.id,
+                               descending, cursor, per_page)
+        ids.extend(row.id for row in page.items)
+        if not page.has_next:
+            return ids
+        cursor = page.next_cursor
+
+
+class TestKeysetPagination:
+    """Tests for cursor based pagination."""
+
+    @pytest.mark.parametrize('per_page', [1, 2, 4, 20])
+    def test_pages_match_full_ordering(self, session, per_page):
+        """Concatenated pages equal the full ordering, including ties and NULLs."""
+        expected = [row.id for row in session.query(Movie.id).order_by(
+            Movie.rating.desc().nulls_last(), Movie.id)]
+
+        assert collect_pages(session, Movie.rating, True, per_page) == expected
+        assert expected[-2:] == [3, 7]
+
+    def test_ascending_sort(self, session):
+        """Ascending sort orders walk the same way."""
+        expected = [row.id for row in session.query(Movie.id).order_by(Movie.release_year, Movie.id)]
+        assert collect_pages(session, Movie.release_year, False, 2) == expected
+
+    def test_last_page_has_no_cursor(self, session):
+        """The final page reports no further cursor."""
+        page = keyset_paginate(session.query(Movie.id, Movie.rating), 'rating', Movie.rating,
+                               Movie.id, True, None, 20)
+        assert len(page.items) == 9
+        assert page.has_next is False
+        assert page.next_cursor is None
+
+
+class TestCursor:
+    """Tests for cursor encoding."""
+
+    def test_round_trip(self):
+        """A cursor decodes to the encoded position."""
+        assert decode_cursor(encode_cursor('rating', 8.5, 4), 'rating') == (8.5, 4)
+
+    @pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor('title', 'Alien', 1)])
+    def test_invalid_cursor(self, cursor):
+        """Garbage and cursors of another sort order are rejected."""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, 'rating')
@@ -0,0 +1,189 @@
+"""
+Tests for the background quiz question generation.
+"""
+import threading
+
+import pytest
+
+from data_models import Movie, QuizQuestion, Review, User
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.quiz_generation_service import FakeQuizModel, QuizGenerationService
+from services.quiz_service import QuizService
+from utils.rate_limiting import TokenBucket
+
+
+class FlakyModel(FakeQuizModel):
+    """Fails a number of times before answering, optionally blocking until released."""
+
+    def __init__(self, failures=0, block=False):
+        self.failures = failures
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+        self.calls = []
+
+    def generate_quiz_questions(self, movie_context, difficulty, exclude=()):
+        self.calls.append((movie_context['title'], difficulty))
+        self.release.wait(5)
+        if len(self.calls) <= self.failures:
+            raise ConnectionError('model unavailable')
+        return super().generate_quiz_questions(movie_context, difficulty, exclude)
+
+
+@pytest.fixture
+def data_manager(tmp_path):
+    """File database, the worker threads need to see the same data."""
+    data_manager = SQliteDataManager(f"sqlite:///{tmp_path / 'movies.db'}")
+    with data_manager.SessionFactory() as session:
+        session.add_all([
+            Movie(id=1, title='Alien', genre='Horror', director='Ridley Scott', release_year=1979),
+            Movie(id=2, title='Aliens', genre='Action', director='James Cameron', release_year=1986),
+            Movie(id=3, title='Alien 3', genre='Horror', director='David Fincher', release_year=1992),
+            User(id=1, username='ripley', email='ripley@example.com', password_hash='x'),
+        ])
+        session.add_all([Review(user_id=1, movie_id=3, rating=4),
+                         Review(user_id=1, movie_id=2, rating=5)])
+        session.commit()
+    return data_manager
+
+
+def pool_size(data_manager, movie_id, difficulty='mittel'):
+    with data_manager.SessionFactory() as session:
+        return len(QuizService.question_pool(session, movie_id, difficulty))
+
+
+class TestQuizGenerationService:
+    """Tests for the job queue, retries and prewarming."""
+
+    def test_quiz_start_does_not_block(self, data_manager):
+        """An empty pool returns no questions at once and is filled in the background."""
+        model = FlakyModel(block=True)
+        generator = QuizGenerationService(data_manager, model, workers=1, requests_per_minute=6000)
+        quiz_service = QuizService(data_manager, generator=generator)
+
+        assert quiz_service.get_questions_for_movie(1, 'mittel', user_id=1) == []
+        assert generator.is_pending(1, 'mittel')
+
+        model.release.set()
+        assert generator.wait(5)
+        assert not generator.is_pending(1, 'mittel')
+        assert len(quiz_service.get_questions_for_movie(1, 'mittel', user_id=1)) == QuizService.QUESTIONS_PER_QUIZ
+        generator.shutdown()
+
+    def test_duplicate_requests_are_queued_once(self, data_manager):
+        model = FlakyModel(block=True)
+        generator = QuizGenerationService(data_manager, model, workers=1, requests_per_minute=6000)
+
+        assert generator.request(1, 'mittel', waiting=True)
+        assert not generator.request(1, 'mittel')
+        model.release.set()
+        assert generator.wait(5)
+
+        assert len(model.calls) == 1
+        assert pool_size(data_manager, 1) == 10
+        generator.shutdown()
+
+    def test_failures_are_retried_with_backoff(self, data_manager):
+        model = FlakyModel(failures=2)
+        generator = QuizGenerationService(data_manager, model, workers=1, max_retries=3, backoff=0.01,
+                                          requests_per_minute=6000)
+
+        generator.request(1, 'mittel')
+        assert generator.wait(5)
+
+        assert len(model.calls) == 3
+        assert pool_size(data_manager, 1) == 10
+        assert generator.stats()['retries'] == 2
+        generator.shutdown()
+
+    def test_gives_up_after_max_retries(self, data_manager):
+        model = FlakyModel(failures=10)
+        generator = QuizGenerationService(data_manager, model, workers=1, max_retries=1, backoff=0.01,
+                                          requests_per_minute=6000)
+
+        generator.request(1, 'mittel')
+        assert generator.wait(5)
+
+        assert len(model.calls) == 2
+        assert generator.stats()['failed'] == 1
+        assert not generator.is_pending(1, 'mittel')
+        generator.shutdown()
+
+    def test_prewarm_orders_by_popularity(self, data_manager):
+        """Popular movies are generated first and full pools are not queued again."""
+        model = FlakyModel(block=True)
+        generator = QuizGenerationService(data_manager, model, workers=1, requests_per_minute=6000)
+
+        # The single worker is busy with movie 1 while the prewarm jobs are queued
+        generator.request(1, 'leicht')
+        assert generator.prewarm(['mittel']) == 3
+        model.release.set()
+        assert generator.wait(5)
+
+        assert model.calls == [('Alien', 'leicht'), ('Aliens', 'mittel'), ('Alien 3', 'mittel'), ('Alien', 'mittel')]
+        assert generator.prewarm(['mittel']) == 0
+        generator.shutdown()
+
+
+class BatchModel(FakeQuizModel):
+    """Records the batches and fails the ones containing a given title."""
+
+    def __init__(self, fail_title=None):
+        self.fail_title = fail_title
+        self.batches = []
+
+    def generate_quiz_questions_batch(self, jobs, exclude=None):
+        self.batches.append([(context['title'], difficulty) for context, difficulty in jobs])
+        if any(context['title'] == self.fail_title for context, _ in jobs):
+            raise ValueError('unparsable answer')
+        return super().generate_quiz_questions_batch(jobs, exclude)
+
+
+class TestBackfill:
+    """Tests for the batched pool backfill."""
+
+    def test_pools_share_prompts(self, data_manager):
+        model = BatchModel()
+        generator = QuizGenerationService(data_manager, model, workers=1, requests_per_minute=6000)
+
+        report = generator.backfill(['leicht', 'mittel'], batch_size=4, concurrency=2)
+
+        assert report['pools'] == 6
+        assert report['batches'] == len(model.batches) == 2
+        assert sorted(len(batch) for batch in model.batches) == [2, 4]
+        assert report['questions'] == 60
+        assert report['failed_batches'] == []
+        assert report['questions_per_second'] > 0
+        assert pool_size(data_manager, 3, 'leicht') == 10
+        assert generator.backfill(['leicht', 'mittel'])['pools'] == 0
+        generator.shutdown()
+
+    def test_failed_batches_are_reported(self, data_manager):
+        model = BatchModel(fail_title='Alien')
+        generator = QuizGenerationService(data_manager, model, workers=1, requests_per_minute=6000)
+
+        report = generator.backfill(['mittel'], batch_size=1, concurrency=1)
+
+        assert report['batches'] == 3
+        assert report['questions'] == 20
+        assert [failure['pools'] for failure in report['failed_batches']] == [[(1, 'mittel')]]
+        assert report['empty_pools'] == 1
+        assert pool_size(data_manager, 1) == 0
+        generator.shutdown()
+
+
+class TestTokenBucket:
+    """Tests for the limiter of outgoing model calls."""
+
+    def test_waits_for_tokens(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+
+        assert bucket.acquire() == 0
+        assert bucket.acquire() > 0
+
+    def test_invalid_settings_are_rejected(self):
+        """A bucket that could never hand out a token fails on creation instead of blocking forever."""
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+        with pytest.raises(ValueError):
+            TokenBucket(rate=1, capacity=0)
@@ -0,0 +1,160 @@
+"""
+Tests for the quiz question bank.
+"""
+from datetime import datetime
+
+import pytest
+
+from data_models import Movie, QuizAttempt, QuizAttemptQuestion, QuizQuestion, User
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.quiz_service import QuizService
+
+
+class StubAIClient:
+    """Returns numbered questions and counts the generation calls."""
+
+    def __init__(self, batch_size=10):
+        self.batch_size = batch_size
+        self.calls = 0
+        self.excluded = []
+
+    def generate_quiz_questions(self, movie_context, difficulty, exclude=()):
+        self.calls += 1
+        self.excluded.append(list(exclude))
+        start = (self.calls - 1) * self.batch_size
+        return [{
+            'question': f"Frage {number} zu {movie_context['title']}?",
+            'correct_answer': 'A',
+            'wrong_answers': ['B', 'C', 'D']
+        } for number in range(start, start + self.batch_size)]
+
+
+@pytest.fixture
+def data_manager():
+    data_manager = SQliteDataManager('sqlite:///:memory:')
+    with data_manager.SessionFactory() as session:
+        session.add(Movie(id=1, title='Alien', genre='Horror', release_year=1979))
+        session.add(User(id=1, username='ripley', email='ripley@example.com', password_hash='x'))
+        session.commit()
+    return data_manager
+
+
+@pytest.fixture
+def quiz_service(data_manager):
+    service = QuizService(data_manager)
+    service.ai_client = StubAIClient()
+    return service
+
+
+def answer(quiz_service, data_manager, questions, correct=True):
+    """Store a finished attempt of user 1 like the submit route does."""
+    with data_manager.SessionFactory() as session:
+        attempt = QuizAttempt(user_id=1, movie_id=1, score=0, total_questions=len(questions),
+                              difficulty='mittel', completed_at=datetime.now())
+        session.add(attempt)
+        session.flush()
+        quiz_service.record_answers(session, attempt.id, [
+            {'question_id': question['id'], 'user_answer': 'A' if correct else 'B', 'is_correct': correct}
+            for question in questions
+        ])
+        session.commit()
+
+
+class TestQuestionBank:
+    """Tests for reusing banked questions instead of generating new ones."""
+
+    def test_pool_is_filled_once(self, quiz_service, data_manager):
+        """The first quiz fills the bank, later quizzes are served from it."""
+        first = quiz_service.get_questions_for_movie(1, 'mittel')
+        second = quiz_service.get_questions_for_movie(1, 'mittel')
+
+        assert len(first) == len(second) == QuizService.QUESTIONS_PER_QUIZ
+        assert quiz_service.ai_client.calls == 1
+        with data_manager.SessionFactory() as session:
+            assert session.query(QuizQuestion).count() == 10
+            assert {q.source for q in session.query(QuizQuestion)} == {'ai'}
+
+    def test_difficulties_have_separate_pools(self, quiz_service):
+        quiz_service.get_questions_for_movie(1, 'mittel')
+        quiz_service.get_questions_for_movie(1, 'schwer')
+
+        assert quiz_service.ai_client.calls == 2
+
+    def test_duplicate_questions_are_not_banked(self, quiz_service, data_manager):
+        """A generation repeating banked questions adds only the new ones."""
+        quiz_service.get_questions_for_movie(1, 'mittel')
+        quiz_service.ai_client.calls = 0
+        quiz_service.ai_client.batch_size = 15
+        with data_manager.SessionFactory() as session:
+            session.query(QuizQuestion).filter(QuizQuestion.id > 5).delete()
+            session.commit()
+
+        quiz_service.get_questions_for_movie(1, 'mittel')
+
+        with data_manager.SessionFactory() as session:
+            texts = [q.question_text for q in session.query(QuizQuestion)]
+        assert len(texts) == len(set(texts)) == 15
+
+    def test_recently_seen_questions_are_skipped(self, quiz_service, data_manager):
+        first = quiz_service.get_questions_for_movie(1, 'mittel', user_id=1)
+        answer(quiz_service, data_manager, first)
+
+        second = quiz_service.get_questions_for_movie(1, 'mittel', user_id=1)
+
+        assert not {q['id'] for q in first} & {q['id'] for q in second}
+        assert quiz_service.ai_client.calls == 1
+
+    def test_pool_grows_when_user_has_seen_it(self, quiz_service, data_manager):
+        """Fewer than a quiz of unseen questions triggers a generation."""
+        answer(quiz_service, data_manager, quiz_service.get_questions_for_movie(1, 'mittel', user_id=1))
+        answer(quiz_service, data_manager, quiz_service.get_questions_for_movie(1, 'mittel', user_id=1))
+
+        third = quiz_service.get_questions_for_movie(1, 'mittel', user_id=1)
+
+        assert len(third) == QuizService.QUESTIONS_PER_QUIZ
+        assert quiz_service.ai_client.calls == 2
+
+    def test_top_up_excludes_banked_questions(self, quiz_service, data_manager):
+        """The model is told which questions the pool already has."""
+        answer(quiz_service, data_manager, quiz_service.get_questions_for_movie(1, 'mittel', user_id=1))
+        answer(quiz_service, data_manager, quiz_service.get_questions_for_movie(1, 'mittel', user_id=1))
+        quiz_service.get_questions_for_movie(1, 'mittel', user_id=1)
+
+        first, top_up = quiz_service.ai_client.excluded
+        assert first == []
+        assert len(top_up) == 10 and 'Frage 0 zu Alien?' in top_up
+
+    def test_full_pool_repeats_questions(self, quiz_service, data_manager):
+        quiz_service.MAX_POOL_SIZE = 10
+        answer(quiz_service, data_manager, quiz_service.get_questions_for_movie(1, 'mittel', user_id=1))
+        answer(quiz_service, data_manager, quiz_service.get_questions_for_movie(1, 'mittel', user_id=1))
+
+        third = quiz_service.get_questions_for_movie(1, 'mittel', user_id=1)
+
+        assert len(third) == QuizService.QUESTIONS_PER_QUIZ
+        assert quiz_service.ai_client.calls == 1
+
+
+class TestRecordAnswers:
+    """Tests for the usage statistics of banked questions."""
+
+    def test_usage_and_correct_rate(self, quiz_service, data_manager):
+        questions = quiz_service.get_questions_for_movie(1, 'mittel', user_id=1)[:1]
+        answer(quiz_service, data_manager, questions, correct=True)
+        answer(quiz_service, data_manager, questions, correct=False)
+
+        with data_manager.SessionFactory() as session:
+            question = session.get(QuizQuestion, questions[0]['id'])
+            assert question.question_usage_count == 2
+            assert question.correct_answer_rate == pytest.approx(0.5)
+            assert session.query(QuizAttemptQuestion).count() == 2
+
+    def test_selection_prefers_fitting_questions(self, quiz_service):
+        """Used questions whose correct rate misses the difficulty are rarely picked."""
+        fitting = QuizQuestion(id=1, question_usage_count=3, correct_answer_rate=0.4)
+        too_easy = QuizQuestion(id=2, question_usage_count=3, correct_answer_rate=1.0)
+
+        picks = [quiz_service._select_questions([fitting, too_easy], 'schwer', 1)[0].id
+                 for _ in range(300)]
+
+        assert picks.count(1) > picks.count(2)
@@ -0,0 +1,70 @@
+"""
+Tests for the collaborative-filtering recommendations.
+"""
+import pytest
+
+from data_models import Movie, MovieRecommendation, Review, User, UserMovie, WatchlistItem
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.genre_service import genre_preference_filter
+from services.recommendation_service import RecommendationService, item_similarities, score_user
+
+
+@pytest.fixture
+def data_manager():
+    """Three users with overlapping tastes."""
+    data_manager = SQliteDataManager("sqlite:///:memory:")
+    with data_manager.SessionFactory() as session:
+        session.add_all([Movie(id=i, title=f'Movie {i}', genre='Horror' if i <= 3 else 'Drama')
+                         for i in range(1, 6)])
+        session.add_all([User(id=i, username=f'user{i}', email=f'u{i}@example.com', password_hash='x')
+                         for i in range(1, 4)])
+        session.flush()
+        session.add_all([
+            # Users 1 and 2 both like movies 1 and 2, user 2 also likes 3 and 4
+            Review(user_id=1, movie_id=1, rating=5),
+            UserMovie(user_id=1, movie_id=2, favorite=True),
+            Review(user_id=2, movie_id=1, rating=5),
+            Review(user_id=2, movie_id=2, rating=4),
+            WatchlistItem(user_id=2, movie_id=3),
+            UserMovie(user_id=2, movie_id=4, watched=True),
+            # User 3 disliked movie 5, which must not be recommended to them
+            Review(user_id=3, movie_id=5, rating=1),
+            Review(user_id=3, movie_id=1, rating=4),
+        ])
+        session.commit()
+    return data_manager
+
+
+class TestRecommendationService:
+    """Tests for item-item similarities and the batch job."""
+
+    def test_item_similarities(self):
+        """Movies liked by the same users are neighbours, cosine is symmetric."""
+        similar = item_similarities({1: {10: 1.0, 20: 1.0}, 2: {10: 1.0, 20: 1.0, 30: 1.0}})
+        assert similar[10][0] == (20, 1.0)
+        assert dict(similar[30])[10] == dict(similar[10])[30]
+
+    def test_seen_movies_are_skipped(self):
+        """Already seen movies are never scored."""
+        similar = {1: [(2, 0.9), (3, 0.5)]}
+        assert [movie_id for movie_id, _, _ in score_user({1: 1.0}, {1, 2}, similar)] == [3]
+
+    def test_rebuild_writes_rows(self, data_manager):
+        """The job stores scored rows with a reason for every user with likes."""
+        assert RecommendationService(data_manager).rebuild() > 0
+
+        with data_manager.SessionFactory() as session:
+            ids = RecommendationService.recommended_ids(session, 1)
+            assert ids[0] == 3
+            assert set(ids) == {3, 4}
+            assert 5 not in RecommendationService.recommended_ids(session, 3)
+
+            row = session.query(MovieRecommendation).filter_by(user_id=1, movie_id=3).one()
+            assert row.reason.startswith('Weil Ihnen "Movie')
+
+    def test_genre_restricted_lookup(self, data_manager):
+        """Stored recommendations can be filtered by a genre preference."""
+        RecommendationService(data_manager).rebuild()
+        with data_manager.SessionFactory() as session:
+            clause = genre_preference_filter('Drama & Gefühl')
+            assert RecommendationService.recommended_ids(session, 1, clause) == [4]
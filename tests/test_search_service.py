@@ -0,0 +1,63 @@
+"""
+Tests for the full-text search service (SQLite FTS5).
+"""
+import pytest
+
+from data_models import Movie
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.search_service import SearchService, search_terms
+
+
+@pytest.fixture
+def data_manager():
+    """In-memory database with a few movies (the bootstrap installs FTS5)."""
+    data_manager = SQliteDataManager("sqlite:///:memory:")
+    with data_manager.SessionFactory() as session:
+        session.add_all([
+            Movie(id=1, title='Alien', genre='Horror, Sci-Fi', director='Ridley Scott',
+                  plot='The crew of a spaceship encounters a deadly creature.'),
+            Movie(id=2, title='Gladiator', genre='Action, Drama', director='Ridley Scott',
+                  plot='A betrayed general becomes a gladiator in Rome.'),
+            Movie(id=3, title='Space Jam', genre='Comedy', director='Joe Pytka',
+                  plot='Basketball players meet cartoon aliens.'),
+        ])
+        session.commit()
+    return data_manager
+
+
+class TestSearchService:
+    """Tests for ranked movie search."""
+
+    def test_title_matches_rank_first(self, data_manager):
+        """Title hits outrank matches in the plot."""
+        results = SearchService(data_manager).search('alien')
+        assert [movie_id for movie_id, _ in results] == [1, 3]
+
+    def test_director_and_prefix_search(self, data_manager):
+        """Director names are indexed and partial words match."""
+        results = SearchService(data_manager).search('ridl sco')
+        assert {movie_id for movie_id, _ in results} == {1, 2}
+
+    def test_index_follows_updates_and_deletes(self, data_manager):
+        """Triggers keep the FTS table in sync with the movies table."""
+        with data_manager.SessionFactory() as session:
+            session.get(Movie, 2).title = 'Il Gladiatore'
+            session.delete(session.get(Movie, 3))
+            session.commit()
+
+        service = SearchService(data_manager)
+        assert [movie_id for movie_id, _ in service.search('gladiatore')] == [2]
+        assert [movie_id for movie_id, _ in service.search('alien')] == [1]
+
+    def test_apply_restricts_query(self, data_manager):
+        """apply() joins the matches and exposes the rank column."""
+        service = SearchService(data_manager)
+        with data_manager.SessionFactory() as session:
+            query, rank = service.apply(session.query(Movie.id), 'spaceship', with_rank=True)
+            assert [row.id for row in query] == [1]
+            assert rank is not None
+
+    def test_operators_are_not_interpreted(self, data_manager):
+        """Search syntax in user input is treated as plain words."""
+        assert search_terms('"alien" OR -* (scott)') == ['alien', 'or', 'scott']
+        assert SearchService(data_manager).search('***') == []
@@ -0,0 +1,74 @@
+"""
+Tests for the precomputed movie similarity.
+"""
+import pytest
+
+from data_models import Actor, Movie, MovieActor, MovieSimilarity
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.similarity_service import MovieFeatures, SimilarityService, score_pair
+
+
+@pytest.fixture
+def data_manager(tmp_path):
+    """File database with a few related movies, the background scoring needs to see the same data."""
+    data_manager = SQliteDataManager(f"sqlite:///{tmp_path / 'movies.db'}")
+    with data_manager.SessionFactory() as session:
+        session.add_all([
+            Movie(id=1, title='Alien', genre='Horror, Sci-Fi', release_year=1979, director='Ridley Scott', rating=8.5),
+            Movie(id=2, title='Aliens', genre='Action, Horror, Sci-Fi', release_year=1986,
+                  director='James Cameron', rating=8.4),
+            Movie(id=3, title='Blade Runner', genre='Drama, Sci-Fi', release_year=1982,
+                  director='Ridley Scott', rating=8.1),
+            Movie(id=4, title='Unknown Sci-Fi', genre='Sci-Fi', release_year=None, director=None, rating=None),
+            Movie(id=5, title='Notebook', genre='Drama, Romance', release_year=2004, director='Nick Cassavetes'),
+            Actor(id=1, name='Sigourney Weaver'),
+        ])
+        session.flush()
+        session.add_all([MovieActor(movie_id=1, actor_id=1), MovieActor(movie_id=2, actor_id=1)])
+        session.commit()
+    return data_manager
+
+
+class TestSimilarityService:
+    """Tests for scoring, the batch job and incremental updates."""
+
+    def test_score_pair(self):
+        """All features contribute; missing years score 0 instead of failing."""
+        alien = MovieFeatures(1, frozenset({1, 2}), 1979, frozenset({'ridley scott'}), frozenset({7, 8, 9}), 8.5)
+        same = alien._replace(id=2)
+        no_year = MovieFeatures(3, frozenset({2}), None, frozenset(), frozenset(), None)
+
+        assert score_pair(alien, same) == 1.0
+        assert score_pair(alien, no_year) == 0.25
+
+    def test_rebuild_ranks_by_score(self, data_manager):
+        """Director, year and genres add up; unrelated movies are left out."""
+        service = SimilarityService(data_manager)
+        assert service.rebuild() > 0
+
+        assert service.similar_ids(1, compute_missing=False) == [3, 2, 4]
+        assert 1 not in service.similar_ids(5, compute_missing=False)
+
+    def test_null_year_movie(self, data_manager):
+        """Movies without a release year still get similar movies."""
+        service = SimilarityService(data_manager)
+        service.rebuild()
+        assert service.similar_ids(4, limit=2, compute_missing=False) == [1, 3]
+
+    def test_new_movie_is_scored_incrementally(self, data_manager):
+        """A movie added after the rebuild is scored in the background and joins its neighbours' lists."""
+        service = SimilarityService(data_manager, top_n=2)
+        service.rebuild()
+
+        with data_manager.SessionFactory() as session:
+            session.add(Movie(id=6, title='Prometheus', genre='Horror, Sci-Fi', release_year=2012,
+                              director='Ridley Scott', rating=7.0))
+            session.commit()
+
+        assert service.similar_ids(6) == []
+        service.shutdown(wait=True)
+
+        assert service.similar_ids(6, compute_missing=False)[0] == 1
+        assert service.similar_ids(1, compute_missing=False) == [6, 3]
+        with data_manager.SessionFactory() as session:
+            assert session.query(MovieSimilarity).filter_by(movie_id=1).count() == 2
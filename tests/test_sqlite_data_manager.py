@@ -0,0 +1,62 @@
+"""
+Tests for the session handling of the data manager.
+"""
+import pytest
+from flask import Flask
+
+from data_models import Movie
+from datamanager.sqlite_data_manager import SQliteDataManager
+
+
+@pytest.fixture
+def app_and_data_manager(tmp_path):
+    """Flask app with a data manager on a file database."""
+    app = Flask(__name__)
+    data_manager = SQliteDataManager(f"sqlite:///{tmp_path / 'movies.db'}")
+    data_manager.init_app(app)
+    return app, data_manager
+
+
+def movie_titles(data_manager):
+    with data_manager.SessionFactory() as session:
+        return sorted(movie.title for movie in session.query(Movie))
+
+
+class TestSessions:
+    """Tests for the shared request session and separate transactions."""
+
+    def test_request_shares_one_session(self, app_and_data_manager):
+        app, data_manager = app_and_data_manager
+        with app.app_context():
+            with data_manager.session_scope() as first, data_manager.session_scope() as second:
+                assert first is second
+
+    def test_failing_transaction_keeps_pending_request_work(self, app_and_data_manager):
+        """A rolled back get_session() block does not discard the route's pending objects."""
+        app, data_manager = app_and_data_manager
+        with app.app_context():
+            with data_manager.session_scope() as session:
+                session.add(Movie(title='Alien'))
+
+                with pytest.raises(ValueError):
+                    with data_manager.get_session() as transaction:
+                        assert transaction is not session
+                        transaction.add(Movie(title='Never stored'))
+                        raise ValueError('failed')
+
+                assert [movie.title for movie in session.new] == ['Alien']
+                session.commit()
+
+        assert movie_titles(data_manager) == ['Alien']
+
+    def test_transaction_commits_only_its_own_work(self, app_and_data_manager):
+        """get_session() commits its block; the route's pending objects stay uncommitted."""
+        app, data_manager = app_and_data_manager
+        with app.app_context():
+            with data_manager.session_scope() as session:
+                session.add(Movie(title='Pending'))
+                with data_manager.get_session() as transaction:
+                    transaction.add(Movie(title='Aliens'))
+
+                assert movie_titles(data_manager) == ['Aliens']
+                assert len(session.new) == 1
@@ -0,0 +1,99 @@
+"""
+Tests for the in-memory trigram title index.
+"""
+import gc
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from data_models import Base, Movie
+from services.title_index import TitleIndex, normalize_title, register_title_index, similarity
+
+
+@pytest.fixture
+def index():
+    """Index with a handful of titles."""
+    title_index = TitleIndex()
+    title_index.build([
+        (1, 'Star Wars', 1977),
+        (2, 'Star Trek', 2009),
+        (3, 'The Empire Strikes Back', 1980),
+        (4, 'Amélie', 2001),
+        (5, 'Alien', 1979),
+        (6, 'Aliens', 1986),
+    ])
+    return title_index
+
+
+class TestTitleIndex:
+    """Tests for autocomplete and fuzzy matching."""
+
+    def test_prefix_suggestions(self, index):
+        """A typed prefix ranks the matching titles first."""
+        suggestions = index.suggest('star w')
+        assert suggestions[0].title == 'Star Wars'
+        assert suggestions[0].year == 1977
+
+    def test_typo_tolerance(self, index):
+        """Small typos still find the title."""
+        assert index.suggest('emprie strikes')[0].movie_id == 3
+        assert index.suggest('amelie')[0].movie_id == 4
+
+    def test_find_similar(self, index):
+        """Duplicate detection respects the similarity threshold."""
+        assert index.find_similar('alien').movie_id == 5
+        assert index.find_similar('Star Wars!').movie_id == 1
+        assert index.find_similar('Star Gate') is None
+
+    def test_add_and_remove(self, index):
+        """Single titles can be added, renamed and removed."""
+        index.add(7, 'Interstellar', 2014)
+        assert index.suggest('interstel')[0].movie_id == 7
+        index.add(7, 'Inception', 2010)
+        assert index.suggest('interstel') == []
+        index.remove(7)
+        assert index.suggest('inception') == []
+
+    def test_normalization(self):
+        """Accents, case and punctuation are ignored."""
+        assert normalize_title('  Amélie: The Movie! ') == 'amelie the movie'
+        assert similarity('Alien', 'ALIEN') == 1.0
+
+    def test_suggest_latency(self):
+        """Autocomplete over a 2500 title catalog stays well under 10 ms."""
+        words = ['star', 'night', 'dark', 'love', 'city', 'dragon', 'lost', 'river', 'king', 'ghost']
+        large = TitleIndex()
+        large.build((i, f"{words[i % 10]} {words[(i // 10) % 10]} {words[(i // 100) % 10]} {i}", 2000)
+                    for i in range(2500))
+
+        # A full collection of the objects earlier tests left behind would be timed as well
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(20):
+            large.suggest('drgon kin')
+        assert (time.perf_counter() - start) / 20 < 0.01
+
+
+class TestTitleIndexEvents:
+    """Tests for keeping the index current on commits."""
+
+    def test_committed_inserts_are_indexed(self):
+        """New movies appear after commit, rolled back ones never."""
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        factory = sessionmaker(bind=engine)
+        index = TitleIndex()
+        index.build([])
+        register_title_index(index)
+
+        with factory() as session:
+            session.add(Movie(title='Arrival'))
+            session.flush()
+            session.rollback()
+            session.add(Movie(title='Blade Runner'))
+            session.commit()
+
+        assert index.suggest('arrival') == []
+        assert index.suggest('blade run')[0].title == 'Blade Runner'
@@ -0,0 +1,86 @@
+"""
+Tests for the NumPy movie vector engine.
+"""
+import numpy as np
+import pytest
+
+from data_models import Movie, Review, User, UserMovie
+from datamanager.sqlite_data_manager import SQliteDataManager
+from services.vector_engine import MovieVectorEngine, register_vector_engine, user_profile
+
+
+@pytest.fixture
+def data_manager():
+    """In-memory database with movies of three genre clusters."""
+    data_manager = SQliteDataManager("sqlite:///:memory:")
+    with data_manager.SessionFactory() as session:
+        session.add_all([
+            Movie(id=1, title='Alien', genre='Horror, Sci-Fi', release_year=1979, director='Ridley Scott', rating=8.5),
+            Movie(id=2, title='Aliens', genre='Action, Horror, Sci-Fi', release_year=1986,
+                  director='James Cameron', rating=8.4),
+            Movie(id=3, title='The Thing', genre='Horror, Sci-Fi', release_year=1982,
+                  director='John Carpenter', rating=8.2),
+            Movie(id=4, title='Notebook', genre='Drama, Romance', release_year=2004, director='Nick Cassavetes'),
+            Movie(id=5, title='Titanic', genre='Drama, Romance', release_year=1997, director='James Cameron', rating=7.9),
+            Movie(id=6, title='Airplane!', genre='Comedy', release_year=1980, rating=7.7),
+            User(id=1, username='fan', email='fan@example.com', password_hash='x'),
+        ])
+        session.commit()
+    return data_manager
+
+
+class TestMovieVectorEngine:
+    """Tests for encoding, top-k queries and incremental updates."""
+
+    def test_rows_are_normalized(self, data_manager):
+        """Every movie is one unit-length row."""
+        engine = MovieVectorEngine(data_manager)
+        engine.ensure_fresh()
+        assert len(engine) == 6
+        assert np.allclose(np.linalg.norm(engine._matrix, axis=1), 1.0)
+
+    def test_similar_movies(self, data_manager):
+        """Movies of the same genres rank first, the movie itself is excluded."""
+        engine = MovieVectorEngine(data_manager)
+        results = engine.similar(1, k=2)
+        assert {movie_id for movie_id, _ in results} == {2, 3}
+        assert results[0][1] >= results[1][1]
+
+    def test_batch_matches_single_queries(self, data_manager):
+        """The batched matrix product gives the same answers as single queries."""
+        engine = MovieVectorEngine(data_manager)
+        batch = engine.similar_batch([1, 4, 99], k=3)
+        assert set(batch) == {1, 4}
+        assert batch[4] == engine.similar(4, k=3)
+
+    def test_profile_recommendation(self, data_manager):
+        """A user who loves sci-fi horror and dislikes romance gets sci-fi horror."""
+        with data_manager.SessionFactory() as session:
+            session.add_all([
+                Review(user_id=1, movie_id=1, rating=5),
+                Review(user_id=1, movie_id=4, rating=1),
+                UserMovie(user_id=1, movie_id=2, favorite=True),
+            ])
+            session.commit()
+            profile = user_profile(session, 1)
+
+        assert profile == {1: 2.0, 4: -2.0, 2: 2.0}
+        engine = MovieVectorEngine(data_manager)
+        assert engine.recommend(profile, k=1)[0][0] == 3
+        # Only candidates are ranked, the romance movie scores below zero and is left out
+        assert [movie_id for movie_id, _ in engine.recommend(profile, k=3, candidates=[5, 6])] == [6]
+
+    def test_committed_movies_are_added(self, data_manager):
+        """New movies with unseen genres are appended after commit without a rebuild."""
+        engine = MovieVectorEngine(data_manager)
+        register_vector_engine(engine)
+        engine.ensure_fresh()
+        built_at = engine.built_at
+
+        with data_manager.SessionFactory() as session:
+            session.add(Movie(id=7, title='Event Horizon', genre='Horror, Sci-Fi, Mystery', release_year=1997))
+            session.commit()
+
+        assert engine.similar(7, k=1)[0][0] in {1, 3}
+        assert engine.built_at == built_at
+        assert len(engine) == 7
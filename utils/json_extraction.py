@@ -0,0 +1,173 @@
+"""
+JSON extraction from language model responses.
+
+Model answers are usually JSON, but may be wrapped in a Markdown code block,
+surrounded by prose, contain raw line breaks inside strings, trailing commas
+or end in the middle of a value when the output budget runs out.
+extract_json() handles all of these in a single pass over the text: it
+scans from the first bracket to its matching close, repairs what it can on
+the way and parses the result once. Truncated answers are cut back to the
+last complete key or item and closed; a schema then drops the incomplete
+element, while the complete ones before it are kept.
+
+An optional schema describes the expected structure:
+
+- a type (or tuple of types): the value must be an instance,
+- a dict: the value must be an object with all listed keys, each matching
+  its schema (other keys are kept),
+- a one-element list: the value must be an array; items that do not match
+  the item schema are dropped,
+- None: anything.
+"""
+import json
+from typing import Any, List, Optional
+
+# Closing bracket for an opening one
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+class JSONExtractionError(ValueError):
+    """The response contains no usable JSON for the expected structure."""
+
+
+def _first_bracket(text: str, schema: Any) -> int:
+    """Start of the JSON value: the first bracket, an object's or array's if the schema says which."""
+    if isinstance(schema, dict) or schema is dict:
+        preferred = text.find('{')
+    elif isinstance(schema, list) or schema is list:
+        preferred = text.find('[')
+    else:
+        preferred = -1
+    if preferred >= 0:
+        return preferred
+    positions = [position for position in (text.find('{'), text.find('[')) if position >= 0]
+    if not positions:
+        raise JSONExtractionError("Response contains no JSON")
+    return min(positions)
+
+
+def _scan(text: str, start: int) -> str:
+    """
+    Copy the JSON value starting at text[start], repairing it on the way.
+
+    Raw control characters in strings are escaped and trailing commas are
+    dropped. If the text ends before the value is closed, it is cut back to
+    the last comma outside a string, i.e. the last complete element, and
+    the open brackets are closed.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    # (length of out, open brackets) at the last comma outside a string
+    last_comma = None
+
+    for char in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char < ' ':
+                out.append(json.dumps(char)[1:-1])
+                continue
+            out.append(char)
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(_CLOSERS[char])
+        elif char in '}]':
+            if not stack or char != stack[-1]:
+                raise JSONExtractionError(f"Unbalanced '{char}' in response")
+            # Trailing comma before the closing bracket
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+            stack.pop()
+            out.append(char)
+            if not stack:
+                return ''.join(out)
+            continue
+        elif char == ',':
+            last_comma = (len(out), list(stack))
+        out.append(char)
+
+    # Truncated response: keep the complete elements only
+    if last_comma is None:
+        raise JSONExtractionError("Response ends before the JSON value is complete")
+    length, stack = last_comma
+    return ''.join(out[:length]) + ''.join(reversed(stack))
+
+
+def conform(value: Any, schema: Any, path: str = '$') -> Any:
+    """Check value against schema (see module docstring); returns it with invalid array items dropped."""
+    if schema is None:
+        return value
+    if isinstance(schema, dict):
+        if not isinstance(value, dict):
+            raise JSONExtractionError(f"{path} is not an object")
+        for key, item_schema in schema.items():
+            if key not in value:
+                raise JSONExtractionError(f"{path}.{key} is missing")
+            value[key] = conform(value[key], item_schema, f"{path}.{key}")
+        return value
+    if isinstance(schema, list):
+        if not isinstance(value, list):
+            raise JSONExtractionError(f"{path} is not an array")
+        items = []
+        for index, item in enumerate(value):
+            try:
+                items.append(conform(item, schema[0], f"{path}[{index}]"))
+            except JSONExtractionError:
+                continue
+        return items
+    if not isinstance(value, schema):
+        raise JSONExtractionError(f"{path} has the wrong type")
+    return value
+
+
+def _unwrap(value: Any, schema: Any) -> Any:
+    """Common shape mix-ups: a one-object array for an object, an object holding just the expected array."""
+    if (isinstance(schema, dict) or schema is dict) and isinstance(value, list) \
+            and len(value) == 1 and isinstance(value[0], dict):
+        return value[0]
+    if (isinstance(schema, list) or schema is list) and isinstance(value, dict):
+        arrays = [item for item in value.values() if isinstance(item, list)]
+        if len(arrays) == 1:
+            return arrays[0]
+    return value
+
+
+def extract_json(text: Optional[str], schema: Any = None) -> Any:
+    """
+    The JSON value of a model response, repaired and checked against schema.
+
+    Raises JSONExtractionError if there is none or it does not match.
+    """
+    if not text or not text.strip():
+        raise JSONExtractionError("Empty response")
+
+    # Fast path: JSON mode answers are plain JSON
+    try:
+        value = json.loads(text)
+    except ValueError:
+        try:
+            value = json.loads(_scan(text, _first_bracket(text, schema)))
+        except ValueError as e:
+            if isinstance(e, JSONExtractionError):
+                raise
+            raise JSONExtractionError(f"Invalid JSON in response: {e}") from None
+    return conform(_unwrap(value, schema), schema)
+
+
+def contains_json(text: Optional[str]) -> bool:
+    """Whether extract_json() finds a JSON object or array in the text."""
+    try:
+        return isinstance(extract_json(text), (dict, list))
+    except JSONExtractionError:
+        return False
@@ -0,0 +1,62 @@
+"""Keyset (cursor) pagination for SQLAlchemy queries."""
+import base64
+import json
+from collections import namedtuple
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+# items: rows of the page, next_cursor: opaque token for the following page or None
+Page = namedtuple('Page', ['items', 'next_cursor', 'has_next'])
+
+
+def encode_cursor(sort: str, value: Any, row_id: int) -> str:
+    """Encode the position after a row as an URL-safe token."""
+    payload = json.dumps([sort, value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """Decode a cursor, raising ValueError if it is malformed or for another sort order."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if cursor_sort != sort or not isinstance(row_id, int):
+        raise ValueError(f"Cursor does not match sort order '{sort}'")
+    return value, row_id
+
+
+def _after(column, id_column, descending: bool, value: Any, row_id: int):
+    """Filter for all rows after (value, row_id) in 'column NULLS LAST, id' order."""
+    if value is None:
+        return and_(column.is_(None), id_column > row_id)
+    beyond = column < value if descending else column > value
+    return or_(beyond, and_(column == value, id_column > row_id), column.is_(None))
+
+
+def keyset_paginate(query, sort: str, column, id_column, descending: bool = False,
+                    cursor: Optional[str] = None, per_page: int = 20) -> Page:
+    """
+    Fetch one page ordered by column (NULLS LAST) with id as tiebreaker.
+
+    Unlike OFFSET the cost does not grow with the page depth, since the
+    database seeks straight to the cursor position via the sort index.
+    Rows must expose the sort column and the id as attributes.
+    """
+    order = column.desc() if descending else column.asc()
+    query = query.order_by(order.nulls_last(), id_column.asc())
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort)
+        query = query.filter(_after(column, id_column, descending, value, row_id))
+
+    rows = query.limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    items = rows[:per_page]
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_cursor(sort, getattr(last, column.key), getattr(last, id_column.key))
+    return Page(items, next_cursor, has_next)
@@ -1,6 +1,7 @@
 """API Rate Limiting and Monitoring."""
 from functools import wraps
-from time import time
+from threading import Lock
+from time import monotonic, sleep, time
 from typing import Dict, Optional
 from flask import request, jsonify, g
 import logging
@@ -57,6 +58,37 @@ class RateLimiter:
 rate_limiter = RateLimiter()
 
 
+class TokenBucket:
+    """Blocking rate limiter for outgoing calls, e.g. the requests per minute quota of an API."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        # rate is in tokens per second; zero or less would never refill and block forever
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    def acquire(self) -> float:
+        """Wait for a token. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            sleep(delay)
+            waited += delay
+
+
 def rate_limit(limit: int = 100, window: int = 3600, per: str = 'ip'):
     """
     Rate limiting decorator.